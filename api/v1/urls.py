@@ -23,4 +23,5 @@ urlpatterns = [
     path("courses/", include(("apps.courses.urls", "courses"), namespace="courses")),
     path("shop/", include(("apps.shop.urls", "shop"), namespace="shop")),
     path("social/", include(("apps.social.urls", "social"), namespace="social")),
+    path("shared/", include(("apps.shared.urls", "shared"), namespace="shared")),
 ]
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from apps.authorization.resolver import permission_resolver
 from ..models import User
 
 
@@ -36,3 +38,14 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
+
+
+class RBACTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues tokens carrying the user's compiled permission mask and roles."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in permission_resolver.claims(user).items():
+            token[claim] = value
+        return token
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+def assign_bit_indexes(apps, schema_editor):
+    Permission = apps.get_model("authorization", "Permission")
+    permissions = list(Permission.objects.order_by("created_at", "codename"))
+    for index, permission in enumerate(permissions):
+        permission.bit_index = index
+    Permission.objects.bulk_update(permissions, ["bit_index"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authorization", "0004_seed_default_roles"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="permission",
+            name="bit_index",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(assign_bit_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def add_permission(apps, schema_editor):
+    Permission = apps.get_model("authorization", "Permission")
+    Role = apps.get_model("authorization", "Role")
+    permission = Permission.objects.filter(codename="award_bulk_points").first()
+    if permission is None:
+        # Historical models skip Permission.save, so assign the next bit here
+        last = Permission.objects.aggregate(models.Max("bit_index"))["bit_index__max"]
+        permission = Permission.objects.create(
+            codename="award_bulk_points",
+            name="Award bulk points",
+            bit_index=0 if last is None else last + 1,
+        )
+    # Historical models send no signals either; cached permission sets are
+    # retired by the post_migrate handler in signals.py
+    for role in Role.objects.filter(name="Admin"):
+        role.permissions.add(permission)
+
+
+def remove_permission(apps, schema_editor):
+    Permission = apps.get_model("authorization", "Permission")
+    Permission.objects.filter(codename="award_bulk_points").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authorization", "0005_permission_bit_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_permission, remove_permission),
+    ]
@@ -24,10 +24,23 @@ class Permission(BaseModel):
     name = models.CharField(max_length=255, unique=True)
     codename = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Position of this permission in compiled permission bitmasks; assigned
+    # once and never reused, so masks issued earlier keep their meaning
+    bit_index = models.PositiveIntegerField(
+        unique=True, null=True, blank=True, editable=False
+    )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.bit_index is None:
+            last = Permission.all_objects.aggregate(models.Max("bit_index"))
+            self.bit_index = (
+                0 if last["bit_index__max"] is None else last["bit_index__max"] + 1
+            )
+        super().save(*args, **kwargs)
+
 
 # ------------------------------------------------------------------------
 # Enhanced Gamification, Social, and Shop Permissions for RBAC Integration
@@ -0,0 +1,286 @@
+import threading
+import time
+
+from django.db import transaction
+
+from infrastructure.cache import cache_handler
+
+from .models import Permission, Role, UserRole
+
+KEY_PREFIX = "rbac:perms"
+VERSION_KEY = "rbac:version"
+USER_VERSION_PREFIX = "rbac:user_version"
+# Per-user counters only need to outlive the tokens and entries using them
+USER_VERSION_TIMEOUT = 60 * 60 * 24
+# Attribute holding the resolved set on the request's user object
+REQUEST_ATTR = "_rbac_permission_set"
+# JWT claims carrying a permission set issued at login
+MASK_CLAIM = "perm_mask"
+ROLES_CLAIM = "roles"
+VERSION_CLAIM = "perm_version"
+USER_VERSION_CLAIM = "perm_user_version"
+
+
+class PermissionTable:
+    """
+    Compiled RBAC tables: one bit per permission, taken from the stable
+    ``Permission.bit_index``, and each role's permissions OR'ed into one
+    integer. Loaded per process for a given RBAC version.
+    """
+
+    def __init__(self, version, bits, role_masks):
+        self.version = version
+        self.bits = bits
+        self.role_masks = role_masks
+        self._action_masks = {}
+
+    @classmethod
+    def load(cls, version):
+        bits = {
+            codename: 1 << index
+            for codename, index in Permission.objects.filter(
+                bit_index__isnull=False
+            ).values_list("codename", "bit_index")
+        }
+        role_masks = {}
+        for role_id, index in Role.permissions.through.objects.filter(
+            role__is_deleted=False,
+            permission__is_deleted=False,
+            permission__bit_index__isnull=False,
+        ).values_list("role_id", "permission__bit_index"):
+            role_masks[role_id] = role_masks.get(role_id, 0) | 1 << index
+        return cls(version, bits, role_masks)
+
+    def mask_for(self, codenames):
+        """
+        The bits of ``codenames`` OR'ed together, or None when one of them
+        is not a known permission and so can never be held.
+        """
+        mask = 0
+        for codename in codenames:
+            bit = self.bits.get(codename)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def action_masks(self, view_class):
+        """
+        ``{action: required mask}`` for a view's ``permission_required_map``,
+        compiled once per view class and table.
+        """
+        masks = self._action_masks.get(view_class)
+        if masks is None:
+            masks = {
+                action: self.mask_for(codenames)
+                for action, codenames in compile_permission_map(view_class).items()
+            }
+            self._action_masks[view_class] = masks
+        return masks
+
+
+_permission_maps = {}
+
+
+def compile_permission_map(view_class):
+    """
+    Normalize a view class's ``permission_required_map`` into
+    ``{action: tuple of codenames}``; a list value requires every listed
+    permission. Cached per class, since the maps are class attributes.
+    """
+    compiled = _permission_maps.get(view_class)
+    if compiled is None:
+        compiled = {
+            action: (required,) if isinstance(required, str) else tuple(required)
+            for action, required in (
+                getattr(view_class, "permission_required_map", None) or {}
+            ).items()
+        }
+        _permission_maps[view_class] = compiled
+    return compiled
+
+
+class PermissionSet:
+    """A user's effective permissions as one bitmask, plus their role names."""
+
+    __slots__ = ("mask", "roles", "version")
+
+    def __init__(self, mask, roles, version=None):
+        self.mask = mask
+        self.roles = roles
+        self.version = version
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PermissionSet)
+            and self.mask == other.mask
+            and self.roles == other.roles
+        )
+
+    def __reduce__(self):
+        return (PermissionSet, (self.mask, self.roles, self.version))
+
+    def allows(self, required):
+        """True when every bit of a precompiled ``required`` mask is held."""
+        return required is not None and self.mask & required == required
+
+    def has(self, codename):
+        table = permission_resolver.table(self.version)
+        return self.allows(table.mask_for((codename,)))
+
+    def has_any(self, codenames):
+        bits = permission_resolver.table(self.version).bits
+        return any(self.allows(bits.get(codename)) for codename in codenames)
+
+    def has_role(self, *names):
+        return not self.roles.isdisjoint(names)
+
+    def allows_action(self, view_class, action):
+        """
+        Check an action against the view's compiled
+        ``permission_required_map``; unmapped actions need no permission.
+        """
+        masks = permission_resolver.table(self.version).action_masks(view_class)
+        if action not in masks:
+            return True
+        return self.allows(masks[action])
+
+    @property
+    def codenames(self):
+        bits = permission_resolver.table(self.version).bits
+        return frozenset(codename for codename, bit in bits.items() if self.allows(bit))
+
+
+EMPTY = PermissionSet(0, frozenset())
+
+
+class PermissionResolver:
+    """
+    Resolves a user's PermissionSet once per request.
+
+    Two versions guard every set: a global one, bumped by role and
+    permission changes since those affect many users, and a per-user one,
+    bumped when that user's role assignments change. A set issued at login
+    travels in the JWT and is used while both versions are current;
+    otherwise it comes from the shared cache, under a key carrying both, or
+    is computed from the user's roles and the compiled PermissionTable.
+    The resolved set is also kept on the user object, so repeated checks
+    within a request do not even reach the cache.
+    """
+
+    def __init__(self, ttl=60 * 60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._table = None
+
+    @staticmethod
+    def _current(key, timeout=None):
+        version = cache_handler.get(key, local=False)
+        if version is None:
+            # Seeded from the clock, so an evicted version never falls back
+            # to one whose entries are still cached
+            cache_handler.add(key, time.time_ns(), timeout)
+            version = cache_handler.get(key, local=False)
+        return version
+
+    def version(self):
+        return self._current(VERSION_KEY)
+
+    def user_version(self, user_id):
+        return self._current(f"{USER_VERSION_PREFIX}:{user_id}", USER_VERSION_TIMEOUT)
+
+    def key(self, user_id, version=None, user_version=None):
+        if version is None:
+            version = self.version()
+        if user_version is None:
+            user_version = self.user_version(user_id)
+        return f"{KEY_PREFIX}:{version}:{user_id}:{user_version}"
+
+    def table(self, version=None):
+        """The compiled table for ``version``, or the latest one loaded."""
+        table = self._table
+        if table is None or (version is not None and table.version != version):
+            with self._lock:
+                table = PermissionTable.load(version or self.version())
+                self._table = table
+        return table
+
+    def compute(self, user_id, version=None):
+        table = self.table(version)
+        mask, roles = 0, set()
+        for role_id, name in UserRole.objects.filter(
+            user_id=user_id, role__is_deleted=False
+        ).values_list("role_id", "role__name"):
+            mask |= table.role_masks.get(role_id, 0)
+            roles.add(name)
+        return PermissionSet(mask, frozenset(roles), table.version)
+
+    def get(self, user, token=None):
+        if user is None or not user.is_authenticated:
+            return EMPTY
+        resolved = getattr(user, REQUEST_ATTR, None)
+        if resolved is not None:
+            return resolved
+        version, user_version = self.version(), self.user_version(user.pk)
+        if (
+            hasattr(token, "get")
+            and token.get(VERSION_CLAIM) == version
+            and token.get(USER_VERSION_CLAIM) == user_version
+        ):
+            resolved = PermissionSet(
+                int(token.get(MASK_CLAIM, "0"), 16),
+                frozenset(token.get(ROLES_CLAIM, ())),
+                version,
+            )
+        else:
+            key = self.key(user.pk, version, user_version)
+            resolved = cache_handler.get(key)
+            if resolved is None:
+                resolved = self.compute(user.pk, version)
+                cache_handler.set(key, resolved, self.ttl)
+        setattr(user, REQUEST_ATTR, resolved)
+        return resolved
+
+    def claims(self, user):
+        """JWT claims carrying the user's current permission set."""
+        version = self.version()
+        resolved = self.compute(user.pk, version)
+        return {
+            VERSION_CLAIM: version,
+            USER_VERSION_CLAIM: self.user_version(user.pk),
+            MASK_CLAIM: format(resolved.mask, "x"),
+            ROLES_CLAIM: sorted(resolved.roles),
+        }
+
+    def invalidate(self):
+        self._bump()
+        # Again after commit, in case a concurrent request cached the old
+        # sets under the new version in between
+        transaction.on_commit(self._bump)
+
+    def invalidate_user(self, user_id):
+        """Retire one user's tokens and cached set after an assignment change."""
+        self._bump_user(user_id)
+        transaction.on_commit(lambda: self._bump_user(user_id))
+
+    @staticmethod
+    def _bump():
+        try:
+            cache_handler.incr(VERSION_KEY)
+        except ValueError:
+            cache_handler.add(VERSION_KEY, time.time_ns(), None)
+
+    @staticmethod
+    def _bump_user(user_id):
+        try:
+            cache_handler.incr(f"{USER_VERSION_PREFIX}:{user_id}")
+        except ValueError:
+            # Reseeded from the clock on the next read, above anything issued
+            pass
+
+
+permission_resolver = PermissionResolver()
+
+
+def get_permission_set(user, token=None):
+    return permission_resolver.get(user, token)
@@ -1,4 +1,5 @@
 from apps.authorization.models import Role, Permission, UserRole
+from apps.authorization.resolver import get_permission_set
 from apps.authentication.models import User
 
 
@@ -14,12 +15,7 @@ class AuthorizationService:
 
     @staticmethod
     def check_user_permission(user: User, permission_codename: str) -> bool:
-        user_roles = UserRole.objects.filter(user=user).select_related("role")
-        permissions = Permission.objects.filter(
-            codename=permission_codename,
-            role__in=[user_role.role for user_role in user_roles],
-        )
-        return permissions.exists()
+        return get_permission_set(user).has(permission_codename)
 
     @staticmethod
     def create_role(name: str, description: str = "") -> Role:
@@ -0,0 +1,48 @@
+import logging
+
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .models import Permission, Role, UserRole
+from .resolver import permission_resolver
+
+logger = logging.getLogger(__name__)
+
+# Role and permission changes affect every holder of the role, so they bump
+# the global RBAC version (see resolver.py). Assignment changes only bump the
+# assigned user's version, which their JWTs and cached set also carry.
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_role_permissions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        permission_resolver.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Permission)
+def invalidate_permissions(sender, **kwargs):
+    permission_resolver.invalidate()
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    permission_resolver.invalidate_user(instance.user_id)
+
+
+@receiver(post_migrate)
+def invalidate_after_migrations(sender, plan=None, **kwargs):
+    # Data migrations edit roles and permissions through historical models,
+    # which send no signals; bump once per migrate run that applied anything
+    if sender.label != "authorization" or not plan:
+        return
+    try:
+        permission_resolver.invalidate()
+    except Exception as e:
+        # The schema is migrated either way; say loudly that cached sets and
+        # tokens may hold stale permissions until the next RBAC change
+        logger.warning(
+            "Could not bump the RBAC version after migrating; cached "
+            f"permission sets may be stale: {e}",
+            exc_info=True,
+        )
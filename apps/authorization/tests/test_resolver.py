@@ -0,0 +1,148 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.authorization.models import Permission, Role, UserRole
+from apps.authorization.resolver import get_permission_set, permission_resolver
+from apps.authorization.services import AuthorizationService
+
+User = get_user_model()
+
+
+def fresh(user):
+    # A new request gets a new user object
+    return User.objects.get(pk=user.pk)
+
+
+@pytest.fixture
+def student():
+    user = User.objects.create_user(
+        username="resolved", email="resolved@example.com", password="pass"
+    )
+    role = Role.objects.create(name="Resolver student")
+    role.permissions.add(
+        Permission.objects.create(name="Resolver view", codename="resolver_view")
+    )
+    UserRole.objects.create(user=user, role=role)
+    return user
+
+
+@pytest.mark.django_db
+def test_warm_checks_run_no_queries(student):
+    get_permission_set(fresh(student))  # warms the shared cache
+    user = fresh(student)
+    with CaptureQueriesContext(connection) as queries:
+        assert AuthorizationService.check_user_permission(user, "resolver_view")
+        assert not AuthorizationService.check_user_permission(user, "resolver_manage")
+        assert get_permission_set(user).has_role("Resolver student")
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_edits_invalidate_cached_sets(student, django_capture_on_commit_callbacks):
+    assert get_permission_set(fresh(student)).codenames == {"resolver_view"}
+    role = Role.objects.get(name="Resolver student")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        role.permissions.add(
+            Permission.objects.create(
+                name="Resolver manage", codename="resolver_manage"
+            )
+        )
+    assert get_permission_set(fresh(student)).has("resolver_manage")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Permission.objects.get(codename="resolver_manage").soft_delete()
+        Permission.objects.get(codename="resolver_view").soft_delete()
+    assert not get_permission_set(fresh(student)).codenames
+
+    with django_capture_on_commit_callbacks(execute=True):
+        UserRole.objects.get(user=student).delete()
+    assert not get_permission_set(fresh(student)).roles
+
+
+@pytest.mark.django_db
+def test_login_token_carries_mask(student, django_capture_on_commit_callbacks):
+    from rest_framework_simplejwt.tokens import AccessToken
+    from apps.authentication.application.serializers import (
+        RBACTokenObtainPairSerializer,
+    )
+
+    token = RBACTokenObtainPairSerializer.get_token(student).access_token
+    bit = Permission.objects.get(codename="resolver_view").bit_index
+    assert int(token["perm_mask"], 16) == 1 << bit
+
+    # A current token answers checks without touching the database
+    user = fresh(student)
+    with CaptureQueriesContext(connection) as queries:
+        assert get_permission_set(user, AccessToken(str(token))).has("resolver_view")
+    assert len(queries) == 0
+
+    # Once the user's assignments change, the token's set is no longer trusted
+    with django_capture_on_commit_callbacks(execute=True):
+        UserRole.objects.get(user=student).delete()
+    assert not get_permission_set(fresh(student), token).has("resolver_view")
+
+
+@pytest.mark.django_db
+def test_assignments_only_retire_the_assigned_users_sets(
+    student, django_capture_on_commit_callbacks
+):
+    from apps.authentication.application.serializers import (
+        RBACTokenObtainPairSerializer,
+    )
+
+    other = User.objects.create_user(
+        username="bystander", email="bystander@example.com", password="pass"
+    )
+    role = Role.objects.get(name="Resolver student")
+    UserRole.objects.create(user=other, role=role)
+    token = RBACTokenObtainPairSerializer.get_token(other).access_token
+    version = permission_resolver.version()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        UserRole.objects.get(user=student).delete()
+    assert permission_resolver.version() == version
+    assert not get_permission_set(fresh(student)).roles
+    # The bystander's token is still current and needs no queries
+    user = fresh(other)
+    with CaptureQueriesContext(connection) as queries:
+        assert get_permission_set(user, token).has("resolver_view")
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_permission_required_map_is_enforced_per_action(
+    student, django_capture_on_commit_callbacks
+):
+    client = APIClient()
+    client.force_authenticate(user=student)
+    url = reverse("api:v1:courses:course-list")
+    # The course list maps to view_course, which the student lacks
+    assert client.get(url).status_code == 403
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Role.objects.get(name="Resolver student").permissions.add(
+            Permission.objects.get(codename="view_course")
+        )
+    # A fresh user object, as a new request would load
+    client.force_authenticate(user=User.objects.get(pk=student.pk))
+    assert client.get(url).status_code == 200
+    # Creating still needs create_course
+    assert client.post(url, {"title": "New"}).status_code == 403
+
+
+@pytest.mark.django_db
+def test_applied_migrations_retire_cached_sets():
+    from django.apps import apps
+    from django.db.models.signals import post_migrate
+
+    config = apps.get_app_config("authorization")
+    version = permission_resolver.version()
+    # Nothing applied (or a test database flush): the version stays
+    post_migrate.send(sender=config, app_config=config, plan=[])
+    assert permission_resolver.version() == version
+    post_migrate.send(sender=config, app_config=config, plan=[("migration", False)])
+    assert permission_resolver.version() != version
@@ -82,6 +82,10 @@ class CourseAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.select_related("instructor", "category").with_stats()
+
 
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
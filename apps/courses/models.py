@@ -1,6 +1,7 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
-from apps.shared.models import BaseModel
+from apps.shared.models import BaseModel, SoftDeleteManager, SoftDeleteQuerySet
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -17,6 +18,54 @@ class CourseCategory(BaseModel):
         ordering = ["name"]
 
 
+class CourseQuerySet(SoftDeleteQuerySet):
+    def with_stats(self):
+        """
+        Annotate the figures behind ``enrollment_count``, ``completion_rate``
+        and ``average_rating`` with one correlated subquery each, so listing
+        courses costs no per-course queries.
+        """
+        enrollments = (
+            Enrollment.objects.filter(course=models.OuterRef("pk"))
+            .order_by()
+            .values("course")
+        )
+        ratings = (
+            CourseReview.objects.filter(course=models.OuterRef("pk"))
+            .order_by()
+            .values("course")
+        )
+        return self.annotate(
+            num_enrollments=Coalesce(
+                models.Subquery(enrollments.annotate(n=models.Count("id")).values("n")),
+                0,
+            ),
+            num_completed=Coalesce(
+                models.Subquery(
+                    enrollments.filter(status="completed")
+                    .annotate(n=models.Count("id"))
+                    .values("n")
+                ),
+                0,
+            ),
+            avg_rating=models.Subquery(
+                ratings.annotate(avg=models.Avg("rating")).values("avg")
+            ),
+        )
+
+    def with_enrollment_flag(self, user):
+        """Annotate ``is_enrolled`` for ``user`` with an EXISTS subquery."""
+        if user is None or not user.is_authenticated:
+            return self.annotate(is_enrolled=models.Value(False))
+        return self.annotate(
+            is_enrolled=models.Exists(
+                Enrollment.objects.filter(
+                    course=models.OuterRef("pk"), user=user, is_deleted=False
+                )
+            )
+        )
+
+
 class Course(BaseModel):
     DIFFICULTY_CHOICES = [
         ("beginner", "Beginner"),
@@ -47,11 +96,18 @@ class Course(BaseModel):
         upload_to="course_thumbnails/", blank=True, null=True
     )
 
+    objects = SoftDeleteManager.from_queryset(CourseQuerySet)()
+
     def __str__(self):
         return self.title
 
+    # The properties below read the CourseQuerySet.with_stats() annotations
+    # when present and fall back to a query otherwise
+
     @property
     def enrollment_count(self):
+        if hasattr(self, "num_enrollments"):
+            return self.num_enrollments
         return self.enrollments.count()
 
     @property
@@ -59,11 +115,16 @@ class Course(BaseModel):
         total_enrollments = self.enrollment_count
         if total_enrollments == 0:
             return 0.0
-        completed_enrollments = self.enrollments.filter(status="completed").count()
+        if hasattr(self, "num_completed"):
+            completed_enrollments = self.num_completed
+        else:
+            completed_enrollments = self.enrollments.filter(status="completed").count()
         return (completed_enrollments / total_enrollments) * 100
 
     @property
     def average_rating(self):
+        if hasattr(self, "avg_rating"):
+            return self.avg_rating or 0.0
         return self.reviews.aggregate(models.Avg("rating"))["rating__avg"] or 0.0
 
     class Meta:
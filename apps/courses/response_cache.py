@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+import uuid
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from infrastructure.cache import cache_handler
+
+KEY_PREFIX = "courses:responses"
+VERSION_PREFIX = "courses:response_version"
+CATALOG = "catalog"
+# Counters only need to outlive the responses cached under them
+VERSION_TIMEOUT = 60 * 60 * 24
+
+
+def course_scope(course_id):
+    """The version scope for a course id from a URL, or None if malformed."""
+    try:
+        return str(uuid.UUID(str(course_id)))
+    except ValueError:
+        return None
+
+
+def enrollment_scope(user_id):
+    """The version scope of a user's enrollments, for the is_enrolled overlay."""
+    return f"enrollments:{user_id}"
+
+
+def make_etag(*parts):
+    """Strong ETag over the JSON encoding of ``parts``."""
+    encoded = json.dumps(parts, cls=JSONEncoder, sort_keys=True).encode()
+    return f'"{hashlib.blake2b(encoded, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    # If-None-Match compares weakly, so W/ variants match as well
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+class Overlay:
+    """
+    Per-user ``fields`` of a cached body. ``scope`` is a version scope
+    bumped whenever their values may change, so the ETag can be computed
+    without them; ``load()`` returns ``{field: value}`` and only runs when
+    a cached body is actually sent.
+    """
+
+    def __init__(self, fields, scope, load):
+        self.fields = tuple(fields)
+        self.scope = scope
+        self.load = load
+
+
+class CourseResponseCache:
+    """
+    Cached read responses for the course catalog and course trees.
+
+    Each course has a version counter and so does the catalog. Course,
+    Section and Lesson changes bump their course's version, and course
+    and category changes bump the catalog's; a course is also bumped when
+    one of its prerequisites or its category changes, since both are
+    embedded in its body. Entries are keyed by version and never
+    invalidated one by one. Aggregate counts in the cached bodies
+    (enrollments, ratings) may lag by up to ``ttl``.
+
+    Bodies are stored without per-user fields; those are overlaid on each
+    request (see ``Overlay``), and the overlay's version is folded into
+    the strong ETag. One entry serves every user while ``If-None-Match``
+    still answers 304 per user, without loading the per-user values.
+    """
+
+    def __init__(self, ttl=120):
+        self.ttl = ttl
+
+    def version(self, scope):
+        key = f"{VERSION_PREFIX}:{scope}"
+        version = cache_handler.get(key, local=False)
+        if version is None:
+            # Seeded from the clock, so an expired or evicted counter never
+            # falls back to a version whose responses are still cached
+            cache_handler.add(key, time.time_ns(), VERSION_TIMEOUT)
+            version = cache_handler.get(key, local=False)
+        return version
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            self._bump(scope)
+            # Again after commit, in case a concurrent reader cached the
+            # old rows under the new version in between
+            transaction.on_commit(lambda scope=scope: self._bump(scope))
+
+    @staticmethod
+    def _bump(scope):
+        try:
+            cache_handler.incr(f"{VERSION_PREFIX}:{scope}")
+        except ValueError:
+            # Never read, so nothing is cached under it
+            pass
+
+    def key(self, request, scope, name):
+        params = sorted(request.query_params.lists())
+        request_hash = hashlib.blake2b(
+            json.dumps([request.get_host(), request.path, params]).encode(),
+            digest_size=16,
+        ).hexdigest()
+        return f"{KEY_PREFIX}:{scope}:{self.version(scope)}:{name}:{request_hash}"
+
+    def respond(self, request, scope, name, render, overlay=None):
+        """
+        Serve the cached body for this request, rendering it on a miss with
+        ``render()`` (a Response); only 200 responses are cached.
+        ``overlay`` is an ``Overlay`` of per-user fields, taken from the
+        rendered body on a miss.
+        """
+        # Read before any value is loaded, so a change in between retires
+        # the ETag rather than pinning a stale value to a current one
+        overlay_version = self.version(overlay.scope) if overlay else None
+        key = self.key(request, scope, name)
+        entry = cache_handler.get(key)
+        values = None
+        if entry is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            if overlay:
+                values = {field: data.get(field) for field in overlay.fields}
+                data.update(dict.fromkeys(overlay.fields))
+            entry = (data, make_etag(data))
+            cache_handler.set(key, entry, self.ttl)
+        data, etag = entry
+        if overlay:
+            etag = make_etag(etag, overlay.scope, overlay_version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if overlay:
+            data = {**data, **(values if values is not None else overlay.load())}
+        return Response(data, headers=headers)
+
+
+course_responses = CourseResponseCache()
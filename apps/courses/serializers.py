@@ -107,6 +107,9 @@ class CourseSerializer(DynamicFieldsSerializer, serializers.ModelSerializer):
 
     @extend_schema_field(OpenApiTypes.BOOL)
     def get_is_enrolled(self, obj):
+        # Annotated by CourseQuerySet.with_enrollment_flag() in CourseViewSet
+        if hasattr(obj, "is_enrolled"):
+            return obj.is_enrolled
         user = self.context.get("request").user if self.context.get("request") else None
         if user and user.is_authenticated:
             return Enrollment.objects.filter(
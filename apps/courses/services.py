@@ -1,3 +1,6 @@
+from itertools import islice
+
+from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -6,40 +9,66 @@ from django.db.models import Count, Q
 from .models import (
     Course,
     Section,
-    Lesson,
     Enrollment,
     LessonProgress,
     CourseReview,
 )
-from apps.gamification.utils import award_points
+from .response_cache import course_responses, enrollment_scope
+from .structure import course_structure
+from apps.gamification.events import emit, emit_many, make_event
 from apps.shared.exceptions import BusinessLogicError
 
+ENROLLMENT_BATCH_SIZE = 1000
+ENROLLMENT_MILESTONES = (5, 10, 25, 50)
+
+
+def enrollment_bonus_event(user_id, total_enrollments, enrollment_id):
+    """Points event for a user's first enrollment or a milestone, or None."""
+    if total_enrollments == 1:
+        # First course enrollment bonus
+        points, action = 10, "First course enrollment"
+    elif total_enrollments in ENROLLMENT_MILESTONES:
+        # Milestone bonus
+        points = total_enrollments * 2
+        action = f"Enrollment milestone: {total_enrollments} courses"
+    else:
+        return None
+    return make_event(
+        user_id,
+        "points",
+        points=points,
+        action=action,
+        reference_type="enrollment",
+        reference_id=str(enrollment_id),
+    )
+
 
 class CourseService:
     @staticmethod
     @transaction.atomic
-    def enroll_user(user, course):
+    def enroll_user(user, course, materialize_progress=True):
         if Enrollment.objects.filter(
             user=user, course=course, is_deleted=False
         ).exists():
             raise BusinessLogicError("User is already enrolled in this course.")
-        # Optionally check prerequisites
-        for prereq in course.prerequisites.all():
-            if not Enrollment.objects.filter(
-                user=user, course=prereq, status="completed", is_deleted=False
-            ).exists():
-                raise BusinessLogicError(f"Prerequisite not completed: {prereq.title}")
+        # All prerequisites in one query: the first one not completed, if any
+        missing = CourseService.missing_prerequisites(user, course).first()
+        if missing is not None:
+            raise BusinessLogicError(f"Prerequisite not completed: {missing.title}")
         enrollment = Enrollment.objects.create(
             user=user, course=course, status="active"
         )
-        # Optionally, create LessonProgress records for all lessons
-        for section in course.sections.filter(is_published=True, is_deleted=False):
-            for lesson in section.lessons.filter(is_published=True, is_deleted=False):
-                LessonProgress.objects.get_or_create(
-                    enrollment=enrollment, lesson=lesson
-                )
+        if materialize_progress:
+            ProgressService.materialize_progress([enrollment.pk], course.pk)
         return enrollment
 
+    @staticmethod
+    def missing_prerequisites(user, course):
+        completed = Enrollment.objects.filter(
+            user=user, status="completed", is_deleted=False
+        ).values("course_id")
+        return course.prerequisites.exclude(id__in=completed)
+
     @staticmethod
     @transaction.atomic
     def unenroll_user(user, course):
@@ -51,31 +80,32 @@ class CourseService:
         enrollment.status = "dropped"
         enrollment.save(update_fields=["status"])
         # Optionally, soft-delete lesson progresses
-        enrollment.lesson_progresses.update(is_deleted=True)
+        enrollment.lesson_progress.update(is_deleted=True)
         return enrollment
 
     @staticmethod
-    def calculate_progress(enrollment):
-        total_lessons = Lesson.objects.filter(
-            section__course=enrollment.course, is_published=True, is_deleted=False
-        ).count()
-        completed = LessonProgress.objects.filter(
-            enrollment=enrollment, is_completed=True, is_deleted=False
-        ).count()
+    def calculate_progress(enrollment, completed=None):
+        # One COUNT of completed lessons against the cached lesson total
+        total_lessons = course_structure.total_lessons(enrollment.course_id)
+        if completed is None:
+            completed = ProgressService.completed_lessons(enrollment)
         if total_lessons == 0:
             return 0
-        return round((completed / total_lessons) * 100, 2)
+        # Completions of lessons unpublished since then never exceed 100%
+        return round((min(completed, total_lessons) / total_lessons) * 100, 2)
 
     @staticmethod
-    def check_completion(enrollment):
-        progress = CourseService.calculate_progress(enrollment)
+    def check_completion(enrollment, progress=None):
+        if progress is None:
+            progress = CourseService.calculate_progress(enrollment)
         if progress == 100 and enrollment.status != "completed":
             enrollment.status = "completed"
             enrollment.completed_at = timezone.now()
             enrollment.save(update_fields=["status", "completed_at"])
-            # Award course completion points
-            award_points(
-                user=enrollment.user,
+            # Award course completion points after commit
+            emit(
+                enrollment.user_id,
+                "points",
                 points=enrollment.course.points_reward,
                 action="earn",
                 reference_type="course",
@@ -104,9 +134,11 @@ class ProgressService:
     @transaction.atomic
     def complete_lesson(user, lesson):
         # Find enrollment
-        enrollment = Enrollment.objects.filter(
-            user=user, course=lesson.section.course, is_deleted=False
-        ).first()
+        enrollment = (
+            Enrollment.objects.select_related("course")
+            .filter(user=user, course_id=lesson.section.course_id, is_deleted=False)
+            .first()
+        )
         if not enrollment:
             raise BusinessLogicError("User is not enrolled in this course.")
         progress, created = LessonProgress.objects.get_or_create(
@@ -120,36 +152,74 @@ class ProgressService:
             lesson.estimated_minutes
         )  # Optionally track actual time
         progress.attempts_count += 1
+        # The post_save receiver awards the lesson points, updates the
+        # enrollment progress and checks for course completion
         progress.save()
-        # Award points for lesson
-        award_points(
-            user=user,
+        return progress
+
+    @staticmethod
+    def apply_completion(progress):
+        """
+        Follow-up work for a completed lesson: queue its points, store the
+        enrollment's new progress and complete the course at 100%. Runs a
+        fixed number of queries however large the course is.
+        """
+        enrollment = progress.enrollment
+        lesson = progress.lesson
+        # Award points for lesson after commit
+        emit(
+            enrollment.user_id,
+            "points",
             points=lesson.points_reward,
             action="earn",
             reference_type="lesson",
             reference_id=str(lesson.id),
             description=f"Completed lesson: {lesson.title}",
         )
-        # Update enrollment progress
-        enrollment.progress_percentage = CourseService.calculate_progress(enrollment)
+        percentage = CourseService.calculate_progress(enrollment)
+        enrollment.progress_percentage = percentage
         enrollment.save(update_fields=["progress_percentage"])
-        # Check for course completion
-        CourseService.check_completion(enrollment)
-        return progress
+        CourseService.check_completion(enrollment, percentage)
 
     @staticmethod
-    def get_course_progress(enrollment):
-        lessons = Lesson.objects.filter(
-            section__course=enrollment.course, is_published=True, is_deleted=False
-        )
-        completed = LessonProgress.objects.filter(
+    def completed_lessons(enrollment):
+        return LessonProgress.objects.filter(
             enrollment=enrollment, is_completed=True, is_deleted=False
         ).count()
-        total = lessons.count()
+
+    @staticmethod
+    def materialize_progress(
+        enrollment_ids, course_id, batch_size=ENROLLMENT_BATCH_SIZE
+    ):
+        """
+        Create the LessonProgress rows for every published lesson of a
+        course for the given enrollments with batched ``bulk_create``.
+        Existing rows are left alone. Progress figures never need these
+        rows, and ``complete_lesson`` creates a missing one on first touch,
+        so callers may skip this for large cohorts.
+        """
+        lesson_ids = course_structure.lesson_ids(course_id)
+        rows = (
+            LessonProgress(enrollment_id=enrollment_id, lesson_id=lesson_id)
+            for enrollment_id in enrollment_ids
+            for lesson_id in lesson_ids
+        )
+        created = 0
+        while batch := list(islice(rows, batch_size)):
+            LessonProgress.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+        return created
+
+    @staticmethod
+    def get_course_progress(enrollment):
+        total = course_structure.total_lessons(enrollment.course_id)
+        completed = ProgressService.completed_lessons(enrollment)
         return {
             "total_lessons": total,
             "completed_lessons": completed,
-            "progress_percentage": CourseService.calculate_progress(enrollment),
+            "progress_percentage": CourseService.calculate_progress(
+                enrollment, completed
+            ),
             "status": enrollment.status,
             "completed_at": enrollment.completed_at,
         }
@@ -157,17 +227,13 @@ class ProgressService:
     @staticmethod
     def calculate_estimated_completion(enrollment):
         # Estimate based on average pace
-        completed = LessonProgress.objects.filter(
-            enrollment=enrollment, is_completed=True, is_deleted=False
-        ).count()
-        total = Lesson.objects.filter(
-            section__course=enrollment.course, is_published=True, is_deleted=False
-        ).count()
+        completed = ProgressService.completed_lessons(enrollment)
+        total = course_structure.total_lessons(enrollment.course_id)
         if completed == 0:
             return None
         days = (timezone.now().date() - enrollment.enrolled_at.date()).days or 1
         avg_per_day = completed / days
-        remaining = total - completed
+        remaining = max(total - completed, 0)
         if avg_per_day == 0:
             return None
         estimated_days = int(remaining / avg_per_day)
@@ -183,6 +249,108 @@ class EnrollmentService:
     def unenroll_user(user, course):
         return CourseService.unenroll_user(user, course)
 
+    @staticmethod
+    def enroll_cohort(
+        course, user_ids, materialize_progress=False, batch_size=ENROLLMENT_BATCH_SIZE
+    ):
+        """
+        Enroll many users into a course in batches, e.g. for corporate
+        onboarding. Each batch costs a fixed number of queries: users
+        already enrolled or missing a prerequisite are filtered out with
+        one query each, enrollments are bulk created, and the first
+        enrollment and milestone bonuses are queued from one grouped count.
+        Progress rows are created lazily unless ``materialize_progress``.
+
+        Returns counts of ``enrolled``, ``already_enrolled``,
+        ``missing_prerequisites`` and ``unknown_users``. Malformed ids raise
+        ``ValidationError``.
+        """
+        result = dict.fromkeys(
+            ("enrolled", "already_enrolled", "missing_prerequisites", "unknown_users"),
+            0,
+        )
+        prerequisite_ids = list(course.prerequisites.values_list("id", flat=True))
+        to_pk = get_user_model()._meta.pk.to_python
+        user_ids = (to_pk(user_id) for user_id in user_ids)
+        while batch := list(dict.fromkeys(islice(user_ids, batch_size))):
+            with transaction.atomic():
+                counts = EnrollmentService._enroll_batch(
+                    course, batch, prerequisite_ids, materialize_progress
+                )
+            for key, count in counts.items():
+                result[key] += count
+        return result
+
+    @staticmethod
+    def _enroll_batch(course, user_ids, prerequisite_ids, materialize_progress):
+        known = set(
+            get_user_model()
+            .objects.filter(pk__in=user_ids)
+            .values_list("pk", flat=True)
+        )
+        existing = set(
+            Enrollment.objects.filter(course=course, user_id__in=known).values_list(
+                "user_id", flat=True
+            )
+        )
+        candidates = [
+            user_id
+            for user_id in user_ids
+            if user_id in known and user_id not in existing
+        ]
+        eligible = candidates
+        if prerequisite_ids and candidates:
+            eligible = set(
+                Enrollment.objects.filter(
+                    user_id__in=candidates,
+                    course_id__in=prerequisite_ids,
+                    status="completed",
+                    is_deleted=False,
+                )
+                .values("user_id")
+                .annotate(done=Count("course_id", distinct=True))
+                .filter(done=len(prerequisite_ids))
+                .values_list("user_id", flat=True)
+            )
+            eligible = [user_id for user_id in candidates if user_id in eligible]
+        # Signals do not fire for bulk_create; the enrollment bonuses are
+        # queued below instead
+        Enrollment.objects.bulk_create(
+            [
+                Enrollment(user_id=user_id, course=course, status="active")
+                for user_id in eligible
+            ],
+            ignore_conflicts=True,
+        )
+        # Re-read the ids, since rows lost to a concurrent enrollment were skipped
+        enrolled = dict(
+            Enrollment.objects.filter(
+                course=course, user_id__in=eligible, is_deleted=False
+            ).values_list("user_id", "id")
+        )
+        # bulk_create skips the signal that retires is_enrolled overlays
+        course_responses.bump(*(enrollment_scope(user_id) for user_id in enrolled))
+        if materialize_progress:
+            ProgressService.materialize_progress(enrolled.values(), course.pk)
+        totals = (
+            Enrollment.objects.filter(user_id__in=list(enrolled))
+            .values("user_id")
+            .annotate(total=Count("id"))
+            .values_list("user_id", "total")
+        )
+        emit_many(
+            [
+                enrollment_bonus_event(user_id, total, enrolled[user_id])
+                for user_id, total in totals
+            ]
+        )
+        return {
+            "enrolled": len(enrolled),
+            "already_enrolled": len(existing),
+            "missing_prerequisites": len(candidates) - len(eligible),
+            "unknown_users": len(user_ids) - len(known),
+        }
+
     @staticmethod
     def validate_capacity(course):
         # Placeholder for capacity logic
@@ -190,9 +358,7 @@ class EnrollmentService:
 
     @staticmethod
     def verify_prerequisites(user, course):
-        for prereq in course.prerequisites.all():
-            if not Enrollment.objects.filter(
-                user=user, course=prereq, status="completed", is_deleted=False
-            ).exists():
-                raise BusinessLogicError(f"Prerequisite not completed: {prereq.title}")
+        missing = CourseService.missing_prerequisites(user, course).first()
+        if missing is not None:
+            raise BusinessLogicError(f"Prerequisite not completed: {missing.title}")
         return True
@@ -1,12 +1,23 @@
-from django.db.models.signals import post_save, post_delete
+import logging
+
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from django.db.models import Count
 
-from apps.courses.models import LessonProgress, Enrollment, CourseReview
-from apps.gamification.utils import award_points, check_and_award_badges
-from apps.gamification.models import UserPointProfile
-from apps.shared.exceptions import BusinessLogicError
+from apps.courses.models import (
+    Course,
+    CourseCategory,
+    LessonProgress,
+    Enrollment,
+    CourseReview,
+    Lesson,
+    Section,
+)
+from apps.courses.response_cache import CATALOG, course_responses, enrollment_scope
+from apps.courses.services import ProgressService, enrollment_bonus_event
+from apps.courses.structure import course_structure
+from apps.gamification.events import emit, emit_many
+
+logger = logging.getLogger(__name__)
 
 # --- Lesson Completion Signal ---
 
@@ -17,46 +28,66 @@ def handle_lesson_completion(sender, instance, created, **kwargs):
     Award points when a lesson is completed and check for course completion.
     """
     if instance.is_completed and instance.completed_at and created is False:
-        lesson = instance.lesson
-        user = instance.enrollment.user
         try:
-            # Award lesson points
-            award_points(
-                user=user,
-                points=lesson.points_reward,
-                action=f"Completed lesson: {lesson.title}",
-                reference_type="lesson",
-                reference_id=str(lesson.id),
-            )
-            # Check for course completion
-            enrollment = instance.enrollment
-            total_lessons = (
-                lesson.section.course.sections.filter(is_published=True)
-                .prefetch_related("lessons")
-                .aggregate(total=Count("lessons"))["total"]
-            )
-            completed_lessons = LessonProgress.objects.filter(
-                enrollment=enrollment, is_completed=True
-            ).count()
-            if total_lessons and completed_lessons == total_lessons:
-                # Mark enrollment as completed
-                enrollment.status = "completed"
-                enrollment.completed_at = timezone.now()
-                enrollment.save(update_fields=["status", "completed_at"])
-                # Award course completion bonus
-                course = lesson.section.course
-                award_points(
-                    user=user,
-                    points=course.points_reward,
-                    action=f"Completed course: {course.title}",
-                    reference_type="course",
-                    reference_id=str(course.id),
-                )
-                # Check for badges
-                check_and_award_badges(user)
+            ProgressService.apply_completion(instance)
         except Exception as e:
             # Prevent signal failure from breaking core logic
-            pass
+            logger.error(
+                f"Failed to apply completion of lesson progress {instance.pk}: {e}",
+                exc_info=True,
+            )
+
+
+# --- Course Structure Signals ---
+
+
+@receiver([post_save, post_delete], sender=Section)
+def invalidate_section_structure(sender, instance, **kwargs):
+    course_structure.invalidate(instance.course_id)
+    course_responses.bump(str(instance.course_id))
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_lesson_structure(sender, instance, **kwargs):
+    course_id = (
+        Section.objects.filter(pk=instance.section_id)
+        .values_list("course_id", flat=True)
+        .first()
+    )
+    if course_id is not None:
+        course_structure.invalidate(course_id)
+        course_responses.bump(str(course_id))
+
+
+# --- Cached Response Signals ---
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_course_responses(sender, instance, **kwargs):
+    # Courses listing this one as a prerequisite embed it too
+    dependents = instance.postrequisites.values_list("pk", flat=True)
+    course_responses.bump(str(instance.pk), CATALOG, *(str(pk) for pk in dependents))
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+def invalidate_prerequisite_responses(sender, instance, action, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        # Either side may be the changed course when edited in reverse
+        course_responses.bump(str(instance.pk), *(str(pk) for pk in pk_set or ()))
+
+
+@receiver([post_save, post_delete], sender=CourseCategory)
+def invalidate_category_responses(sender, instance, **kwargs):
+    # Category names appear in every catalog page and in their courses
+    course_ids = Course.objects.filter(category_id=instance.pk).values_list(
+        "pk", flat=True
+    )
+    course_responses.bump(CATALOG, *(str(pk) for pk in course_ids))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_enrollment_overlay(sender, instance, **kwargs):
+    course_responses.bump(enrollment_scope(instance.user_id))
 
 
 # --- Enrollment Signal ---
@@ -68,27 +99,17 @@ def handle_enrollment(sender, instance, created, **kwargs):
     Award welcome points for first enrollment or enrollment milestones.
     """
     if created:
-        user = instance.user
         try:
-            total_enrollments = Enrollment.objects.filter(user=user).count()
-            if total_enrollments == 1:
-                # First course enrollment bonus
-                award_points(
-                    user=user,
-                    points=10,
-                    action="First course enrollment",
-                    reference_type="enrollment",
-                    reference_id=str(instance.id),
-                )
-            elif total_enrollments in [5, 10, 25, 50]:
-                # Milestone bonus
-                award_points(
-                    user=user,
-                    points=total_enrollments * 2,
-                    action=f"Enrollment milestone: {total_enrollments} courses",
-                    reference_type="enrollment",
-                    reference_id=str(instance.id),
-                )
+            total_enrollments = Enrollment.objects.filter(
+                user_id=instance.user_id
+            ).count()
+            emit_many(
+                [
+                    enrollment_bonus_event(
+                        instance.user_id, total_enrollments, instance.id
+                    )
+                ]
+            )
         except Exception:
             pass
 
@@ -101,18 +122,19 @@ def handle_course_review(sender, instance, created, **kwargs):
     """
     Award points for leaving a course review.
     """
+    # The review counter feeds the "social" badge criteria; the worker
+    # refreshes it and awards the points for a new published review
     if created and instance.is_published:
-        user = instance.user
-        try:
-            award_points(
-                user=user,
-                points=5,
-                action=f"Left a review for course: {instance.course.title}",
-                reference_type="review",
-                reference_id=str(instance.id),
-            )
-        except Exception:
-            pass
+        emit(
+            instance.user_id,
+            "review",
+            points=5,
+            action=f"Left a review for course: {instance.course.title}",
+            reference_type="review",
+            reference_id=str(instance.id),
+        )
+    else:
+        emit(instance.user_id, "review")
 
 
 # --- Review Deletion Signal (Optional: Remove points if review is deleted) ---
@@ -123,5 +145,6 @@ def handle_course_review_delete(sender, instance, **kwargs):
     """
     Optionally, deduct points if a review is deleted.
     """
+    emit(instance.user_id, "review")
     # This is optional and can be customized as needed.
     pass
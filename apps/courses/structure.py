@@ -0,0 +1,61 @@
+from django.db import transaction
+
+from infrastructure.cache import invalidate_tags, memoize
+
+from .models import Lesson
+
+# Tag a course's memoized outline is computed under
+TAG_PREFIX = "courses:structure"
+TTL = 60 * 60
+
+
+def structure_tag(course_id):
+    return f"{TAG_PREFIX}:{course_id}"
+
+
+@memoize(timeout=TTL, tags=lambda course_id: [structure_tag(course_id)])
+def load_structure(course_id):
+    lesson_ids = list(
+        Lesson.objects.filter(
+            section__course_id=course_id,
+            section__is_published=True,
+            section__is_deleted=False,
+            is_published=True,
+            is_deleted=False,
+        )
+        .order_by("section__order_index", "order_index")
+        .values_list("id", flat=True)
+    )
+    return {"lesson_ids": lesson_ids, "total_lessons": len(lesson_ids)}
+
+
+class CourseStructureCache:
+    """
+    Cached outline of each course's published lessons: the ordered lesson
+    ids and their count, which is the denominator of every progress figure.
+
+    Outlines are memoized under a per-course tag, so a cold course is
+    loaded once however many learners hit it together. Lesson and Section
+    saves/deletes invalidate the tag through signals; ``TTL`` bounds
+    staleness for writes that bypass them, such as queryset updates.
+    """
+
+    def get(self, course_id):
+        # One key whether the id arrives as a UUID or as text
+        return load_structure(str(course_id))
+
+    def lesson_ids(self, course_id):
+        return self.get(course_id)["lesson_ids"]
+
+    def total_lessons(self, course_id):
+        return self.get(course_id)["total_lessons"]
+
+    def invalidate(self, course_id):
+        tag = structure_tag(course_id)
+        invalidate_tags(tag)
+        # Again once the change is visible, in case a concurrent reader
+        # re-cached the old outline before the commit
+        transaction.on_commit(lambda: invalidate_tags(tag))
+
+
+course_structure = CourseStructureCache()
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.authorization.models import Permission, Role, UserRole
+from apps.courses.models import Course, CourseCategory, CourseReview, Enrollment
+
+User = get_user_model()
+
+
+def make_courses(count, instructor, category, students):
+    for index in range(count):
+        course = Course.objects.create(
+            title=f"Course {index}",
+            description="",
+            is_published=True,
+            instructor=instructor,
+            category=category,
+        )
+        for student in students:
+            Enrollment.objects.create(user=student, course=course, status="completed")
+            CourseReview.objects.create(
+                user=student, course=course, rating=4, review_text="Good"
+            )
+
+
+@pytest.mark.django_db
+def test_course_list_query_count_is_constant():
+    client = APIClient()
+    user = User.objects.create_user(
+        username="browser", email="browser@example.com", password="pass"
+    )
+    instructor = User.objects.create_user(
+        username="teacher", email="teacher@example.com", password="pass"
+    )
+    students = [
+        User.objects.create_user(
+            username=f"student{index}",
+            email=f"student{index}@example.com",
+            password="pass",
+        )
+        for index in range(3)
+    ]
+    category = CourseCategory.objects.create(name="Data")
+    role = Role.objects.create(name="Catalog browser")
+    role.permissions.add(Permission.objects.get(codename="view_course"))
+    UserRole.objects.create(user=user, role=role)
+    client.force_authenticate(user=user)
+    url = reverse("api:v1:courses:course-list")
+
+    # Resolve the user's permissions before counting; new courses then
+    # retire the cached catalog, so both counts below render it
+    client.get(url)
+    make_courses(2, instructor, category, students)
+    with CaptureQueriesContext(connection) as few:
+        response = client.get(url)
+    assert response.status_code == 200
+
+    make_courses(15, instructor, category, students)
+    with CaptureQueriesContext(connection) as many:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(many) == len(few)
+    course = response.data["results"][0]
+    assert (course["enrollment_count"], course["average_rating"]) == (3, 4.0)
+    assert course["category_name"] == "Data"
+
+
+@pytest.mark.django_db
+def test_course_detail_uses_annotations():
+    user = User.objects.create_user(
+        username="enrolled", email="enrolled@example.com", password="pass"
+    )
+    course = Course.objects.create(title="Solo", description="")
+    Enrollment.objects.create(user=user, course=course, status="completed")
+
+    annotated = Course.objects.with_stats().with_enrollment_flag(user).get(pk=course.pk)
+    with CaptureQueriesContext(connection) as queries:
+        stats = (annotated.enrollment_count, annotated.completion_rate)
+    assert stats == (1, 100.0)
+    assert annotated.is_enrolled and annotated.average_rating == 0.0
+    assert len(queries) == 0
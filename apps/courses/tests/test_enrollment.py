@@ -0,0 +1,86 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.courses.models import Course, Enrollment, Lesson, LessonProgress, Section
+from apps.courses.services import CourseService, EnrollmentService
+from apps.gamification.models import PointActivity
+from apps.shared.exceptions import BusinessLogicError
+
+User = get_user_model()
+
+
+@pytest.fixture
+def course():
+    course = Course.objects.create(
+        title="Onboarding", description="", is_published=True
+    )
+    section = Section.objects.create(
+        course=course, title="Basics", order_index=1, is_published=True
+    )
+    for index in range(30):
+        Lesson.objects.create(
+            section=section,
+            title=f"Lesson {index}",
+            content_type="text",
+            order_index=index,
+            is_published=True,
+        )
+    return course
+
+
+def make_users(count, prefix="member"):
+    return [
+        User.objects.create_user(
+            username=f"{prefix}{index}",
+            email=f"{prefix}{index}@example.com",
+            password="pass",
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_enroll_user_materializes_progress_in_bulk(settings, course):
+    settings.GAMIFICATION_EVENTS_SYNC = False
+    prereqs = [
+        Course.objects.create(title=f"Prereq {index}", description="")
+        for index in range(5)
+    ]
+    course.prerequisites.set(prereqs)
+    (user,) = make_users(1)
+    with pytest.raises(BusinessLogicError):
+        CourseService.enroll_user(user, course)
+
+    for prereq in prereqs:
+        Enrollment.objects.create(user=user, course=prereq, status="completed")
+    with CaptureQueriesContext(connection) as queries:
+        enrollment = CourseService.enroll_user(user, course)
+    # Independent of the number of lessons and prerequisites
+    assert len(queries) < 15
+    assert LessonProgress.objects.filter(enrollment=enrollment).count() == 30
+
+
+@pytest.mark.django_db
+def test_enroll_cohort_skips_enrolled_and_unknown_users(settings, course):
+    settings.GAMIFICATION_EVENTS_SYNC = True
+    users = make_users(12)
+    Enrollment.objects.create(user=users[0], course=course)
+
+    user_ids = [str(user.pk) for user in users] + [str(users[1].pk)]
+    stray = User(username="gone", email="gone@example.com")
+    result = EnrollmentService.enroll_cohort(
+        course, user_ids + [stray.pk], batch_size=5
+    )
+
+    # The repeated id lands in a later batch, after it was enrolled
+    assert result == {
+        "enrolled": 11,
+        "already_enrolled": 2,
+        "missing_prerequisites": 0,
+        "unknown_users": 1,
+    }
+    assert Enrollment.objects.filter(course=course).count() == 12
+    # Lazy progress rows, and the first-enrollment bonus despite bulk_create
+    assert not LessonProgress.objects.filter(enrollment__course=course).exists()
+    assert PointActivity.objects.filter(action="First course enrollment").count() == 12
@@ -0,0 +1,99 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.courses.models import Course, Enrollment, Lesson, Section
+from apps.courses.services import ProgressService
+from apps.courses.structure import course_structure
+from apps.gamification.models import PointActivity, UserActionCount
+
+User = get_user_model()
+
+
+def make_course(lesson_count, title="Course"):
+    course = Course.objects.create(
+        title=title, description="", is_published=True, points_reward=50
+    )
+    section = Section.objects.create(
+        course=course, title="Section", order_index=1, is_published=True
+    )
+    for index in range(lesson_count):
+        Lesson.objects.create(
+            section=section,
+            title=f"Lesson {index}",
+            content_type="text",
+            order_index=index,
+            is_published=True,
+        )
+    return course
+
+
+def complete_first_lesson(user, course):
+    Enrollment.objects.create(user=user, course=course)
+    lesson = Lesson.objects.filter(section__course=course).order_by("order_index")[0]
+    lesson = Lesson.objects.select_related("section").get(pk=lesson.pk)
+    with CaptureQueriesContext(connection) as queries:
+        ProgressService.complete_lesson(user, lesson)
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_complete_lesson_queries_do_not_grow_with_course(settings):
+    settings.GAMIFICATION_EVENTS_SYNC = False
+    user = User.objects.create_user(
+        username="learner", email="learner@example.com", password="pass"
+    )
+    small, large = make_course(3, "Small"), make_course(40, "Large")
+    # Warm the structure cache so both runs read the lesson total from it
+    course_structure.get(small.pk)
+    course_structure.get(large.pk)
+
+    assert complete_first_lesson(user, small) == complete_first_lesson(user, large)
+    enrollment = Enrollment.objects.get(user=user, course=large)
+    assert enrollment.progress_percentage == 2.5
+
+
+@pytest.mark.django_db
+def test_structure_cache_follows_lesson_changes(settings):
+    settings.GAMIFICATION_EVENTS_SYNC = False
+    user = User.objects.create_user(
+        username="finisher", email="finisher@example.com", password="pass"
+    )
+    course = make_course(2)
+    assert course_structure.total_lessons(course.pk) == 2
+
+    # Unpublishing a lesson drops it from the denominator
+    lesson = Lesson.objects.filter(section__course=course).order_by("order_index")
+    extra = lesson[1]
+    extra.is_published = False
+    extra.save()
+    assert course_structure.lesson_ids(course.pk) == [lesson[0].pk]
+
+    complete_first_lesson(user, course)
+    enrollment = Enrollment.objects.get(user=user, course=course)
+    assert enrollment.progress_percentage == 100
+    assert enrollment.status == "completed"
+    progress = ProgressService.get_course_progress(enrollment)
+    assert (progress["total_lessons"], progress["completed_lessons"]) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_completion_points_use_a_stable_action_key(settings):
+    settings.GAMIFICATION_EVENTS_SYNC = True
+    user = User.objects.create_user(
+        username="counted", email="counted@example.com", password="pass"
+    )
+    course = make_course(1)
+    Lesson.objects.filter(section__course=course).update(points_reward=10)
+    complete_first_lesson(user, course)
+    # Lesson and course completion share one counter; titles stay descriptions
+    counts = dict(
+        UserActionCount.objects.filter(user=user).values_list("action", "count")
+    )
+    assert counts["earn"] == 2
+    assert not any(action.startswith("Completed") for action in counts)
+    assert set(
+        PointActivity.objects.filter(user=user, action="earn").values_list(
+            "description", flat=True
+        )
+    ) == {"Completed lesson: Lesson 0", "Completed course: Course"}
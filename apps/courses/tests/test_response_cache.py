@@ -0,0 +1,130 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.authorization.models import Permission, Role, UserRole
+from apps.courses.models import Course, CourseCategory, Enrollment, Lesson, Section
+
+User = get_user_model()
+
+
+@pytest.fixture
+def reader_role():
+    role = Role.objects.create(name="Catalog reader")
+    role.permissions.add(
+        *Permission.objects.filter(codename__in=["view_course", "view_sections"])
+    )
+    return role
+
+
+def make_reader(username, role):
+    user = User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="pass"
+    )
+    UserRole.objects.create(user=user, role=role)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return user, client
+
+
+@pytest.fixture
+def course():
+    course = Course.objects.create(title="Cached", description="", is_published=True)
+    section = Section.objects.create(
+        course=course, title="Intro", order_index=1, is_published=True
+    )
+    Lesson.objects.create(
+        section=section, title="Welcome", content_type="text", order_index=1
+    )
+    return course
+
+
+@pytest.mark.django_db
+def test_course_detail_is_shared_with_per_user_overlay(reader_role, course):
+    url = reverse("api:v1:courses:course-detail", args=[course.pk])
+    visitor, visitor_client = make_reader("visitor", reader_role)
+    student, student_client = make_reader("enrolled", reader_role)
+    Enrollment.objects.create(user=student, course=course)
+
+    first = visitor_client.get(url)
+    assert first.status_code == 200
+    assert first.data["is_enrolled"] is False
+    etag = first["ETag"]
+    # A 304 needs neither the body nor the user's enrollment
+    with CaptureQueriesContext(connection) as queries:
+        assert visitor_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert not any("courses_" in q["sql"] for q in queries.captured_queries)
+
+    # Served from the shared entry: only the enrollment overlay is queried
+    with CaptureQueriesContext(connection) as queries:
+        second = student_client.get(url)
+    assert second.data["is_enrolled"] is True
+    assert second.data["title"] == "Cached"
+    assert second["ETag"] != etag
+    course_queries = [
+        q["sql"] for q in queries.captured_queries if "courses_" in q["sql"]
+    ]
+    assert len(course_queries) == 1 and "EXISTS" in course_queries[0]
+
+    # Enrolling retires the visitor's ETag
+    Enrollment.objects.create(user=visitor, course=course)
+    third = visitor_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert third.status_code == 200
+    assert third.data["is_enrolled"] is True
+
+
+@pytest.mark.django_db
+def test_course_changes_retire_cached_responses(reader_role, course):
+    _, client = make_reader("poller", reader_role)
+    list_url = reverse("api:v1:courses:course-list")
+    sections_url = reverse(
+        "api:v1:courses:course-sections-list", kwargs={"course_pk": course.pk}
+    )
+    list_etag = client.get(list_url)["ETag"]
+    sections_etag = client.get(sections_url)["ETag"]
+
+    lesson = Lesson.objects.get(section__course=course)
+    lesson.title = "Welcome back"
+    lesson.save()
+    response = client.get(sections_url, HTTP_IF_NONE_MATCH=sections_etag)
+    assert response.status_code == 200
+    assert response.data["results"][0]["lessons"][0]["title"] == "Welcome back"
+    assert client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code == 304
+
+    course.title = "Renamed"
+    course.save()
+    response = client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == 200
+    assert response.data["results"][0]["title"] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_embedded_prerequisites_and_categories_retire_course_responses(
+    reader_role, course
+):
+    _, client = make_reader("dependent", reader_role)
+    prerequisite = Course.objects.create(
+        title="Basics", description="", is_published=True
+    )
+    course.prerequisites.add(prerequisite)
+    course.category = CourseCategory.objects.create(name="Science")
+    course.save()
+    url = reverse("api:v1:courses:course-detail", args=[course.pk])
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    prerequisite.soft_delete()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["prerequisites"] == []
+    etag = response["ETag"]
+
+    category = course.category
+    category.name = "Natural science"
+    category.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["category"]["name"] == "Natural science"
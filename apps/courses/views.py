@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from drf_spectacular.utils import extend_schema
 from drf_spectacular.openapi import OpenApiParameter, OpenApiTypes
@@ -37,6 +38,13 @@ from apps.courses.services import (
     ProgressService,
     EnrollmentService,
 )
+from apps.courses.response_cache import (
+    CATALOG,
+    Overlay,
+    course_responses,
+    course_scope,
+    enrollment_scope,
+)
 from apps.gamification.utils import award_points
 
 # --- CourseCategoryViewSet ---
@@ -66,15 +74,62 @@ class CourseViewSet(viewsets.ModelViewSet):
         "unenroll": "enroll_course",
         "my_courses": "view_course",
         "progress": "view_course",
+        "enroll_cohort": "manage_courses",
     }
 
+    def get_queryset(self):
+        queryset = (
+            super().get_queryset().select_related("instructor", "category").with_stats()
+        )
+        if self.action == "list":
+            return queryset
+        return queryset.prefetch_related("prerequisites").with_enrollment_flag(
+            self.request.user
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return CourseListSerializer
         return CourseSerializer
 
+    def list(self, request, *args, **kwargs):
+        return course_responses.respond(
+            request, CATALOG, "list", lambda: super(CourseViewSet, self).list(request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        course_id = course_scope(kwargs.get("pk"))
+        if course_id is None:
+            return super().retrieve(request, *args, **kwargs)
+        return course_responses.respond(
+            request,
+            course_id,
+            "detail",
+            lambda: super(CourseViewSet, self).retrieve(request, *args, **kwargs),
+            overlay=Overlay(
+                ("is_enrolled",),
+                enrollment_scope(request.user.pk),
+                lambda: {"is_enrolled": self._is_enrolled(course_id)},
+            ),
+        )
+
+    def _is_enrolled(self, course_id):
+        # The same annotation the rendered body carries
+        return bool(
+            Course.objects.filter(pk=course_id)
+            .with_enrollment_flag(self.request.user)
+            .values_list("is_enrolled", flat=True)
+            .first()
+        )
+
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action in [
+            "create",
+            "update",
+            "partial_update",
+            "destroy",
+            "enroll_cohort",
+        ]:
             return [
                 IsAuthenticated(),
                 DynamicPermissionRequired(self.permission_required_map[self.action]),
@@ -92,6 +147,26 @@ class CourseViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=["post"])
+    def enroll_cohort(self, request, pk=None):
+        # Corporate onboarding: enroll a list of users in one batched call
+        course = self.get_object()
+        user_ids = request.data.get("user_ids")
+        if not isinstance(user_ids, list) or not user_ids:
+            return Response(
+                {"detail": "user_ids must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            result = EnrollmentService.enroll_cohort(
+                course,
+                user_ids,
+                materialize_progress=bool(request.data.get("materialize_progress")),
+            )
+        except ValidationError as e:
+            return Response({"detail": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def unenroll(self, request, pk=None):
         course = self.get_object()
@@ -144,7 +219,31 @@ class SectionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         course_id = self.kwargs.get("course_pk")
-        return Section.objects.filter(course_id=course_id, is_deleted=False)
+        return Section.objects.filter(
+            course_id=course_id, is_deleted=False
+        ).prefetch_related("lessons")
+
+    def list(self, request, *args, **kwargs):
+        course_id = course_scope(kwargs.get("course_pk"))
+        if course_id is None:
+            return super().list(request, *args, **kwargs)
+        return course_responses.respond(
+            request,
+            course_id,
+            "sections",
+            lambda: super(SectionViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        course_id = course_scope(kwargs.get("course_pk"))
+        if course_id is None:
+            return super().retrieve(request, *args, **kwargs)
+        return course_responses.respond(
+            request,
+            course_id,
+            "section",
+            lambda: super(SectionViewSet, self).retrieve(request, *args, **kwargs),
+        )
 
     def perform_create(self, serializer):
         course_id = self.kwargs.get("course_pk")
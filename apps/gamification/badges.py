@@ -0,0 +1,93 @@
+from collections import defaultdict
+from itertools import islice
+
+from .criteria import CriteriaRegistry
+from .models import Badge, UserBadge
+from .snapshots import ProcessSnapshot
+
+# Criteria keys whose inputs change whenever points are awarded
+AWARD_CRITERIA_KEYS = ("points", "level", "actions", "time")
+
+
+class BadgeIndex(ProcessSnapshot):
+    """
+    In-process index of the badge catalog keyed by the criteria each badge
+    depends on (``points``, ``actions``, ``streak``, ...).
+
+    Badges whose criteria reference no registered evaluator are always
+    satisfied, so they are candidates for every event.
+    """
+
+    def build(self):
+        by_key = defaultdict(list)
+        unconditional = []
+        badges = list(Badge.objects.only("id", "name", "criteria"))
+        for badge in badges:
+            keys = [
+                key
+                for key in (badge.criteria or {})
+                if CriteriaRegistry.is_registered(key)
+            ]
+            if not keys:
+                unconditional.append(badge)
+            for key in keys:
+                by_key[key].append(badge)
+        return badges, dict(by_key), unconditional
+
+    def candidates(self, changed=None):
+        """
+        Return the badges that may become attainable when the inputs for
+        the given criteria keys change. ``changed=None`` means every badge.
+        """
+        badges, by_key, unconditional = self.load()
+        if changed is None:
+            return badges
+        seen = {}
+        for badge in unconditional:
+            seen[badge.pk] = badge
+        for key in changed:
+            for badge in by_key.get(key, ()):
+                seen[badge.pk] = badge
+        return list(seen.values())
+
+
+badge_index = BadgeIndex()
+
+
+def award_badges_bulk(user_ids, changed=None, batch_size=1000):
+    """
+    Award newly attainable badges to many users at once.
+
+    Users are processed in batches; per batch this costs one query for the
+    badges already owned, one grouped query per criterion of each candidate
+    badge, and one ``bulk_create``. Returns the number of badges awarded.
+    """
+    candidates = badge_index.candidates(changed)
+    if not candidates:
+        return 0
+    user_ids = iter(user_ids)
+    awarded = 0
+    while True:
+        batch = list(islice(user_ids, batch_size))
+        if not batch:
+            break
+        owned = set(
+            UserBadge.objects.filter(
+                user_id__in=batch, badge_id__in=[badge.pk for badge in candidates]
+            ).values_list("user_id", "badge_id")
+        )
+        new_badges = []
+        for badge in candidates:
+            eligible = [
+                user_id for user_id in batch if (user_id, badge.pk) not in owned
+            ]
+            if not eligible:
+                continue
+            for user_id in CriteriaRegistry.evaluate_criteria_bulk(
+                eligible, badge.criteria or {}
+            ):
+                new_badges.append(UserBadge(user_id=user_id, badge_id=badge.pk))
+        if new_badges:
+            UserBadge.objects.bulk_create(new_badges, ignore_conflicts=True)
+            awarded += len(new_badges)
+    return awarded
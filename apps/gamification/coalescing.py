@@ -0,0 +1,182 @@
+import logging
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "gamification:social:buffer"
+STATS_KEY = "gamification:social:stats"
+STAT_NAMES = ("buffered", "flushed", "dropped")
+
+
+class InMemoryCoalesceBackend:
+    """Process-local buffer for tests and single-process development."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = Counter()
+        self._stats = Counter()
+
+    def add(self, field, count=1):
+        with self._lock:
+            self._buffer[field] += count
+            self._stats["buffered"] += count
+
+    def drain(self):
+        with self._lock:
+            drained, self._buffer = dict(self._buffer), Counter()
+            return drained
+
+    def incr_stat(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def stats(self):
+        return {name: self._stats[name] for name in STAT_NAMES}
+
+
+class RedisCoalesceBackend:
+    """
+    Buffer held in one Redis hash of ``user|action`` -> count. Draining
+    renames the hash first, so events buffered during a flush land in a
+    fresh hash and are never lost or counted twice.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def client(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self.alias)
+
+    def add(self, field, count=1):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(BUFFER_KEY, field, count)
+        pipe.hincrby(STATS_KEY, "buffered", count)
+        pipe.execute()
+
+    def drain(self):
+        from redis.exceptions import ResponseError
+
+        client = self.client
+        draining = f"{BUFFER_KEY}:draining:{uuid.uuid4().hex}"
+        try:
+            client.rename(BUFFER_KEY, draining)
+        except ResponseError:
+            # Nothing buffered
+            return {}
+        pipe = client.pipeline()
+        pipe.hgetall(draining)
+        pipe.delete(draining)
+        drained, _ = pipe.execute()
+        return {
+            (field.decode() if isinstance(field, bytes) else field): int(count)
+            for field, count in drained.items()
+        }
+
+    def incr_stat(self, name, count=1):
+        self.client.hincrby(STATS_KEY, name, count)
+
+    def stats(self):
+        raw = self.client.hgetall(STATS_KEY)
+        values = {
+            (key.decode() if isinstance(key, bytes) else key): int(value)
+            for key, value in raw.items()
+        }
+        return {name: values.get(name, 0) for name in STAT_NAMES}
+
+
+class SocialCoalescer:
+    """
+    Buffers high-frequency social point events per (user, action) and
+    flushes them periodically as one aggregated ledger entry each, so a
+    burst of likes costs the author one profile update per window instead
+    of one per like.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if getattr(settings, "GAMIFICATION_COALESCE_BACKEND", "redis") == "memory":
+                self._backend = InMemoryCoalesceBackend()
+            else:
+                self._backend = RedisCoalesceBackend(
+                    getattr(settings, "GAMIFICATION_RANK_CACHE_ALIAS", "redis")
+                )
+        return self._backend
+
+    def buffer(self, user_id, action_type):
+        """
+        Buffer one social action after the current transaction commits
+        (immediately with ``GAMIFICATION_EVENTS_SYNC``). Actions that award
+        no points are only counted as dropped.
+        """
+        from .events import social_points
+
+        if user_id is None:
+            return
+        if social_points(action_type) <= 0:
+            self._on_commit(lambda: self._incr_stat("dropped"))
+            return
+        field = f"{user_id}|{action_type}"
+        self._on_commit(lambda: self._add(field))
+
+    @staticmethod
+    def _on_commit(func):
+        if getattr(settings, "GAMIFICATION_EVENTS_SYNC", False):
+            func()
+        else:
+            transaction.on_commit(func)
+
+    def _add(self, field):
+        try:
+            self.backend.add(field)
+        except Exception as e:
+            logger.error(f"Failed to buffer social event {field}: {e}", exc_info=True)
+
+    def _incr_stat(self, name, count=1):
+        try:
+            self.backend.incr_stat(name, count)
+        except Exception as e:
+            logger.error(f"Failed to update social buffer stats: {e}", exc_info=True)
+
+    def flush(self):
+        """
+        Apply everything buffered since the last flush through the event
+        processor: one aggregated social event per (user, action), one
+        badge check per user. Returns the number of events flushed.
+        """
+        from .events import make_event, process_events
+
+        drained = self.backend.drain()
+        if not drained:
+            return 0
+        events = []
+        for field, count in drained.items():
+            user_id, action_type = field.split("|", 1)
+            events.append(
+                make_event(user_id, "social", action_type=action_type, count=count)
+            )
+        applied = process_events(events)
+        flushed = sum(event["count"] for event in applied)
+        self._incr_stat("flushed", flushed)
+        # Events for deleted users or failed awards
+        dropped = sum(drained.values()) - flushed
+        if dropped:
+            self._incr_stat("dropped", dropped)
+        return flushed
+
+    def stats(self):
+        return self.backend.stats()
+
+
+social_coalescer = SocialCoalescer()
@@ -6,21 +6,67 @@ class CriteriaEvaluator(ABC):
     def evaluate(self, user, profile, criteria_data):
         pass
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        """
+        Return the subset of ``user_ids`` that satisfy ``criteria_data``.
+
+        Subclasses override this with a single grouped query; the default
+        falls back to the per-user ``evaluate``.
+        """
+        from django.contrib.auth import get_user_model
+        from apps.gamification.models import UserPointProfile
+
+        profiles = {
+            profile.user_id: profile
+            for profile in UserPointProfile.objects.filter(
+                user_id__in=user_ids
+            ).select_related("current_level")
+        }
+        users = get_user_model().objects.filter(id__in=profiles)
+        return {
+            user.id
+            for user in users
+            if self.evaluate(user, profiles[user.id], criteria_data)
+        }
+
 
 class PointsCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
         min_points = criteria_data.get("min_points", 0)
         return profile.total_points >= min_points
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserPointProfile
+
+        min_points = criteria_data.get("min_points", 0)
+        return set(
+            UserPointProfile.objects.filter(
+                user_id__in=user_ids, total_points__gte=min_points
+            ).values_list("user_id", flat=True)
+        )
+
 
 class ActionsCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
         # Example: {'action': 'complete_lesson', 'count': 10}
-        from apps.gamification.models import PointActivity
+        from apps.gamification.stats import get_action_count
 
         action = criteria_data.get("action")
         count = criteria_data.get("count", 1)
-        return PointActivity.objects.filter(user=user, action=action).count() >= count
+        return get_action_count(user, action) >= count
+
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserActionCount
+
+        action = criteria_data.get("action")
+        count = criteria_data.get("count", 1)
+        if count <= 0:
+            return set(user_ids)
+        return set(
+            UserActionCount.objects.filter(
+                user_id__in=user_ids, action=action, count__gte=count
+            ).values_list("user_id", flat=True)
+        )
 
 
 class StreakCriteriaEvaluator(CriteriaEvaluator):
@@ -32,6 +78,19 @@ class StreakCriteriaEvaluator(CriteriaEvaluator):
         streak = Streak.objects.filter(user=user, streak_type=streak_type).first()
         return streak and streak.current_count >= min_streak
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import Streak
+
+        streak_type = criteria_data.get("streak_type", "login")
+        min_streak = criteria_data.get("min_streak", 1)
+        return set(
+            Streak.objects.filter(
+                user_id__in=user_ids,
+                streak_type=streak_type,
+                current_count__gte=min_streak,
+            ).values_list("user_id", flat=True)
+        )
+
 
 class QuestCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
@@ -42,29 +101,57 @@ class QuestCriteriaEvaluator(CriteriaEvaluator):
             user=user, quest_id=quest_id, is_completed=True
         ).exists()
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserQuest
+
+        quest_id = criteria_data.get("quest_id")
+        return set(
+            UserQuest.objects.filter(
+                user_id__in=user_ids, quest_id=quest_id, is_completed=True
+            ).values_list("user_id", flat=True)
+        )
+
 
 class SpendingCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
-        from apps.gamification.models import PointLedger
+        from apps.gamification.stats import get_activity_stats
 
         min_spent = criteria_data.get("min_spent", 0)
-        spent = (
-            PointLedger.objects.filter(user=user, transaction_type="spend").aggregate(
-                total=models.Sum("points")
-            )["total"]
-            or 0
+        stats = get_activity_stats(user)
+        return (stats.total_spent if stats else 0) >= min_spent
+
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserActivityStats
+
+        min_spent = criteria_data.get("min_spent", 0)
+        if min_spent <= 0:
+            return set(user_ids)
+        return set(
+            UserActivityStats.objects.filter(
+                user_id__in=user_ids, total_spent__gte=min_spent
+            ).values_list("user_id", flat=True)
         )
-        return abs(spent) >= min_spent
 
 
 class SocialCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
         # Example: {'reviews': 5, 'helpful_votes': 10}
-        from apps.courses.models import CourseReview
+        from apps.gamification.stats import get_activity_stats
+
+        reviews = criteria_data.get("reviews", 0)
+        stats = get_activity_stats(user)
+        return (stats.published_review_count if stats else 0) >= reviews
+
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserActivityStats
 
         reviews = criteria_data.get("reviews", 0)
-        return (
-            CourseReview.objects.filter(user=user, is_published=True).count() >= reviews
+        if reviews <= 0:
+            return set(user_ids)
+        return set(
+            UserActivityStats.objects.filter(
+                user_id__in=user_ids, published_review_count__gte=reviews
+            ).values_list("user_id", flat=True)
         )
 
 
@@ -73,6 +160,16 @@ class LevelCriteriaEvaluator(CriteriaEvaluator):
         min_level = criteria_data.get("min_level", 1)
         return profile.current_level and profile.current_level.number >= min_level
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from apps.gamification.models import UserPointProfile
+
+        min_level = criteria_data.get("min_level", 1)
+        return set(
+            UserPointProfile.objects.filter(
+                user_id__in=user_ids, current_level__number__gte=min_level
+            ).values_list("user_id", flat=True)
+        )
+
 
 class TimeCriteriaEvaluator(CriteriaEvaluator):
     def evaluate(self, user, profile, criteria_data):
@@ -84,6 +181,18 @@ class TimeCriteriaEvaluator(CriteriaEvaluator):
             return days >= min_days
         return False
 
+    def evaluate_bulk(self, user_ids, criteria_data):
+        from django.contrib.auth import get_user_model
+        from django.utils import timezone
+
+        min_days = criteria_data.get("min_days", 0)
+        cutoff = timezone.now().date() - timezone.timedelta(days=min_days)
+        return set(
+            get_user_model()
+            .objects.filter(id__in=user_ids, date_joined__date__lte=cutoff)
+            .values_list("id", flat=True)
+        )
+
 
 class CriteriaRegistry:
     _registry = {}
@@ -92,6 +201,10 @@ class CriteriaRegistry:
     def register_evaluator(cls, key, evaluator):
         cls._registry[key] = evaluator
 
+    @classmethod
+    def is_registered(cls, key):
+        return key in cls._registry
+
     @classmethod
     def evaluate_criteria(cls, user, profile, criteria):
         # criteria: dict, e.g. {'points': {...}, 'streak': {...}}
@@ -101,6 +214,21 @@ class CriteriaRegistry:
                 return False
         return True
 
+    @classmethod
+    def evaluate_criteria_bulk(cls, user_ids, criteria):
+        """
+        Return the subset of ``user_ids`` meeting every criterion. Each
+        evaluator only sees the users that passed the previous ones.
+        """
+        remaining = set(user_ids)
+        for key, data in criteria.items():
+            if not remaining:
+                break
+            evaluator = cls._registry.get(key)
+            if evaluator:
+                remaining &= evaluator.evaluate_bulk(remaining, data)
+        return remaining
+
 
 # Register evaluators
 CriteriaRegistry.register_evaluator("points", PointsCriteriaEvaluator())
@@ -0,0 +1,206 @@
+import logging
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .ledger import retry_on_conflict
+
+logger = logging.getLogger(__name__)
+
+# Points per social action type; unlisted action types award nothing
+SOCIAL_POINTS = {
+    "comment": 3,
+    "like": 1,
+    "share": 5,
+    "referral": 10,
+    "discussion": 10,
+    "solution": 5,
+    "follower": 3,
+}
+
+
+def social_points(action_type):
+    """Points for one social action."""
+    return SOCIAL_POINTS.get(action_type, 0)
+
+
+class EventRegistry:
+    """
+    Handlers for gamification events, keyed by event type. A handler
+    receives the user and the event payload and returns the badge criteria
+    keys whose inputs it changed.
+    """
+
+    _registry = {}
+
+    @classmethod
+    def register(cls, event_type):
+        def decorator(handler):
+            cls._registry[event_type] = handler
+            return handler
+
+        return decorator
+
+    @classmethod
+    def get(cls, event_type):
+        return cls._registry.get(event_type)
+
+
+def emit(user_id, event_type, **payload):
+    """Queue one gamification event; see ``emit_many``."""
+    emit_many([make_event(user_id, event_type, **payload)])
+
+
+def make_event(user_id, event_type, **payload):
+    """Build a compact, JSON-serializable event; None without a user."""
+    if user_id is None:
+        return None
+    return {"user": str(user_id), "type": event_type, **payload}
+
+
+def social_event(user_id, action_type, target=None):
+    """
+    Event for a social action, or None when the action type awards no
+    points, so such actions never queue any work.
+    """
+    if social_points(action_type) <= 0:
+        return None
+    return make_event(
+        user_id,
+        "social",
+        action_type=action_type,
+        reference_type=f"social:{action_type}",
+        reference_id=str(target.pk) if target is not None else None,
+    )
+
+
+def emit_many(events):
+    """
+    Queue gamification events to be processed once the current transaction
+    commits, so requests do no ledger or badge work inline and rolled-back
+    work awards nothing. With ``GAMIFICATION_EVENTS_SYNC`` the events are
+    processed immediately instead, which keeps tests deterministic.
+    """
+    events = [event for event in events if event is not None]
+    if not events:
+        return
+    if getattr(settings, "GAMIFICATION_EVENTS_SYNC", False):
+        process_events(events)
+        return
+    from .tasks import process_gamification_events
+
+    transaction.on_commit(lambda: process_gamification_events.delay(events))
+
+
+@retry_on_conflict
+def apply_event(handler, user, event):
+    """
+    Run one event handler in its own transaction. This is the outermost
+    transaction for the ledger writes, so conflicts are retried here.
+    """
+    with transaction.atomic():
+        return handler(user, event)
+
+
+def process_events(events):
+    """
+    Apply a batch of events grouped per user: each user's events run in
+    order, followed by a single badge check over everything they changed.
+    Returns the events that were applied.
+    """
+    from .utils import check_and_award_badges
+
+    by_user = OrderedDict()
+    for event in events:
+        by_user.setdefault(event["user"], []).append(event)
+    User = get_user_model()
+    users = User.objects.in_bulk([User._meta.pk.to_python(u) for u in by_user])
+    applied = []
+    for user_id, user_events in by_user.items():
+        user = users.get(User._meta.pk.to_python(user_id))
+        if user is None:
+            continue
+        changed = set()
+        for event in user_events:
+            handler = EventRegistry.get(event["type"])
+            if handler is None:
+                logger.warning(f"Unknown gamification event type: {event['type']}")
+                continue
+            try:
+                changed.update(apply_event(handler, user, event) or ())
+                applied.append(event)
+            except Exception as e:
+                logger.error(
+                    f"Failed to apply gamification event {event}: {e}", exc_info=True
+                )
+        if changed:
+            try:
+                check_and_award_badges(user, changed=tuple(sorted(changed)))
+            except Exception as e:
+                logger.error(
+                    f"Badge check failed for user {user_id}: {e}", exc_info=True
+                )
+    return applied
+
+
+@EventRegistry.register("points")
+def handle_points(user, event):
+    from .badges import AWARD_CRITERIA_KEYS
+    from .utils import award_points
+
+    if event.get("points", 0) <= 0:
+        return ()
+    award_points(
+        user,
+        event["points"],
+        event["action"],
+        description=event.get("description", ""),
+        reference_type=event.get("reference_type"),
+        reference_id=event.get("reference_id"),
+        check_badges=False,
+        event_count=event.get("event_count", 1),
+    )
+    return AWARD_CRITERIA_KEYS
+
+
+@EventRegistry.register("social")
+def handle_social(user, event):
+    # Coalesced events carry the number of actions they stand for
+    count = event.get("count", 1)
+    points = social_points(event["action_type"]) * count
+    if points <= 0:
+        return ()
+    return handle_points(
+        user,
+        {
+            "points": points,
+            "action": f"Social action: {event['action_type']}",
+            "description": f"{count} x {event['action_type']}" if count > 1 else "",
+            "reference_type": event.get("reference_type"),
+            "reference_id": event.get("reference_id"),
+            "event_count": count,
+        },
+    )
+
+
+@EventRegistry.register("login")
+def handle_login(user, event):
+    from .streaks import record_login
+
+    day = event.get("day")
+    record_login(user, today=date.fromisoformat(day) if day else None)
+    return ()
+
+
+@EventRegistry.register("review")
+def handle_review(user, event):
+    from .stats import refresh_review_count
+
+    refresh_review_count(user.pk)
+    changed = {"social"}
+    if event.get("points"):
+        changed.update(handle_points(user, event))
+    return changed
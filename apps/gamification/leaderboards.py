@@ -0,0 +1,202 @@
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import F, Max, Sum, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+from .models import Leaderboard, PointActivity
+
+PERIOD_TYPES = ("daily", "weekly", "monthly", "all_time")
+ALL_TIME_START = date(1970, 1, 1)
+ALL_TIME_END = date(9999, 12, 31)
+# Activities committed while a refresh was running are picked up by the next
+# run, which re-reads this much history before the previous refresh.
+REFRESH_OVERLAP = timedelta(minutes=10)
+UPSERT_BATCH_SIZE = 5000
+
+
+def period_bounds(period_type, day):
+    """Return the (start, end) dates of the period containing ``day``."""
+    if period_type == "daily":
+        return day, day
+    if period_type == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period_type == "monthly":
+        last_day = calendar.monthrange(day.year, day.month)[1]
+        return day.replace(day=1), day.replace(day=last_day)
+    if period_type == "all_time":
+        return ALL_TIME_START, ALL_TIME_END
+    raise ValueError(f"Unknown leaderboard period: {period_type}")
+
+
+def current_period_bounds(period_type):
+    return period_bounds(period_type, timezone.localdate())
+
+
+def _period_range(start, end):
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.combine(start, time.min), tz)
+    if end >= ALL_TIME_END:
+        return lower, None
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    return lower, upper
+
+
+def ranked_earnings(start, end):
+    """
+    Per-user earned points in the period, ranked with a window function in
+    a single grouped query.
+    """
+    lower, upper = _period_range(start, end)
+    activities = PointActivity.objects.filter(
+        transaction_type="earn", timestamp__gte=lower
+    )
+    if upper is not None:
+        activities = activities.filter(timestamp__lt=upper)
+    return (
+        activities.values("user_id")
+        .annotate(points_earned=Sum("points"))
+        .annotate(rank=Window(expression=Rank(), order_by=F("points_earned").desc()))
+        .order_by("rank")
+    )
+
+
+def _leaderboard_rows(period_type, start, end, ranked):
+    return [
+        Leaderboard(
+            user_id=row["user_id"],
+            period_type=period_type,
+            period_start=start,
+            period_end=end,
+            points_earned=row["points_earned"] or 0,
+            rank=row.get("rank", 0),
+        )
+        for row in ranked
+    ]
+
+
+def _upsert(rows, update_fields):
+    Leaderboard.objects.bulk_create(
+        rows,
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["user", "period_type", "period_start"],
+        update_fields=update_fields,
+    )
+
+
+def refresh_period(period_type, day=None):
+    """
+    Recompute one leaderboard period, upsert its rows in bulk, delete rows
+    of users who no longer rank in it and merge the totals into the
+    real-time rank index. Returns the number of rows written.
+    """
+    from .ranking import rank_service
+
+    start, end = period_bounds(period_type, day or timezone.localdate())
+    started = timezone.now()
+    rows = _leaderboard_rows(period_type, start, end, ranked_earnings(start, end))
+    _upsert(rows, ["points_earned", "rank", "period_end", "updated_at"])
+    # Every row still ranked was just upserted, so older rows have dropped out
+    stale = Leaderboard.objects.filter(
+        period_type=period_type, period_start=start, updated_at__lt=started
+    )
+    dropped = list(stale.values_list("user_id", flat=True))
+    if dropped:
+        stale.delete()
+        rank_service.drop_from_period(period_type, start, dropped)
+    rank_service.sync_period(
+        period_type, start, {row.user_id: row.points_earned for row in rows}
+    )
+    return len(rows)
+
+
+def refresh_all_time(since):
+    """
+    Bring the all-time period up to date without re-aggregating its whole
+    history: only users with earnings after ``since`` have their totals
+    recomputed, then the (one row per user) table is re-ranked and only
+    changed ranks are written. Totals are recomputed rather than
+    incremented, so re-reading the refresh overlap never double counts.
+    Without a previous refresh the period is rebuilt in full.
+    """
+    from .ranking import rank_service
+
+    if since is None:
+        return refresh_period("all_time")
+    user_ids = list(
+        PointActivity.objects.filter(transaction_type="earn", timestamp__gte=since)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    rows = []
+    for offset in range(0, len(user_ids), UPSERT_BATCH_SIZE):
+        totals = (
+            PointActivity.objects.filter(
+                transaction_type="earn",
+                user_id__in=user_ids[offset : offset + UPSERT_BATCH_SIZE],
+            )
+            .values("user_id")
+            .annotate(points_earned=Sum("points"))
+        )
+        rows += _leaderboard_rows("all_time", ALL_TIME_START, ALL_TIME_END, totals)
+    if not rows:
+        return 0
+    _upsert(rows, ["points_earned", "period_end", "updated_at"])
+    ranked = Leaderboard.objects.filter(
+        period_type="all_time", period_start=ALL_TIME_START
+    ).annotate(new_rank=Window(expression=Rank(), order_by=F("points_earned").desc()))
+    changed = []
+    for entry in ranked.only("id", "rank", "points_earned"):
+        if entry.rank != entry.new_rank:
+            entry.rank = entry.new_rank
+            changed.append(entry)
+    Leaderboard.objects.bulk_update(changed, ["rank"], batch_size=UPSERT_BATCH_SIZE)
+    rank_service.sync_period(
+        "all_time", ALL_TIME_START, {row.user_id: row.points_earned for row in rows}
+    )
+    return len(rows)
+
+
+def touched_periods(since=None):
+    """
+    Return the set of (period_type, period_start) pairs with earnings after
+    ``since``. Without a previous refresh only the current periods are
+    considered.
+    """
+    if since is None:
+        days = [timezone.localdate()]
+    else:
+        days = PointActivity.objects.filter(
+            transaction_type="earn", timestamp__gte=since
+        ).dates("timestamp", "day")
+    periods = set()
+    for day in days:
+        for period_type in PERIOD_TYPES:
+            periods.add((period_type, period_bounds(period_type, day)[0]))
+    return periods
+
+
+def refresh_touched_periods():
+    """
+    Incrementally refresh only the periods that received earnings since
+    the last refresh. Returns a mapping of period_type to rows written.
+    """
+    last_refresh = Leaderboard.objects.aggregate(last=Max("updated_at"))["last"]
+    since = last_refresh - REFRESH_OVERLAP if last_refresh else None
+    written = {period_type: 0 for period_type in PERIOD_TYPES}
+    for period_type, start in sorted(touched_periods(since)):
+        if period_type == "all_time":
+            written[period_type] += refresh_all_time(since)
+        else:
+            written[period_type] += refresh_period(period_type, start)
+    return written
+
+
+def get_user_rank(user, period_type, day=None):
+    start, _ = period_bounds(period_type, day or timezone.localdate())
+    return Leaderboard.objects.filter(
+        user=user, period_type=period_type, period_start=start
+    ).first()
@@ -0,0 +1,254 @@
+import functools
+import logging
+import random
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    PointBalanceSnapshot,
+    PointLedger,
+    PointLedgerArchive,
+    UserPointProfile,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 1000
+# SQLSTATEs for serialization failures and deadlocks; the transaction can
+# simply be run again
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.05
+ARCHIVED_FIELDS = (
+    "user_id",
+    "seq",
+    "transaction_type",
+    "points",
+    "balance_after",
+    "reference_type",
+    "reference_id",
+    "description",
+    "event_count",
+    "created_at",
+)
+
+
+def is_retryable(exc):
+    cause = exc.__cause__
+    sqlstate = getattr(cause, "pgcode", None) or getattr(
+        getattr(cause, "diag", None), "sqlstate", None
+    )
+    return sqlstate in RETRYABLE_SQLSTATES
+
+
+def retry_on_conflict(func=None, attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF):
+    """
+    Re-run a transactional function after a serialization failure or
+    deadlock, with jittered exponential backoff. Inside an outer atomic
+    block the whole transaction is doomed, so the error is re-raised for
+    the outermost caller to handle; apply it where that transaction starts
+    (``events.apply_event``, ``PurchaseService``).
+    """
+    if func is None:
+        return functools.partial(retry_on_conflict, attempts=attempts, backoff=backoff)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (
+                    attempt == attempts
+                    or connection.in_atomic_block
+                    or not is_retryable(exc)
+                ):
+                    raise
+                logger.warning(
+                    f"Retrying {func.__name__} after conflict "
+                    f"(attempt {attempt}/{attempts}): {exc}"
+                )
+                time.sleep(backoff * 2 ** (attempt - 1) * (1 + random.random()))
+
+    return wrapper
+
+
+def find_entry(user_id, transaction_type, reference_type, reference_id):
+    """
+    Return the ledger entry already recorded for an idempotency key, i.e.
+    a (reference_type, reference_id) pair, live or archived. Unreferenced
+    entries never match.
+    """
+    if not reference_id:
+        return None
+    key = {
+        "user_id": user_id,
+        "transaction_type": transaction_type,
+        "reference_type": reference_type or "",
+        "reference_id": reference_id,
+    }
+    # Archiving moves an entry in one transaction, so if the live lookup
+    # misses it the archive lookup sees it
+    return (
+        PointLedger.objects.filter(**key).first()
+        or PointLedgerArchive.objects.filter(**key).first()
+    )
+
+
+def referenced_users(user_ids, transaction_type, reference_type, reference_id):
+    """The subset of ``user_ids`` already holding a live or archived entry."""
+    key = {
+        "user_id__in": user_ids,
+        "transaction_type": transaction_type,
+        "reference_type": reference_type or "",
+        "reference_id": reference_id,
+    }
+    return set(
+        PointLedger.objects.filter(**key).values_list("user_id", flat=True)
+    ) | set(PointLedgerArchive.objects.filter(**key).values_list("user_id", flat=True))
+
+
+def append_entry(
+    profile,
+    transaction_type,
+    points,
+    reference_type="",
+    reference_id="",
+    description="",
+    event_count=1,
+):
+    """
+    Append the next ledger entry for a point profile locked by the caller.
+
+    ``profile.available_points`` must already include ``points``; the
+    caller saves ``ledger_seq`` together with the balance.
+    """
+    profile.ledger_seq += 1
+    return PointLedger.objects.create(
+        user_id=profile.user_id,
+        seq=profile.ledger_seq,
+        transaction_type=transaction_type,
+        points=points,
+        balance_after=profile.available_points,
+        reference_type=reference_type or "",
+        reference_id=reference_id or "",
+        description=description,
+        event_count=event_count,
+    )
+
+
+def latest_snapshot(user_id):
+    return PointBalanceSnapshot.objects.filter(user_id=user_id).order_by("-seq").first()
+
+
+def ledger_balance(user_id):
+    """
+    Balance from the latest snapshot plus the entries appended after it,
+    so the cost grows with the entries since the snapshot, not the history.
+    """
+    snapshot = latest_snapshot(user_id)
+    entries = PointLedger.objects.filter(user_id=user_id)
+    if snapshot is not None:
+        entries = entries.filter(seq__gt=snapshot.seq)
+    delta = entries.aggregate(total=Sum("points"))["total"] or 0
+    return (snapshot.balance if snapshot else 0) + delta
+
+
+def with_ledger_state(profiles):
+    """
+    Annotate profiles with ``snapshot_seq``, ``snapshot_balance`` and
+    ``ledger_balance`` (the balance implied by the ledger up to
+    ``ledger_seq``) in one query.
+    """
+    snapshots = PointBalanceSnapshot.objects.filter(
+        user_id=OuterRef("user_id")
+    ).order_by("-seq")
+    profiles = profiles.annotate(
+        snapshot_seq=Coalesce(Subquery(snapshots.values("seq")[:1]), Value(0)),
+        snapshot_balance=Coalesce(Subquery(snapshots.values("balance")[:1]), Value(0)),
+    )
+    delta = (
+        PointLedger.objects.filter(
+            user_id=OuterRef("user_id"),
+            seq__gt=OuterRef("snapshot_seq"),
+            seq__lte=OuterRef("ledger_seq"),
+        )
+        .order_by()
+        .values("user_id")
+        .annotate(total=Sum("points"))
+        .values("total")
+    )
+    return profiles.annotate(
+        ledger_balance=F("snapshot_balance") + Coalesce(Subquery(delta), Value(0))
+    )
+
+
+def take_snapshots(min_entries=1, batch_size=1000):
+    """
+    Snapshot the balance of every user with at least ``min_entries``
+    ledger entries since their last snapshot. Returns the number written.
+    """
+    profiles = (
+        with_ledger_state(UserPointProfile.objects.all())
+        .filter(ledger_seq__gte=F("snapshot_seq") + min_entries)
+        .order_by("user_id")
+        .values_list("user_id", "ledger_seq", "ledger_balance")
+    )
+    written = 0
+    batch = []
+    for user_id, seq, balance in profiles.iterator(chunk_size=batch_size):
+        batch.append(PointBalanceSnapshot(user_id=user_id, seq=seq, balance=balance))
+        if len(batch) >= batch_size:
+            PointBalanceSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        PointBalanceSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def drifted_profiles():
+    """User ids whose stored balance disagrees with their ledger."""
+    return (
+        with_ledger_state(UserPointProfile.objects.all())
+        .exclude(available_points=F("ledger_balance"))
+        .values_list("user_id", flat=True)
+    )
+
+
+def archive_entries(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move ledger entries created before ``before`` into PointLedgerArchive.
+    Only entries already covered by a balance snapshot are moved, so
+    balances never need the archive. Returns the number archived.
+    """
+    covered = PointBalanceSnapshot.objects.filter(user_id=OuterRef("user_id")).order_by(
+        "-seq"
+    )
+    entries = PointLedger.objects.filter(
+        created_at__lt=before,
+        seq__lte=Subquery(covered.values("seq")[:1]),
+    ).order_by("id")
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(entries.values("id", *ARCHIVED_FIELDS)[:batch_size])
+            if not batch:
+                break
+            PointLedgerArchive.objects.bulk_create(
+                [
+                    PointLedgerArchive(
+                        **{field: row[field] for field in ARCHIVED_FIELDS}
+                    )
+                    for row in batch
+                ],
+                ignore_conflicts=True,
+            )
+            # Queryset deletes skip the post_save counters, which stay intact
+            PointLedger.objects.filter(id__in=[row["id"] for row in batch]).delete()
+        archived += len(batch)
+    return archived
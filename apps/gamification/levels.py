@@ -0,0 +1,41 @@
+import bisect
+
+from .models import Level
+from .snapshots import ProcessSnapshot
+
+
+class LevelTable(ProcessSnapshot):
+    """
+    In-process, sorted view of the Level table.
+
+    Levels change rarely but are consulted on every point award, so the
+    table is loaded once per process and resolved with bisect over
+    ``required_points``.
+    """
+
+    def build(self):
+        levels = list(Level.objects.order_by("required_points", "number"))
+        return levels, [level.required_points for level in levels]
+
+    def levels(self):
+        return self.load()[0]
+
+    def resolve(self, total_points):
+        """
+        Return (current_level, next_level, progress_to_next_level) for a
+        point total without touching the database.
+        """
+        levels, thresholds = self.load()
+        index = bisect.bisect_right(thresholds, total_points)
+        current_level = levels[index - 1] if index > 0 else None
+        next_level = levels[index] if index < len(levels) else None
+        if current_level and next_level:
+            progress = (total_points - current_level.required_points) / (
+                next_level.required_points - current_level.required_points
+            )
+        else:
+            progress = 1.0
+        return current_level, next_level, progress
+
+
+level_table = LevelTable()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.gamification.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild per-user gamification counters (action counts, points spent, "
+        "published reviews) from the activity, ledger and review tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="user_ids",
+            help="Only rebuild counters for this user id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        action_rows, stats_rows = rebuild_user_stats(options["user_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {action_rows} action counters and {stats_rows} stats rows."
+            )
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0003_useractivitystats_useractioncount"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leaderboard",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="leaderboard",
+            index=models.Index(
+                fields=["period_type", "period_start", "rank"],
+                name="gamificatio_period__fbdd1e_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ledger_seq(apps, schema_editor):
+    # Number existing entries per user in creation order and snapshot each
+    # user's last recorded balance so reads start from it
+    PointLedger = apps.get_model("gamification", "PointLedger")
+    UserPointProfile = apps.get_model("gamification", "UserPointProfile")
+    PointBalanceSnapshot = apps.get_model("gamification", "PointBalanceSnapshot")
+    last_entries = {}
+    pending = []
+    seqs = {}
+    for entry in PointLedger.objects.order_by("user_id", "created_at", "id").iterator():
+        seqs[entry.user_id] = seqs.get(entry.user_id, 0) + 1
+        entry.seq = seqs[entry.user_id]
+        last_entries[entry.user_id] = entry
+        pending.append(entry)
+        if len(pending) >= 1000:
+            PointLedger.objects.bulk_update(pending, ["seq"])
+            pending = []
+    if pending:
+        PointLedger.objects.bulk_update(pending, ["seq"])
+    for user_id, seq in seqs.items():
+        UserPointProfile.objects.filter(user_id=user_id).update(ledger_seq=seq)
+    PointBalanceSnapshot.objects.bulk_create(
+        [
+            PointBalanceSnapshot(
+                user_id=user_id, seq=entry.seq, balance=entry.balance_after
+            )
+            for user_id, entry in last_entries.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0004_leaderboard_updated_at_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pointledger",
+            name="seq",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userpointprofile",
+            name="ledger_seq",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterUniqueTogether(
+            name="pointledger",
+            unique_together={("user", "seq")},
+        ),
+        migrations.CreateModel(
+            name="PointBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("seq", models.PositiveBigIntegerField()),
+                ("balance", models.IntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "seq")},
+            },
+        ),
+        migrations.CreateModel(
+            name="PointLedgerArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("seq", models.PositiveBigIntegerField()),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("earn", "Earn"),
+                            ("spend", "Spend"),
+                            ("adjustment", "Adjustment"),
+                            ("refund", "Refund"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("points", models.IntegerField()),
+                ("balance_after", models.IntegerField()),
+                ("reference_type", models.CharField(blank=True, max_length=50)),
+                ("reference_id", models.CharField(blank=True, max_length=50)),
+                ("description", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="gamificatio_created_c4b822_idx"
+                    )
+                ],
+                "unique_together": {("user", "seq")},
+            },
+        ),
+        migrations.RunPython(backfill_ledger_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_duplicate_references(apps, schema_editor):
+    # Earlier code could record the same referenced entry twice (lesson and
+    # course completion were awarded from both a service and a signal). Keep
+    # the first entry of each key and tag the reference type of the rest so
+    # the unique constraint can be created without rewriting balances.
+    PointLedger = apps.get_model("gamification", "PointLedger")
+    duplicates = (
+        PointLedger.objects.exclude(reference_id="")
+        .values("user_id", "reference_type", "reference_id", "transaction_type")
+        .annotate(n=models.Count("id"))
+        .filter(n__gt=1)
+    )
+    for key in duplicates.iterator():
+        key.pop("n")
+        entries = PointLedger.objects.filter(**key).order_by("seq", "id")
+        for entry in entries[1:]:
+            entry.reference_type = f"{entry.reference_type}:duplicate:{entry.seq}"[:50]
+            entry.save(update_fields=["reference_type"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0005_point_ledger_seq_and_snapshots"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_duplicate_references, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="pointledger",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("reference_id", ""), _negated=True),
+                fields=("user", "reference_type", "reference_id", "transaction_type"),
+                name="unique_ledger_reference",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0006_unique_ledger_reference"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pointactivity",
+            name="event_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="pointledger",
+            name="event_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="pointledgerarchive",
+            name="event_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gamification", "0007_event_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pointledgerarchive",
+            index=models.Index(
+                condition=models.Q(("reference_id", ""), _negated=True),
+                fields=["user", "reference_type", "reference_id", "transaction_type"],
+                name="ledger_archive_reference",
+            ),
+        ),
+    ]
@@ -57,16 +57,17 @@ class UserPointProfile(models.Model):
     longest_streak = models.IntegerField(default=0)
     last_login_date = models.DateField(null=True, blank=True)
     consecutive_login_days = models.IntegerField(default=0)
+    # Sequence number of the user's latest PointLedger entry
+    ledger_seq = models.PositiveBigIntegerField(default=0)
 
     def can_spend(self, amount):
         return self.available_points >= amount
 
     def update_available_points(self):
-        # Recalculate from PointLedger
-        balance = (
-            PointLedger.objects.filter(user=self.user).order_by("-created_at").first()
-        )
-        self.available_points = balance.balance_after if balance else 0
+        # Recalculate from the latest snapshot and the PointLedger entries after it
+        from .ledger import ledger_balance
+
+        self.available_points = ledger_balance(self.user_id)
         self.save(update_fields=["available_points"])
 
     def __str__(self):
@@ -90,6 +91,8 @@ class PointActivity(models.Model):
     reference_id = models.CharField(max_length=50, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True)
+    # Number of actions this row stands for; coalesced social events batch many
+    event_count = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return (
@@ -112,12 +115,72 @@ class PointLedger(models.Model):
     reference_id = models.CharField(max_length=50, blank=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Per-user, gap-free and monotonically increasing; see ledger.append_entry
+    seq = models.PositiveBigIntegerField(null=True, blank=True)
+    event_count = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return f"{self.user.email} - {self.transaction_type} {self.points} (bal: {self.balance_after})"
 
     class Meta:
         ordering = ["-created_at"]
+        unique_together = ("user", "seq")
+        constraints = [
+            # Referenced entries double as idempotency keys
+            models.UniqueConstraint(
+                fields=["user", "reference_type", "reference_id", "transaction_type"],
+                condition=~models.Q(reference_id=""),
+                name="unique_ledger_reference",
+            ),
+        ]
+
+
+class PointLedgerArchive(models.Model):
+    """Ledger entries moved out of PointLedger once covered by a snapshot."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    seq = models.PositiveBigIntegerField()
+    transaction_type = models.CharField(
+        max_length=20, choices=PointLedger.TRANSACTION_TYPE_CHOICES
+    )
+    points = models.IntegerField()
+    balance_after = models.IntegerField()
+    reference_type = models.CharField(max_length=50, blank=True)
+    reference_id = models.CharField(max_length=50, blank=True)
+    description = models.TextField(blank=True)
+    event_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "seq")
+        indexes = [
+            models.Index(fields=["created_at"]),
+            # Archived references still count as idempotency keys
+            models.Index(
+                fields=["user", "reference_type", "reference_id", "transaction_type"],
+                condition=~models.Q(reference_id=""),
+                name="ledger_archive_reference",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - #{self.seq} {self.transaction_type} {self.points}"
+
+
+class PointBalanceSnapshot(models.Model):
+    """Balance of a user's ledger up to and including entry ``seq``."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    seq = models.PositiveBigIntegerField()
+    balance = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "seq")
+
+    def __str__(self):
+        return f"{self.user.email} - {self.balance} at #{self.seq}"
 
 
 class Leaderboard(models.Model):
@@ -133,10 +196,14 @@ class Leaderboard(models.Model):
     rank = models.PositiveIntegerField(default=0)
     period_start = models.DateField()
     period_end = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "period_type", "period_start")
         ordering = ["period_type", "-period_start", "rank"]
+        indexes = [
+            models.Index(fields=["period_type", "period_start", "rank"]),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.period_type} #{self.rank} ({self.points_earned} pts)"
@@ -261,3 +328,30 @@ class Event(BaseModel):
 
         now = timezone.now()
         return self.is_active and self.start_date <= now <= self.end_date
+
+
+# --- Per-user aggregate counters backing the badge criteria evaluators ---
+class UserActivityStats(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="activity_stats",
+    )
+    total_spent = models.PositiveIntegerField(default=0)
+    published_review_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.email} - spent {self.total_spent}, {self.published_review_count} reviews"
+
+
+class UserActionCount(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    action = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "action")
+
+    def __str__(self):
+        return f"{self.user.email} - {self.action} x{self.count}"
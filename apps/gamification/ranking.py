@@ -0,0 +1,371 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .leaderboards import PERIOD_TYPES, period_bounds
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "gamification:rank"
+STREAK_KEY = f"{KEY_PREFIX}:streak:login"
+# How long a finished period's sorted set is kept around after it ends
+PERIOD_RETENTION = {
+    "daily": timedelta(days=2),
+    "weekly": timedelta(days=8),
+    "monthly": timedelta(days=35),
+}
+
+
+class InMemoryRankBackend:
+    """
+    Process-local stand-in for the Redis sorted sets, used in tests and
+    single-process development. Ranks are computed by scanning, so it is
+    not meant for large sets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets = defaultdict(dict)
+
+    def incr(self, key, member, amount, ttl=None):
+        self.incr_many(key, [member], amount, ttl)
+
+    def incr_many(self, key, members, amount, ttl=None):
+        with self._lock:
+            scores = self._sets[key]
+            for member in members:
+                scores[member] = scores.get(member, 0) + amount
+
+    def merge_max(self, key, mapping):
+        with self._lock:
+            scores = self._sets[key]
+            for member, score in mapping.items():
+                if score > scores.get(member, float("-inf")):
+                    scores[member] = score
+
+    def set(self, key, member, score):
+        with self._lock:
+            self._sets[key][member] = score
+
+    def remove(self, key, member):
+        with self._lock:
+            self._sets[key].pop(member, None)
+
+    def rank(self, key, member):
+        with self._lock:
+            scores = self._sets.get(key, {})
+            if member not in scores:
+                return None
+            score = scores[member]
+            higher = sum(1 for other in scores.values() if other > score)
+            return higher + 1, score
+
+    def _ordered(self, key):
+        scores = self._sets.get(key, {})
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def range(self, key, start, stop):
+        with self._lock:
+            return self._ordered(key)[start : stop + 1]
+
+    def position(self, key, member):
+        with self._lock:
+            for index, (other, _) in enumerate(self._ordered(key)):
+                if other == member:
+                    return index
+            return None
+
+    def size(self, key):
+        return len(self._sets.get(key, {}))
+
+    def exists(self, key):
+        return key in self._sets
+
+    def mark(self, key, ttl=None):
+        with self._lock:
+            self._sets.setdefault(key, {})
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._sets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+class RedisRankBackend:
+    """
+    Sorted-set backend on the django_redis connection of a cache alias.
+    Every operation is O(log n) in the size of the set. Requires Redis 6.2
+    or later for ``ZADD GT``.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def client(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self.alias)
+
+    def incr(self, key, member, amount, ttl=None):
+        self.incr_many(key, [member], amount, ttl)
+
+    def incr_many(self, key, members, amount, ttl=None):
+        pipe = self.client.pipeline(transaction=False)
+        for member in members:
+            pipe.zincrby(key, amount, member)
+        if ttl:
+            pipe.expire(key, int(ttl.total_seconds()))
+        pipe.execute()
+
+    def merge_max(self, key, mapping):
+        if mapping:
+            self.client.zadd(key, mapping, gt=True)
+
+    def set(self, key, member, score):
+        self.client.zadd(key, {member: score})
+
+    def remove(self, key, member):
+        self.client.zrem(key, member)
+
+    def rank(self, key, member):
+        score = self.client.zscore(key, member)
+        if score is None:
+            return None
+        # Competition ranking, matching RANK() in the materialized table
+        higher = self.client.zcount(key, f"({score}", "+inf")
+        return higher + 1, score
+
+    def range(self, key, start, stop):
+        return [
+            (member.decode() if isinstance(member, bytes) else member, score)
+            for member, score in self.client.zrevrange(
+                key, start, stop, withscores=True
+            )
+        ]
+
+    def position(self, key, member):
+        return self.client.zrevrank(key, member)
+
+    def size(self, key):
+        return self.client.zcard(key)
+
+    def exists(self, key):
+        return bool(self.client.exists(key))
+
+    def delete(self, *keys):
+        self.client.delete(*keys)
+
+    def mark(self, key, ttl=None):
+        if ttl:
+            self.client.set(key, 1, ex=int(ttl.total_seconds()))
+        else:
+            self.client.set(key, 1)
+
+
+class RankService:
+    """
+    Real-time ranks backed by one sorted set per leaderboard period.
+
+    ``award_points`` writes through with ``record_points``; the materialized
+    ``Leaderboard`` table stays the durable source, and a period's set is
+    (re)loaded from it the first time it is read.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if getattr(settings, "GAMIFICATION_RANK_BACKEND", "redis") == "memory":
+                self._backend = InMemoryRankBackend()
+            else:
+                self._backend = RedisRankBackend(
+                    getattr(settings, "GAMIFICATION_RANK_CACHE_ALIAS", "redis")
+                )
+        return self._backend
+
+    @staticmethod
+    def period_key(period_type, day=None):
+        start, _ = period_bounds(period_type, day or timezone.localdate())
+        return f"{KEY_PREFIX}:{period_type}:{start.isoformat()}"
+
+    @staticmethod
+    def period_ttl(period_type, day=None):
+        if period_type not in PERIOD_RETENTION:
+            return None
+        _, end = period_bounds(period_type, day or timezone.localdate())
+        remaining = max(end - timezone.localdate() + timedelta(days=1), timedelta())
+        return remaining + PERIOD_RETENTION[period_type]
+
+    def record_points(self, user_id, points, day=None):
+        """Add earned points to every period containing ``day``."""
+        member = str(user_id)
+        try:
+            for period_type in PERIOD_TYPES:
+                self._ensure_period_loaded(period_type, day)
+                self.backend.incr(
+                    self.period_key(period_type, day),
+                    member,
+                    points,
+                    ttl=self.period_ttl(period_type, day),
+                )
+        except Exception as e:
+            logger.error(f"Failed to record points in rank index: {e}", exc_info=True)
+
+    def record_points_bulk(self, user_ids, points, day=None):
+        """Add the same earned points for many users, one pipeline per period."""
+        members = [str(user_id) for user_id in user_ids]
+        try:
+            for period_type in PERIOD_TYPES:
+                self._ensure_period_loaded(period_type, day)
+                self.backend.incr_many(
+                    self.period_key(period_type, day),
+                    members,
+                    points,
+                    ttl=self.period_ttl(period_type, day),
+                )
+        except Exception as e:
+            logger.error(f"Failed to record points in rank index: {e}", exc_info=True)
+
+    def sync_period(self, period_type, start, scores):
+        """
+        Merge freshly materialized ``{user_id: points}`` for a period into
+        its sorted set, correcting any write-through that was missed.
+        """
+        key = self.period_key(period_type, start)
+        try:
+            self.backend.merge_max(
+                key, {str(user_id): points for user_id, points in scores.items()}
+            )
+            self.backend.mark(f"{key}:loaded", self.period_ttl(period_type, start))
+        except Exception as e:
+            logger.error(f"Failed to sync rank index: {e}", exc_info=True)
+
+    def drop_from_period(self, period_type, start, user_ids):
+        """Remove users who no longer rank in a period from its sorted set."""
+        key = self.period_key(period_type, start)
+        try:
+            for user_id in user_ids:
+                self.backend.remove(key, str(user_id))
+        except Exception as e:
+            logger.error(f"Failed to drop users from rank index: {e}", exc_info=True)
+
+    def record_streak(self, user_id, count):
+        try:
+            if count > 0:
+                self.backend.set(STREAK_KEY, str(user_id), count)
+            else:
+                self.backend.remove(STREAK_KEY, str(user_id))
+        except Exception as e:
+            logger.error(f"Failed to record streak in rank index: {e}", exc_info=True)
+
+    def invalidate_streaks(self):
+        """Drop the streak set after bulk updates; the next read reloads it."""
+        try:
+            self.backend.delete(STREAK_KEY, f"{STREAK_KEY}:loaded")
+        except Exception as e:
+            logger.error(f"Failed to invalidate streak rank index: {e}", exc_info=True)
+
+    def _ensure_loaded(self, key, loader, ttl=None):
+        marker = f"{key}:loaded"
+        if self.backend.exists(marker):
+            return
+        # Scores from the durable table never lower live write-through scores
+        self.backend.merge_max(key, loader())
+        self.backend.mark(marker, ttl)
+
+    def _ensure_period_loaded(self, period_type, day=None):
+        from .models import Leaderboard
+
+        start, _ = period_bounds(period_type, day or timezone.localdate())
+        self._ensure_loaded(
+            self.period_key(period_type, day),
+            lambda: {
+                str(user_id): points
+                for user_id, points in Leaderboard.objects.filter(
+                    period_type=period_type, period_start=start
+                ).values_list("user_id", "points_earned")
+            },
+            self.period_ttl(period_type, day),
+        )
+
+    def _ensure_streaks_loaded(self):
+        from .models import Streak
+
+        self._ensure_loaded(
+            STREAK_KEY,
+            lambda: {
+                str(user_id): count
+                for user_id, count in Streak.objects.filter(
+                    streak_type="login", is_active=True, current_count__gt=0
+                ).values_list("user_id", "current_count")
+            },
+        )
+
+    def _entries(self, key, start, stop):
+        return [
+            {"user_id": member, "rank": None, "score": int(score)}
+            for member, score in self.backend.range(key, start, stop)
+        ]
+
+    def _with_ranks(self, key, entries, offset):
+        # Tied scores share the rank of the first member holding that score
+        previous_score = None
+        rank = None
+        for index, entry in enumerate(entries):
+            if entry["score"] != previous_score:
+                if index == 0 and offset:
+                    rank = self.backend.rank(key, entry["user_id"])[0]
+                else:
+                    rank = offset + index + 1
+                previous_score = entry["score"]
+            entry["rank"] = rank
+        return entries
+
+    def top(self, period_type, limit=10, offset=0):
+        self._ensure_period_loaded(period_type)
+        key = self.period_key(period_type)
+        entries = self._entries(key, offset, offset + limit - 1)
+        return self._with_ranks(key, entries, offset)
+
+    def get_rank(self, user_id, period_type):
+        self._ensure_period_loaded(period_type)
+        key = self.period_key(period_type)
+        result = self.backend.rank(key, str(user_id))
+        if result is None:
+            return None
+        rank, score = result
+        return {
+            "user_id": str(user_id),
+            "rank": rank,
+            "score": int(score),
+            "total": self.backend.size(key),
+        }
+
+    def around(self, user_id, period_type, radius=5):
+        self._ensure_period_loaded(period_type)
+        key = self.period_key(period_type)
+        position = self.backend.position(key, str(user_id))
+        if position is None:
+            return []
+        offset = max(0, position - radius)
+        entries = self._entries(key, offset, position + radius)
+        return self._with_ranks(key, entries, offset)
+
+    def streak_leaders(self, limit=10):
+        self._ensure_streaks_loaded()
+        entries = self._entries(STREAK_KEY, 0, limit - 1)
+        return self._with_ranks(STREAK_KEY, entries, 0)
+
+
+rank_service = RankService()
@@ -330,6 +330,52 @@ class LeaderboardSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class BulkAwardSerializer(serializers.Serializer):
+    """Campaign award: explicit ``user_ids``, or every student of ``course_id``."""
+
+    user_ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False
+    )
+    course_id = serializers.UUIDField(required=False)
+    points = serializers.IntegerField(min_value=1)
+    action = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    reference_type = serializers.CharField(
+        max_length=50, required=False, allow_blank=True, default=""
+    )
+    reference_id = serializers.CharField(
+        max_length=50, required=False, allow_blank=True, default=""
+    )
+
+    def validate_user_ids(self, value):
+        from django.contrib.auth import get_user_model
+
+        user_ids = list(dict.fromkeys(value))
+        found = set(
+            get_user_model()
+            .objects.filter(pk__in=user_ids)
+            .values_list("pk", flat=True)
+        )
+        missing = [str(user_id) for user_id in user_ids if user_id not in found]
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown user ids: {', '.join(missing[:20])}"
+            )
+        return user_ids
+
+    def validate_course_id(self, value):
+        from apps.courses.models import Course
+
+        if not Course.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Unknown course.")
+        return value
+
+    def validate(self, attrs):
+        if bool(attrs.get("user_ids")) == bool(attrs.get("course_id")):
+            raise serializers.ValidationError("Provide either user_ids or course_id.")
+        return attrs
+
+
 class BalanceSerializer(serializers.Serializer):
     available_points = serializers.IntegerField()
 
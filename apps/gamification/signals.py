@@ -1,15 +1,60 @@
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
 from apps.shared.signals import user_created
 from django.conf import settings
-from .utils import award_points
+from .models import Level, Badge, PointActivity, PointLedger
+from .levels import level_table
+from .badges import badge_index
+from infrastructure.cache import cache_handler
+from django.utils import timezone
+from .events import emit
+from .stats import increment_action_count, add_spent_points
+from .streaks import login_marker_key
 
 
 @receiver(user_created)
 def award_points_on_registration(sender, user, created_by, **kwargs):
-    award_points(user, points=100, action="register", description="Registration bonus")
+    emit(
+        user.pk,
+        "points",
+        points=100,
+        action="register",
+        description="Registration bonus",
+        reference_type="registration",
+        reference_id=str(user.pk),
+    )
 
 
 @receiver(user_logged_in)
 def award_points_on_login(sender, user, request, **kwargs):
-    award_points(user, points=10, action="login", description="Login bonus")
+    # First login of the day only; repeats are absorbed by a cache marker
+    # before anything is queued
+    today = timezone.localdate()
+    if cache_handler.get(login_marker_key(user.pk, today)):
+        return
+    emit(user.pk, "login", day=today.isoformat())
+
+
+@receiver(post_save, sender=Level)
+@receiver(post_delete, sender=Level)
+def invalidate_level_table(sender, **kwargs):
+    level_table.invalidate()
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def invalidate_badge_index(sender, **kwargs):
+    badge_index.invalidate()
+
+
+@receiver(post_save, sender=PointActivity)
+def count_point_activity(sender, instance, created, **kwargs):
+    if created:
+        increment_action_count(instance.user_id, instance.action, instance.event_count)
+
+
+@receiver(post_save, sender=PointLedger)
+def count_points_spent(sender, instance, created, **kwargs):
+    if created and instance.transaction_type == "spend":
+        add_spent_points(instance.user_id, abs(instance.points))
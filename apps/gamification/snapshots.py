@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+class ProcessSnapshot:
+    """
+    Base for read-mostly tables loaded once per process.
+
+    Subclasses implement ``build()``, which returns the snapshot consulted
+    through ``load()``. Local saves/deletes call ``invalidate()`` through
+    signals; other processes rebuild after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def build(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def load(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                snapshot = self.build()
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        return snapshot
@@ -0,0 +1,133 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import (
+    PointActivity,
+    PointLedger,
+    PointLedgerArchive,
+    UserActionCount,
+    UserActivityStats,
+)
+
+
+def _increment(model, lookup, field, amount):
+    """
+    Atomically add ``amount`` to ``field`` on the row matching ``lookup``,
+    creating the row on first use.
+    """
+    if model.objects.filter(**lookup).update(**{field: F(field) + amount}):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: amount})
+    except IntegrityError:
+        # Created concurrently; the row exists now
+        model.objects.filter(**lookup).update(**{field: F(field) + amount})
+
+
+def increment_action_count(user_id, action, amount=1):
+    _increment(UserActionCount, {"user_id": user_id, "action": action}, "count", amount)
+
+
+def increment_action_counts(user_ids, action, amount=1):
+    """Add ``amount`` to one action's counter for many users in two queries."""
+    UserActionCount.objects.bulk_create(
+        [UserActionCount(user_id=user_id, action=action) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    UserActionCount.objects.filter(user_id__in=user_ids, action=action).update(
+        count=F("count") + amount
+    )
+
+
+def add_spent_points(user_id, amount):
+    _increment(UserActivityStats, {"user_id": user_id}, "total_spent", amount)
+
+
+def refresh_review_count(user_id):
+    """
+    Recount the user's published reviews. Reviews can be unpublished or
+    deleted, so the counter is recomputed from the user's own rows rather
+    than incremented.
+    """
+    from apps.courses.models import CourseReview
+
+    count = CourseReview.objects.filter(
+        user_id=user_id, is_published=True, is_deleted=False
+    ).count()
+    if not UserActivityStats.objects.filter(user_id=user_id).update(
+        published_review_count=count
+    ):
+        UserActivityStats.objects.get_or_create(
+            user_id=user_id, defaults={"published_review_count": count}
+        )
+
+
+def get_action_count(user, action):
+    return (
+        UserActionCount.objects.filter(user=user, action=action)
+        .values_list("count", flat=True)
+        .first()
+        or 0
+    )
+
+
+def get_activity_stats(user):
+    return UserActivityStats.objects.filter(user=user).first()
+
+
+@transaction.atomic
+def rebuild_user_stats(user_ids=None):
+    """
+    Recompute all counters from PointActivity, PointLedger (including
+    archived entries) and CourseReview
+    with grouped queries. ``user_ids`` restricts the rebuild to a subset.
+    Returns the number of (action count, stats) rows written.
+    """
+    from apps.courses.models import CourseReview
+
+    activities = PointActivity.objects.all()
+    spends = PointLedger.objects.filter(transaction_type="spend")
+    archived_spends = PointLedgerArchive.objects.filter(transaction_type="spend")
+    reviews = CourseReview.objects.filter(is_published=True, is_deleted=False)
+    action_counts = UserActionCount.objects.all()
+    stats = UserActivityStats.objects.all()
+    if user_ids is not None:
+        activities = activities.filter(user_id__in=user_ids)
+        spends = spends.filter(user_id__in=user_ids)
+        archived_spends = archived_spends.filter(user_id__in=user_ids)
+        reviews = reviews.filter(user_id__in=user_ids)
+        action_counts = action_counts.filter(user_id__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+
+    action_counts.delete()
+    new_counts = UserActionCount.objects.bulk_create(
+        [
+            UserActionCount(user_id=row["user"], action=row["action"], count=row["n"])
+            for row in activities.values("user", "action").annotate(
+                n=Sum("event_count")
+            )
+        ],
+        batch_size=1000,
+    )
+
+    spent = {}
+    for queryset in (spends, archived_spends):
+        for row in queryset.values("user").annotate(total=Sum("points")):
+            spent[row["user"]] = spent.get(row["user"], 0) + abs(row["total"] or 0)
+    reviewed = {
+        row["user"]: row["n"] for row in reviews.values("user").annotate(n=Count("id"))
+    }
+    stats.delete()
+    new_stats = UserActivityStats.objects.bulk_create(
+        [
+            UserActivityStats(
+                user_id=user_id,
+                total_spent=spent.get(user_id, 0),
+                published_review_count=reviewed.get(user_id, 0),
+            )
+            for user_id in set(spent) | set(reviewed)
+        ],
+        batch_size=1000,
+    )
+    return len(new_counts), len(new_stats)
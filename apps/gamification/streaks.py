@@ -0,0 +1,210 @@
+import uuid
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from infrastructure.cache import cache_handler
+
+from .badges import badge_index, award_badges_bulk
+from .models import Event, Streak, UserPointProfile
+from .ranking import rank_service
+
+LOGIN_POINTS = 10
+# Repeat logins within the day are answered from this marker
+LOGIN_MARKER_TIMEOUT = 60 * 60 * 24
+
+
+# One statement per advance: insert the streak, or extend it when it was not
+# already advanced today, returning the new counts (PostgreSQL, SQLite 3.35+)
+ADVANCE_STREAK_SQL = """
+INSERT INTO {table} AS streak (
+    id, user_id, streak_type, current_count, longest_count, last_activity_date,
+    is_active, is_deleted, created_at, updated_at
+)
+VALUES (%s, %s, %s, 1, 1, %s, TRUE, FALSE, %s, %s)
+ON CONFLICT (user_id, streak_type) DO UPDATE SET
+    current_count = CASE
+        WHEN streak.last_activity_date = %s THEN streak.current_count + 1 ELSE 1
+    END,
+    longest_count = {greatest}(
+        streak.longest_count,
+        CASE
+            WHEN streak.last_activity_date = %s THEN streak.current_count + 1 ELSE 1
+        END
+    ),
+    last_activity_date = excluded.last_activity_date,
+    is_active = TRUE,
+    updated_at = excluded.updated_at
+WHERE streak.last_activity_date < excluded.last_activity_date
+    OR streak.last_activity_date IS NULL
+RETURNING current_count, longest_count
+"""
+
+
+def advance_streak(user_id, streak_type, today=None):
+    """
+    Extend a streak for activity on ``today`` with one conditional upsert.
+
+    The existing row only matches when it was not already advanced today,
+    so concurrent calls advance it once. Returns the new
+    ``(current_count, longest_count)`` when this call advanced (or started)
+    the streak, else None.
+    """
+    today = today or timezone.localdate()
+    yesterday = today - timezone.timedelta(days=1)
+    connection = connections[router.db_for_write(Streak)]
+    field = Streak._meta.get_field
+    now = timezone.now()
+    sql = ADVANCE_STREAK_SQL.format(
+        table=connection.ops.quote_name(Streak._meta.db_table),
+        greatest="GREATEST" if connection.vendor == "postgresql" else "MAX",
+    )
+    params = [
+        field(name).get_db_prep_save(value, connection)
+        for name, value in (
+            ("id", uuid.uuid4()),
+            ("user", user_id),
+            ("streak_type", streak_type),
+            ("last_activity_date", today),
+            ("created_at", now),
+            ("updated_at", now),
+            ("last_activity_date", yesterday),
+            ("last_activity_date", yesterday),
+        )
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return tuple(row) if row else None
+
+
+def login_streak_fields():
+    """Profile streak fields as subqueries over each profile's login streak."""
+    streak = Streak.objects.filter(user_id=OuterRef("user_id"), streak_type="login")
+    return {
+        "streak_count": Subquery(streak.values("current_count")[:1]),
+        "consecutive_login_days": Subquery(streak.values("current_count")[:1]),
+        "longest_streak": Subquery(streak.values("longest_count")[:1]),
+    }
+
+
+def login_marker_key(user_id, today):
+    return f"gamification:login:{user_id}:{today.isoformat()}"
+
+
+def record_login(user, today=None):
+    """
+    Record a login. Only the first login per user per day advances the
+    login streak, awards the login bonus and refreshes the profile streak
+    fields; later logins that day return from the cache marker without
+    touching the database. Returns the new streak count, or None for a
+    repeat login.
+    """
+    from .utils import award_points, check_and_award_badges
+
+    today = today or timezone.localdate()
+    marker = login_marker_key(user.pk, today)
+    if cache_handler.get(marker):
+        return None
+    with transaction.atomic():
+        advanced = advance_streak(user.pk, "login", today)
+        if advanced:
+            count, longest = advanced
+            award_points(user, LOGIN_POINTS, "login", description="Login bonus")
+            # The profile mirrors the counts returned by the upsert
+            UserPointProfile.objects.filter(user=user).update(
+                streak_count=count,
+                consecutive_login_days=count,
+                longest_streak=longest,
+                last_login_date=today,
+            )
+            if count in streak_thresholds("login"):
+                check_and_award_badges(user, changed=("streak",))
+        transaction.on_commit(
+            lambda: cache_handler.set(marker, 1, LOGIN_MARKER_TIMEOUT)
+        )
+    if not advanced:
+        return None
+    transaction.on_commit(lambda: rank_service.record_streak(user.pk, count))
+    return count
+
+
+def reset_lapsed_streaks(streak_type="login", today=None):
+    """
+    Deactivate streaks with no activity yesterday or today in one UPDATE.
+    A streak last touched yesterday can still be extended today, so it is
+    left alone; the task runs at midnight, when nobody has activity today
+    yet. Login resets are mirrored onto the profiles' streak fields in a
+    second UPDATE over the profile fields. Returns the number of streaks
+    reset.
+    """
+    today = today or timezone.localdate()
+    yesterday = today - timezone.timedelta(days=1)
+    reset = (
+        Streak.objects.filter(streak_type=streak_type, is_active=True)
+        .filter(
+            Q(last_activity_date__lt=yesterday) | Q(last_activity_date__isnull=True)
+        )
+        .update(current_count=0, is_active=False, updated_at=timezone.now())
+    )
+    if reset and streak_type == "login":
+        lapsed = Streak.objects.filter(
+            user_id=OuterRef("user_id"), streak_type="login", current_count=0
+        )
+        UserPointProfile.objects.filter(Exists(lapsed)).filter(
+            Q(streak_count__gt=0) | Q(consecutive_login_days__gt=0)
+        ).update(**login_streak_fields())
+        rank_service.invalidate_streaks()
+    return reset
+
+
+def streak_thresholds(streak_type="login"):
+    """Return the distinct ``min_streak`` values used by streak badges."""
+    thresholds = set()
+    for badge in badge_index.candidates(("streak",)):
+        data = (badge.criteria or {}).get("streak")
+        if data and data.get("streak_type", "login") == streak_type:
+            thresholds.add(data.get("min_streak", 1))
+    return sorted(thresholds)
+
+
+def threshold_crossers(streak_type="login", today=None):
+    """
+    Users whose streak reached one of the badge thresholds today. Streaks
+    grow by one per day, so a threshold is crossed on the day the count
+    equals it; users who already passed it were handled on that day.
+    """
+    thresholds = streak_thresholds(streak_type)
+    if not thresholds:
+        return Streak.objects.none().values_list("user_id", flat=True)
+    return Streak.objects.filter(
+        streak_type=streak_type,
+        is_active=True,
+        last_activity_date=today or timezone.localdate(),
+        current_count__in=thresholds,
+    ).values_list("user_id", flat=True)
+
+
+def award_streak_badges(streak_type="login", today=None, batch_size=1000):
+    """Award streak badges to today's threshold crossers in batches."""
+    crossers = threshold_crossers(streak_type, today).order_by("user_id")
+    return award_badges_bulk(
+        crossers.iterator(), changed=("streak",), batch_size=batch_size
+    )
+
+
+def expire_events(now=None):
+    """Deactivate every active event past its end date. Returns the count."""
+    now = now or timezone.now()
+    return Event.objects.filter(is_active=True, end_date__lt=now).update(
+        is_active=False, updated_at=now
+    )
+
+
+def start_scheduled_events(now=None):
+    """Activate every event whose window contains ``now``. Returns the count."""
+    now = now or timezone.now()
+    return Event.objects.filter(
+        is_active=False, start_date__lte=now, end_date__gt=now
+    ).update(is_active=True, updated_at=now)
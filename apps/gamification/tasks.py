@@ -2,17 +2,15 @@ from celery import shared_task
 from django.utils import timezone
 from .models import (
     UserPointProfile,
-    Streak,
     Leaderboard,
-    Event,
     Challenge,
     UserChallenge,
     Quest,
     UserQuest,
 )
 from .utils import (
+    award_points_bulk,
     update_user_streak,
-    check_streak_eligibility,
     get_active_challenges,
     update_challenge_progress,
     complete_challenge,
@@ -21,73 +19,109 @@ from .utils import (
     check_quest_progress,
     complete_quest,
     get_available_quests,
+    recalculate_user_balance,
 )
+from .badges import award_badges_bulk
+from . import ledger, streaks
+from .events import process_events
+from .leaderboards import refresh_period, refresh_touched_periods, period_bounds
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Bonus points by final rank for award_leaderboard_bonuses
+LEADERBOARD_BONUSES = {1: 100, 2: 50, 3: 25}
 
 
 @shared_task
 def reset_daily_streaks():
-    now = timezone.now().date()
-    for streak in Streak.objects.filter(streak_type="login", is_active=True):
-        if streak.last_activity_date != now:
-            streak.current_count = 0
-            streak.is_active = False
-            streak.save(update_fields=["current_count", "is_active"])
+    # Single UPDATE over lapsed login streaks
+    reset = streaks.reset_lapsed_streaks("login")
+    logger.info(f"Reset {reset} lapsed login streaks")
+    return reset
 
 
 @shared_task
 def award_daily_login_streaks():
-    now = timezone.now().date()
-    for streak in Streak.objects.filter(
-        streak_type="login", is_active=True, last_activity_date=now
-    ):
-        user = streak.user
-        check_streak_eligibility(user)
+    # Only users who reached a streak badge threshold today are evaluated
+    awarded = streaks.award_streak_badges("login")
+    logger.info(f"Awarded {awarded} login streak badges")
+    return awarded
 
 
 @shared_task
 def update_leaderboards():
-    # Recalculate daily, weekly, monthly leaderboards
-    pass
+    # Recalculate the daily, weekly, monthly and all-time periods touched since
+    # the last run
+    written = refresh_touched_periods()
+    logger.info(f"Leaderboards refreshed: {written}")
+    return written
 
 
 @shared_task
 def reset_weekly_leaderboards():
-    # Reset weekly leaderboard data every Monday
-    pass
+    # New weeks start with fresh rows keyed by period_start; close out the
+    # previous week with a final refresh so its ranks are complete
+    last_week = timezone.localdate() - timezone.timedelta(days=7)
+    return refresh_period("weekly", last_week)
 
 
 @shared_task
 def reset_monthly_leaderboards():
-    # Reset monthly leaderboard data on first of month
-    pass
+    # Close out the previous month with a final refresh
+    last_month = timezone.localdate().replace(day=1) - timezone.timedelta(days=1)
+    return refresh_period("monthly", last_month)
 
 
 @shared_task
-def award_leaderboard_bonuses():
-    # Award bonus points to top performers
-    pass
+def award_leaderboard_bonuses(period_type="weekly"):
+    # Award bonus points to the top performers of the last completed period
+    if period_type == "weekly":
+        day = timezone.localdate() - timezone.timedelta(days=7)
+    elif period_type == "monthly":
+        day = timezone.localdate().replace(day=1) - timezone.timedelta(days=1)
+    else:
+        day = timezone.localdate() - timezone.timedelta(days=1)
+    start, _ = period_bounds(period_type, day)
+    reference_id = f"{period_type}:{start.isoformat()}"
+    winners = Leaderboard.objects.filter(
+        period_type=period_type,
+        period_start=start,
+        rank__lte=max(LEADERBOARD_BONUSES),
+    ).values_list("user_id", "rank")
+    by_rank = {}
+    for user_id, rank in winners:
+        by_rank.setdefault(rank, []).append(user_id)
+    # One bulk award per rank; the reference makes reruns no-ops
+    awarded = 0
+    for rank, user_ids in sorted(by_rank.items()):
+        awarded += award_points_bulk(
+            user_ids,
+            LEADERBOARD_BONUSES[rank],
+            "leaderboard_bonus",
+            description=f"Rank #{rank} on the {period_type} leaderboard",
+            reference_type="leaderboard",
+            reference_id=reference_id,
+        )
+    return awarded
 
 
 @shared_task
 def expire_events():
-    now = timezone.now()
-    for event in Event.objects.filter(is_active=True, end_date__lt=now):
-        event.is_active = False
-        event.save(update_fields=["is_active"])
+    expired = streaks.expire_events()
+    logger.info(f"Expired {expired} events")
+    return expired
 
 
 @shared_task
 def start_scheduled_events():
-    now = timezone.now()
-    for event in Event.objects.filter(
-        is_active=False, start_date__lte=now, end_date__gt=now
-    ):
-        event.is_active = True
-        event.save(update_fields=["is_active"])
+    started = streaks.start_scheduled_events()
+    logger.info(f"Started {started} scheduled events")
+    return started
 
 
 @shared_task
@@ -132,19 +166,110 @@ def cleanup_completed_quests():
     pass
 
 
+@shared_task
+def snapshot_point_balances(min_entries=1):
+    # Snapshot balances so reads only sum the ledger entries after them
+    written = ledger.take_snapshots(min_entries=min_entries)
+    logger.info(f"Wrote {written} point balance snapshots")
+    return written
+
+
 @shared_task
 def cleanup_old_activities():
-    # Archive old PointActivity records for performance
-    pass
+    # Archive old PointLedger entries once a snapshot covers them. PointActivity
+    # is kept: leaderboards and counter rebuilds aggregate over its history.
+    cutoff = timezone.now() - timezone.timedelta(
+        days=settings.GAMIFICATION_LEDGER_RETENTION_DAYS
+    )
+    ledger.take_snapshots()
+    archived = ledger.archive_entries(before=cutoff)
+    logger.info(f"Archived {archived} ledger entries older than {cutoff:%Y-%m-%d}")
+    return archived
 
 
 @shared_task
 def recalculate_user_balances():
-    # Periodic balance verification and correction
-    pass
+    # Periodic balance verification and correction; the drift check is one
+    # query and only drifted profiles are locked and corrected
+    corrected = 0
+    for user in User.objects.filter(id__in=list(ledger.drifted_profiles())):
+        recalculate_user_balance(user)
+        corrected += 1
+    if corrected:
+        logger.warning(f"Corrected {corrected} drifted point balances")
+    return corrected
 
 
 @shared_task
-def update_badge_eligibility():
-    # Batch check for new badge awards
-    pass
+def process_gamification_events(events):
+    # Events queued by signals after commit, applied per user in one batch
+    return len(process_events(events))
+
+
+@shared_task
+def flush_social_buffer():
+    # Apply the social events coalesced since the last run
+    from .coalescing import social_coalescer
+
+    return social_coalescer.flush()
+
+
+def bulk_award_recipients(user_ids=None, course_id=None):
+    """Explicit user ids, or the students enrolled in ``course_id``, in order."""
+    if user_ids is not None:
+        return sorted(user_ids)
+    from apps.courses.models import Enrollment
+
+    return (
+        Enrollment.objects.filter(course_id=course_id, is_deleted=False)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+        .distinct()
+        .iterator()
+    )
+
+
+@shared_task
+def award_points_bulk_task(
+    points,
+    action,
+    user_ids=None,
+    course_id=None,
+    description="",
+    reference_type="",
+    reference_id="",
+):
+    # Large campaign awards from the bulk award endpoint; a reference makes
+    # a retried task a no-op for users already awarded
+    to_pk = User._meta.pk.to_python
+    if user_ids is not None:
+        user_ids = [to_pk(user_id) for user_id in user_ids]
+    awarded = award_points_bulk(
+        bulk_award_recipients(user_ids, course_id),
+        points,
+        action,
+        description=description,
+        reference_type=reference_type,
+        reference_id=reference_id,
+    )
+    logger.info(f"Bulk award of {points} points for {action!r} to {awarded} users")
+    return awarded
+
+
+@shared_task
+def evaluate_badges_for_users(user_ids, changed=None):
+    # Deferred badge pass for a batch of users, e.g. after award_points_bulk;
+    # ids arrive as strings from the broker
+    to_pk = User._meta.pk.to_python
+    return award_badges_bulk([to_pk(user_id) for user_id in user_ids], changed=changed)
+
+
+@shared_task
+def update_badge_eligibility(batch_size=1000):
+    # Batch check for new badge awards across every user with a point profile
+    user_ids = UserPointProfile.objects.order_by("user_id").values_list(
+        "user_id", flat=True
+    )
+    awarded = award_badges_bulk(user_ids.iterator(), batch_size=batch_size)
+    logger.info(f"Badge eligibility sweep awarded {awarded} badges")
+    return awarded
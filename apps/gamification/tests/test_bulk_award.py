@@ -0,0 +1,77 @@
+import uuid
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.authorization.models import Role, UserRole
+from apps.gamification.models import UserPointProfile
+
+User = get_user_model()
+URL = "/api/v1/gamification/award/award_points_bulk/"
+
+
+def make_user(name, role=None, is_staff=True):
+    user = User.objects.create_user(
+        username=name, email=f"{name}@example.com", password="pass", is_staff=is_staff
+    )
+    if role:
+        UserRole.objects.create(user=user, role=Role.objects.get(name=role))
+    return user
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+def test_only_the_bulk_award_is_routed():
+    assert reverse("api:v1:gamification-award-points-bulk") == URL
+    client = client_for(make_user("instructor", role="Instructor"))
+    # Instructors lack award_bulk_points, and the other award actions are unrouted
+    assert client.post(URL, {}, format="json").status_code == 403
+    for action in ("spend_points", "recalculate_balance", "social_buffer_stats"):
+        response = client.post(f"/api/v1/gamification/award/{action}/")
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_bulk_award_validates_input(settings):
+    client = client_for(make_user("admin", role="Admin"))
+    student = make_user("student", is_staff=False)
+    bad_requests = [
+        {"user_ids": [str(student.pk)], "points": "lots", "action": "campaign"},
+        {"user_ids": [str(uuid.uuid4())], "points": 10, "action": "campaign"},
+        {"user_ids": ["not-a-uuid"], "points": 10, "action": "campaign"},
+        {"course_id": str(uuid.uuid4()), "points": 10, "action": "campaign"},
+        {"points": 10, "action": "campaign"},
+    ]
+    for data in bad_requests:
+        assert client.post(URL, data, format="json").status_code == 400
+    assert not UserPointProfile.objects.filter(user=student).exists()
+
+
+@pytest.mark.django_db
+def test_large_batches_are_queued(settings):
+    settings.GAMIFICATION_BULK_AWARD_INLINE_LIMIT = 1
+    client = client_for(make_user("admin", role="Admin"))
+    students = [make_user(f"student{i}", is_staff=False) for i in range(2)]
+    data = {"points": 10, "action": "campaign", "reference_id": "c1"}
+
+    response = client.post(
+        URL, {**data, "user_ids": [str(students[0].pk)]}, format="json"
+    )
+    assert response.status_code == 200
+    assert response.data["users_awarded"] == 1
+
+    # Celery runs eagerly in tests; the reference skips the user already awarded
+    response = client.post(
+        URL, {**data, "user_ids": [str(s.pk) for s in students]}, format="json"
+    )
+    assert response.status_code == 202
+    points = UserPointProfile.objects.order_by("user__username").values_list(
+        "total_points", flat=True
+    )
+    assert list(points) == [10, 10]
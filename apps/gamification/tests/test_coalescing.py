@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth import get_user_model
+from apps.gamification.coalescing import InMemoryCoalesceBackend, SocialCoalescer
+from apps.gamification.models import (
+    PointActivity,
+    PointLedger,
+    UserActionCount,
+    UserPointProfile,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def coalescer():
+    return SocialCoalescer(backend=InMemoryCoalesceBackend())
+
+
+@pytest.mark.django_db
+def test_burst_flushes_as_one_entry(settings, coalescer):
+    settings.GAMIFICATION_EVENTS_SYNC = True
+    author = User.objects.create_user(
+        username="author", email="author@example.com", password="pass"
+    )
+    for _ in range(25):
+        coalescer.buffer(author.pk, "like")
+    coalescer.buffer(author.pk, "like_received")  # awards nothing
+
+    assert coalescer.flush() == 25
+    entry = PointLedger.objects.get(user=author)
+    assert (entry.points, entry.event_count) == (25, 25)
+    assert PointActivity.objects.filter(user=author).count() == 1
+    assert UserPointProfile.objects.get(user=author).total_points == 25
+    # Badge criteria still see every individual action
+    assert (
+        UserActionCount.objects.get(user=author, action="Social action: like").count
+        == 25
+    )
+    assert coalescer.stats() == {"buffered": 25, "flushed": 25, "dropped": 1}
+    assert coalescer.flush() == 0
+
+
+@pytest.mark.django_db
+def test_buffer_waits_for_commit(
+    settings, coalescer, django_capture_on_commit_callbacks
+):
+    settings.GAMIFICATION_EVENTS_SYNC = False
+    user = User.objects.create_user(
+        username="sharer", email="sharer@example.com", password="pass"
+    )
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        coalescer.buffer(user.pk, "share")
+    assert coalescer.stats()["buffered"] == 0
+    callbacks[0]()
+    assert coalescer.stats()["buffered"] == 1
+
+    # Events for users deleted before the flush are dropped
+    user.delete()
+    assert coalescer.flush() == 0
+    assert coalescer.stats()["dropped"] == 1
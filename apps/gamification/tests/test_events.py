@@ -0,0 +1,84 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from apps.gamification.badges import badge_index
+from apps.gamification.events import (
+    emit,
+    emit_many,
+    make_event,
+    process_events,
+    social_event,
+)
+from apps.gamification.models import Badge, PointActivity, UserBadge, UserPointProfile
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user():
+    badge_index.invalidate()
+    yield User.objects.create_user(
+        username="eventful", email="eventful@example.com", password="pass"
+    )
+    badge_index.invalidate()
+
+
+@pytest.mark.django_db
+def test_events_wait_for_commit(settings, user, django_capture_on_commit_callbacks):
+    settings.GAMIFICATION_EVENTS_SYNC = False
+    with django_capture_on_commit_callbacks() as callbacks:
+        emit(user.pk, "points", points=20, action="lesson")
+    # Nothing happens inside the request transaction
+    assert not PointActivity.objects.filter(user=user).exists()
+    assert len(callbacks) == 1
+
+    callbacks[0]()  # Celery runs eagerly in tests
+    assert UserPointProfile.objects.get(user=user).total_points == 20
+
+
+@pytest.mark.django_db
+def test_user_events_share_one_badge_check(settings, user):
+    settings.GAMIFICATION_EVENTS_SYNC = True
+    Badge.objects.create(
+        name="Thirty", description="Earn 30", criteria={"points": {"min_points": 30}}
+    )
+    events = [
+        make_event(user.pk, "points", points=10, action="lesson"),
+        make_event(user.pk, "points", points=20, action="lesson"),
+        social_event(user.pk, "like_given"),  # awards nothing, so never queued
+    ]
+    assert events[2] is None
+    emit_many(events)
+    profile = UserPointProfile.objects.get(user=user)
+    assert profile.total_points == 30
+    assert UserBadge.objects.filter(user=user, badge__name="Thirty").exists()
+
+    # Replayed referenced events are absorbed by the ledger's idempotency key
+    emit(user.pk, "social", action_type="referral", reference_id="r1")
+    emit(user.pk, "social", action_type="referral", reference_id="r1")
+    assert UserPointProfile.objects.get(user=user).total_points == 40
+
+
+class SerializationFailure(Exception):
+    pgcode = "40001"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_event_is_retried_after_a_serialization_failure(monkeypatch, user):
+    from apps.gamification import utils
+
+    append_entry = utils.append_entry
+    calls = []
+
+    def conflicting_append_entry(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("could not serialize") from SerializationFailure()
+        return append_entry(*args, **kwargs)
+
+    monkeypatch.setattr(utils, "append_entry", conflicting_append_entry)
+    # The per-event transaction is the outermost one, so it is re-run whole
+    applied = process_events([make_event(user.pk, "points", points=15, action="x")])
+    assert len(applied) == 1 and len(calls) == 2
+    assert UserPointProfile.objects.get(user=user).total_points == 15
+    assert PointActivity.objects.filter(user=user).count() == 1
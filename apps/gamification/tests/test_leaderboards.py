@@ -0,0 +1,79 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.gamification.models import Leaderboard, PointActivity
+from apps.gamification.leaderboards import (
+    current_period_bounds,
+    period_bounds,
+    refresh_period,
+    refresh_touched_periods,
+)
+from apps.gamification.utils import award_points
+
+User = get_user_model()
+
+
+def test_period_bounds():
+    day = timezone.datetime(2025, 6, 25).date()  # Wednesday
+    assert period_bounds("daily", day) == (day, day)
+    assert [d.isoformat() for d in period_bounds("weekly", day)] == [
+        "2025-06-23",
+        "2025-06-29",
+    ]
+    assert [d.isoformat() for d in period_bounds("monthly", day)] == [
+        "2025-06-01",
+        "2025-06-30",
+    ]
+
+
+@pytest.mark.django_db
+def test_refresh_ranks_every_period():
+    users = [
+        User.objects.create_user(
+            username=f"ranked{i}", email=f"ranked{i}@example.com", password="pass"
+        )
+        for i in range(3)
+    ]
+    award_points(users[0], 30, "login")
+    award_points(users[1], 50, "login")
+    award_points(users[2], 30, "login")
+    written = refresh_touched_periods()
+    assert written == {"daily": 3, "weekly": 3, "monthly": 3, "all_time": 3}
+    start, _ = current_period_bounds("weekly")
+    ranks = dict(
+        Leaderboard.objects.filter(
+            period_type="weekly", period_start=start
+        ).values_list("user__username", "rank")
+    )
+    assert ranks == {"ranked1": 1, "ranked0": 2, "ranked2": 2}
+
+    # Only periods with new earnings are refreshed, rows are upserted
+    award_points(users[0], 100, "login")
+    refresh_touched_periods()
+    assert Leaderboard.objects.filter(period_type="all_time").count() == 3
+    assert Leaderboard.objects.get(user=users[0], period_type="all_time").rank == 1
+    # The all-time refresh recomputes touched users' totals; re-reading the
+    # overlap window does not double count
+    refresh_touched_periods()
+    assert (
+        Leaderboard.objects.get(user=users[0], period_type="all_time").points_earned
+        == 130
+    )
+    assert Leaderboard.objects.get(user=users[1], period_type="all_time").rank == 2
+
+
+@pytest.mark.django_db
+def test_refresh_period_deletes_users_who_dropped_out():
+    kept, dropped = [
+        User.objects.create_user(
+            username=f"period{i}", email=f"period{i}@example.com", password="pass"
+        )
+        for i in range(2)
+    ]
+    award_points(kept, 10, "login")
+    award_points(dropped, 20, "login")
+    assert refresh_period("daily") == 2
+    PointActivity.objects.filter(user=dropped).delete()
+    assert refresh_period("daily") == 1
+    rows = Leaderboard.objects.filter(period_type="daily")
+    assert list(rows.values_list("user_id", "rank")) == [(kept.pk, 1)]
@@ -0,0 +1,102 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.gamification import ledger
+from apps.gamification.models import (
+    PointBalanceSnapshot,
+    PointLedger,
+    PointLedgerArchive,
+    UserActivityStats,
+    UserPointProfile,
+)
+from apps.gamification.tasks import recalculate_user_balances
+from apps.gamification.utils import (
+    award_points,
+    award_points_bulk,
+    refund_points,
+    spend_points,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username="ledger", email="ledger@example.com", password="pass"
+    )
+
+
+@pytest.mark.django_db
+def test_entries_are_numbered_per_user(user):
+    award_points(user, 50, "login")
+    spend_points(user, 20)
+    refund_points(user, 20, reference_type="purchase", reference_id="1")
+    entries = list(
+        PointLedger.objects.filter(user=user)
+        .order_by("seq")
+        .values_list("seq", "transaction_type", "balance_after")
+    )
+    assert entries == [(1, "earn", 50), (2, "spend", 30), (3, "refund", 50)]
+    assert UserPointProfile.objects.get(user=user).ledger_seq == 3
+
+
+@pytest.mark.django_db
+def test_balance_reads_start_from_latest_snapshot(user, django_assert_num_queries):
+    award_points(user, 50, "login")
+    award_points(user, 30, "login")
+    assert ledger.take_snapshots() == 1
+    assert ledger.take_snapshots() == 0
+    spend_points(user, 10)
+    snapshot = PointBalanceSnapshot.objects.get(user=user)
+    assert (snapshot.seq, snapshot.balance) == (2, 80)
+    # latest snapshot, sum of the entries after it
+    with django_assert_num_queries(2):
+        assert ledger.ledger_balance(user.pk) == 70
+
+
+@pytest.mark.django_db
+def test_archive_keeps_balances_and_counters(user):
+    award_points(user, 50, "login")
+    spend_points(user, 20)
+    ledger.take_snapshots()
+    award_points(user, 5, "login")
+    future = timezone.now() + timezone.timedelta(days=1)
+
+    # The entry after the snapshot stays in the live table
+    assert ledger.archive_entries(before=future) == 2
+    assert list(PointLedger.objects.values_list("seq", flat=True)) == [3]
+    assert PointLedgerArchive.objects.filter(user=user).count() == 2
+    assert ledger.ledger_balance(user.pk) == 35
+    assert UserActivityStats.objects.get(user=user).total_spent == 20
+
+
+@pytest.mark.django_db
+def test_recalculate_corrects_only_drifted_balances(user):
+    award_points(user, 50, "login")
+    other = User.objects.create_user(
+        username="steady", email="steady@example.com", password="pass"
+    )
+    award_points(other, 10, "login")
+    UserPointProfile.objects.filter(user=user).update(available_points=999)
+    assert list(ledger.drifted_profiles()) == [user.pk]
+    assert recalculate_user_balances() == 1
+    assert UserPointProfile.objects.get(user=user).available_points == 50
+
+
+@pytest.mark.django_db
+def test_archived_references_stay_idempotent(user):
+    award_points(user, 50, "enrollment", reference_type="course", reference_id="c1")
+    ledger.take_snapshots()
+    ledger.archive_entries(before=timezone.now() + timezone.timedelta(days=1))
+    assert not PointLedger.objects.exists()
+
+    award_points(user, 50, "enrollment", reference_type="course", reference_id="c1")
+    assert (
+        award_points_bulk(
+            [user.pk], 50, "enrollment", reference_type="course", reference_id="c1"
+        )
+        == 0
+    )
+    assert UserPointProfile.objects.get(user=user).available_points == 50
+    assert not PointLedger.objects.exists()
@@ -0,0 +1,65 @@
+import pytest
+from django.contrib.auth import get_user_model
+from apps.gamification.models import Leaderboard
+from apps.gamification.leaderboards import current_period_bounds
+from apps.gamification.ranking import InMemoryRankBackend, rank_service
+from apps.gamification.utils import award_points
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def rank_backend():
+    backend = InMemoryRankBackend()
+    previous, rank_service._backend = rank_service._backend, backend
+    yield backend
+    rank_service._backend = previous
+
+
+@pytest.mark.django_db
+def test_award_points_writes_through_on_commit(django_capture_on_commit_callbacks):
+    users = [
+        User.objects.create_user(
+            username=f"live{i}", email=f"live{i}@example.com", password="pass"
+        )
+        for i in range(4)
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        for user, points in zip(users, (30, 50, 30, 10)):
+            award_points(user, points, "login")
+
+    top = rank_service.top("weekly", limit=3)
+    assert [(e["user_id"], e["rank"], e["score"]) for e in top] == [
+        (str(users[1].pk), 1, 50),
+        *sorted(
+            [(str(users[0].pk), 2, 30), (str(users[2].pk), 2, 30)],
+        ),
+    ]
+    # Ties share a rank, matching RANK() in the materialized table
+    assert rank_service.get_rank(users[3].pk, "daily")["rank"] == 4
+    assert rank_service.get_rank(users[3].pk, "daily")["total"] == 4
+    # A page starting inside a tie keeps the tied rank
+    assert rank_service.top("monthly", limit=1, offset=2)[0]["rank"] == 2
+    assert len(rank_service.around(users[3].pk, "all_time", radius=1)) == 2
+
+
+@pytest.mark.django_db
+def test_cold_period_loads_from_leaderboard_table():
+    user = User.objects.create_user(
+        username="stored", email="stored@example.com", password="pass"
+    )
+    start, end = current_period_bounds("weekly")
+    Leaderboard.objects.create(
+        user=user,
+        period_type="weekly",
+        period_start=start,
+        period_end=end,
+        points_earned=120,
+        rank=1,
+    )
+    assert rank_service.get_rank(user.pk, "weekly") == {
+        "user_id": str(user.pk),
+        "rank": 1,
+        "score": 120,
+        "total": 1,
+    }
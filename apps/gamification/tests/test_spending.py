@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from apps.gamification.models import PointLedger, UserPointProfile
+from apps.gamification.utils import award_points, spend_points
+from apps.shared.exceptions import BusinessLogicError, InsufficientFundsError
+from apps.shop.models import Purchase, ShopItem
+from apps.shop.services import PurchaseService
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user():
+    user = User.objects.create_user(
+        username="spender", email="spender@example.com", password="pass"
+    )
+    award_points(user, 150, "login")
+    return user
+
+
+@pytest.mark.django_db
+def test_spend_with_reference_is_idempotent(user):
+    assert spend_points(user, 40, "purchase", "order-1") == 110
+    # A retried request replays the original result instead of spending again
+    assert spend_points(user, 40, "purchase", "order-1") == 110
+    assert spend_points(user, 10, "purchase", "order-2") == 100
+    assert PointLedger.objects.filter(user=user, transaction_type="spend").count() == 2
+    assert UserPointProfile.objects.get(user=user).available_points == 100
+
+    # Referenced awards are deduplicated the same way
+    award_points(user, 5, "lesson", reference_type="lesson", reference_id="l-1")
+    award_points(user, 5, "lesson", reference_type="lesson", reference_id="l-1")
+    assert UserPointProfile.objects.get(user=user).available_points == 105
+
+
+@pytest.mark.django_db
+def test_overspend_is_rejected(user):
+    with pytest.raises(InsufficientFundsError):
+        spend_points(user, 151)
+    assert UserPointProfile.objects.get(user=user).available_points == 150
+
+
+@pytest.mark.django_db
+def test_free_items_check_out_and_negative_spends_are_rejected(user):
+    item = ShopItem.objects.create(
+        name="Free badge frame",
+        description="",
+        price_points=0,
+        is_unlimited_inventory=True,
+    )
+    purchase = PurchaseService.create_purchase(
+        user, [{"shop_item": item, "quantity": 2}]
+    )
+    assert Purchase.objects.get(pk=purchase.pk).total_points_spent == 0
+    assert UserPointProfile.objects.get(user=user).available_points == 150
+
+    with pytest.raises(BusinessLogicError):
+        spend_points(user, -5)
+    assert UserPointProfile.objects.get(user=user).available_points == 150
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="needs row-level locking")
+def test_parallel_spends_lose_no_updates(user):
+    def spend(i):
+        try:
+            return spend_points(user, 1, "purchase", f"parallel-{i}")
+        except InsufficientFundsError:
+            return None
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(spend, range(200)))
+
+    assert sum(result is not None for result in results) == 150
+    profile = UserPointProfile.objects.get(user=user)
+    assert profile.available_points == 0
+    seqs = list(
+        PointLedger.objects.filter(user=user)
+        .order_by("seq")
+        .values_list("seq", "balance_after")
+    )
+    # Gap-free sequence and a strictly decreasing running balance
+    assert [seq for seq, _ in seqs] == list(range(1, 152))
+    assert [balance for _, balance in seqs[1:]] == list(range(149, -1, -1))
@@ -0,0 +1,141 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.gamification.models import (
+    Badge,
+    Event,
+    PointActivity,
+    Streak,
+    UserBadge,
+    UserPointProfile,
+)
+from apps.gamification.badges import badge_index
+from apps.gamification import streaks
+from infrastructure.cache import cache_handler
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def reset_badge_index():
+    badge_index.invalidate()
+    yield
+    badge_index.invalidate()
+
+
+def make_streak(name, count, last_activity_date):
+    user = User.objects.create_user(
+        username=name, email=f"{name}@example.com", password="pass"
+    )
+    return Streak.objects.create(
+        user=user,
+        streak_type="login",
+        current_count=count,
+        longest_count=count,
+        last_activity_date=last_activity_date,
+    )
+
+
+@pytest.mark.django_db
+def test_reset_keeps_streaks_that_can_still_be_extended():
+    today = timezone.localdate()
+    fresh = make_streak("fresh", 3, today)
+    pending = make_streak("pending", 3, today - timezone.timedelta(days=1))
+    lapsed = make_streak("lapsed", 3, today - timezone.timedelta(days=2))
+    for streak in (pending, lapsed):
+        UserPointProfile.objects.create(
+            user_id=streak.user_id, streak_count=3, consecutive_login_days=3
+        )
+
+    assert streaks.reset_lapsed_streaks("login", today) == 1
+    assert Streak.objects.get(pk=fresh.pk).is_active
+    assert Streak.objects.get(pk=pending.pk).current_count == 3
+    lapsed.refresh_from_db()
+    assert (lapsed.current_count, lapsed.is_active) == (0, False)
+    # The profiles' denormalized streak fields follow the reset
+    profiles = dict(
+        UserPointProfile.objects.values_list("user_id", "consecutive_login_days")
+    )
+    assert profiles == {pending.user_id: 3, lapsed.user_id: 0}
+    assert UserPointProfile.objects.get(user_id=lapsed.user_id).streak_count == 0
+
+
+@pytest.mark.django_db
+def test_only_threshold_crossers_are_awarded(django_assert_max_num_queries):
+    today = timezone.localdate()
+    badge = Badge.objects.create(
+        name="Week Streak",
+        description="7 days in a row",
+        criteria={"streak": {"streak_type": "login", "min_streak": 7}},
+    )
+    crosser = make_streak("crosser", 7, today)
+    make_streak("earlier", 9, today)
+    make_streak("short", 6, today)
+
+    assert list(streaks.threshold_crossers("login", today)) == [crosser.user_id]
+    # badge catalog, crossers, owned badges, streak criterion, bulk insert
+    with django_assert_max_num_queries(5):
+        assert streaks.award_streak_badges("login", today) == 1
+    assert UserBadge.objects.filter(badge=badge, user_id=crosser.user_id).exists()
+
+
+@pytest.mark.django_db
+def test_event_windows_are_updated_in_bulk():
+    now = timezone.now()
+    hour = timezone.timedelta(hours=1)
+    Event.objects.create(
+        name="Ended", description="", start_date=now - 2 * hour, end_date=now - hour
+    )
+    Event.objects.create(
+        name="Upcoming",
+        description="",
+        start_date=now - hour,
+        end_date=now + hour,
+        is_active=False,
+    )
+    assert streaks.expire_events(now) == 1
+    assert streaks.start_scheduled_events(now) == 1
+    assert list(
+        Event.objects.filter(is_active=True).values_list("name", flat=True)
+    ) == ["Upcoming"]
+
+
+@pytest.mark.django_db
+def test_first_login_of_the_day_advances_streak_once(
+    django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    cache_handler.clear()
+    user = User.objects.create_user(
+        username="daily", email="daily@example.com", password="pass"
+    )
+    yesterday = timezone.localdate() - timezone.timedelta(days=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert streaks.record_login(user, today=yesterday) == 1
+        assert streaks.record_login(user) == 2
+    # Repeat logins are answered from the cache marker
+    with django_assert_num_queries(0):
+        assert streaks.record_login(user) is None
+
+    streak = Streak.objects.get(user=user, streak_type="login")
+    assert (streak.current_count, streak.longest_count) == (2, 2)
+    profile = UserPointProfile.objects.get(user=user)
+    assert (profile.streak_count, profile.consecutive_login_days) == (2, 2)
+    assert profile.longest_streak == 2
+    assert profile.last_login_date == timezone.localdate()
+    assert PointActivity.objects.filter(user=user, action="login").count() == 2
+
+    # Without the marker the conditional upsert still refuses a second advance
+    cache_handler.clear()
+    assert streaks.record_login(user) is None
+    assert Streak.objects.get(user=user, streak_type="login").current_count == 2
+
+
+@pytest.mark.django_db
+def test_advance_streak_returns_counts_from_one_statement(django_assert_num_queries):
+    today = timezone.localdate()
+    streak = make_streak("gap", 5, today - timezone.timedelta(days=3))
+    with django_assert_num_queries(1):
+        assert streaks.advance_streak(streak.user_id, "login", today) == (1, 5)
+    assert streaks.advance_streak(streak.user_id, "login", today) is None
+    with django_assert_num_queries(1):
+        assert streaks.advance_streak(streak.user_id, "activity", today) == (1, 1)
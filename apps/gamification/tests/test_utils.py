@@ -0,0 +1,173 @@
+import pytest
+from django.contrib.auth import get_user_model
+from apps.gamification.models import (
+    Level,
+    Badge,
+    UserBadge,
+    UserPointProfile,
+    PointLedger,
+    UserActivityStats,
+)
+from apps.gamification.levels import level_table
+from apps.gamification.badges import badge_index, award_badges_bulk
+from apps.gamification.stats import get_action_count, rebuild_user_stats
+from apps.gamification.utils import award_points, award_points_bulk, spend_points
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog_caches():
+    level_table.invalidate()
+    badge_index.invalidate()
+    yield
+    level_table.invalidate()
+    badge_index.invalidate()
+
+
+@pytest.fixture
+def levels():
+    Level.objects.create(number=1, name="Novice", required_points=0)
+    Level.objects.create(number=2, name="Apprentice", required_points=100)
+    Level.objects.create(number=3, name="Adept", required_points=500)
+
+
+@pytest.mark.django_db
+def test_award_points_updates_level_and_running_balance(levels):
+    user = User.objects.create_user(
+        username="awarduser", email="award@example.com", password="pass"
+    )
+    award_points(user, 60, "login")
+    award_points(user, 60, "login")
+    profile = UserPointProfile.objects.get(user=user)
+    assert profile.total_points == 120
+    assert profile.available_points == 120
+    assert profile.current_level.number == 2
+    assert profile.progress_to_next_level == pytest.approx(20 / 400)
+    balances = list(
+        PointLedger.objects.filter(user=user)
+        .order_by("id")
+        .values_list("balance_after", flat=True)
+    )
+    assert balances == [60, 120]
+
+
+@pytest.mark.django_db
+def test_award_points_query_count(levels, django_assert_num_queries):
+    user = User.objects.create_user(
+        username="querycount", email="querycount@example.com", password="pass"
+    )
+    award_points(user, 10, "login")
+    # Lock profile, update profile, insert activity, bump the action
+    # counter, insert ledger entry, plus the savepoint pair around the
+    # atomic block; with no badges in the catalog the badge check is free.
+    with django_assert_num_queries(7):
+        award_points(user, 10, "login")
+
+
+@pytest.mark.django_db
+def test_badge_checks_only_touch_affected_badges(levels, django_assert_num_queries):
+    user = User.objects.create_user(
+        username="badgeuser", email="badge@example.com", password="pass"
+    )
+    for i in range(25):
+        Badge.objects.create(
+            name=f"Spender {i}",
+            description="Spend points",
+            criteria={"spending": {"min_spent": 1000 + i}},
+        )
+    points_badge = Badge.objects.create(
+        name="First Points", description="Earn points", criteria={"points": {}}
+    )
+    award_points(user, 10, "login")
+    assert list(UserBadge.objects.filter(user=user)) == [
+        UserBadge.objects.get(user=user, badge=points_badge)
+    ]
+    # Spending badges are not candidates for an award; the owned points
+    # badge is filtered out by a single lookup.
+    with django_assert_num_queries(8):
+        award_points(user, 10, "login")
+
+
+@pytest.mark.django_db
+def test_activity_counters_match_rebuild(levels):
+    user = User.objects.create_user(
+        username="statsuser", email="stats@example.com", password="pass"
+    )
+    award_points(user, 50, "login")
+    award_points(user, 50, "login")
+    award_points(user, 20, "complete_lesson")
+    spend_points(user, 30)
+    assert get_action_count(user, "login") == 2
+    assert user.activity_stats.total_spent == 30
+    rebuild_user_stats([user.id])
+    assert get_action_count(user, "login") == 2
+    assert get_action_count(user, "complete_lesson") == 1
+    assert UserActivityStats.objects.get(user=user).total_spent == 30
+
+
+@pytest.mark.django_db
+def test_bulk_badge_award_matches_per_user_rules(levels):
+    users = [
+        User.objects.create_user(
+            username=f"bulk{i}", email=f"bulk{i}@example.com", password="pass"
+        )
+        for i in range(4)
+    ]
+    for i, user in enumerate(users):
+        award_points(user, 100 * i, "login")
+    Badge.objects.create(
+        name="Two Hundred",
+        description="Reach 200 points",
+        criteria={"points": {"min_points": 200}, "level": {"min_level": 2}},
+    )
+    awarded = award_badges_bulk(
+        UserPointProfile.objects.values_list("user_id", flat=True), batch_size=2
+    )
+    assert awarded == 2
+    assert set(UserBadge.objects.values_list("user__username", flat=True)) == {
+        "bulk2",
+        "bulk3",
+    }
+    assert award_badges_bulk([user.id for user in users]) == 0
+
+
+@pytest.mark.django_db
+def test_bulk_award_is_set_based_and_idempotent(
+    levels, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    users = [
+        User.objects.create_user(
+            username=f"campaign{i}", email=f"campaign{i}@example.com", password="pass"
+        )
+        for i in range(30)
+    ]
+    award_points(users[0], 90, "login")
+    badge = Badge.objects.create(
+        name="Apprentice",
+        description="Reach level 2",
+        criteria={"level": {"min_level": 2}},
+    )
+    user_ids = [user.id for user in users]
+    # The query count does not depend on the number of users in a batch
+    with django_assert_max_num_queries(12):
+        with django_capture_on_commit_callbacks() as callbacks:
+            awarded = award_points_bulk(
+                user_ids, 50, "campaign", reference_type="campaign", reference_id="c1"
+            )
+    assert awarded == 30
+    for callback in callbacks:
+        callback()
+
+    profile = UserPointProfile.objects.get(user=users[0])
+    assert (profile.available_points, profile.current_level.number) == (140, 2)
+    assert profile.ledger_seq == 2
+    assert PointLedger.objects.get(user=users[0], seq=2).balance_after == 140
+    assert get_action_count(users[5], "campaign") == 1
+    # Badges are evaluated in the deferred pass; only users[0] reached level 2
+    assert list(
+        UserBadge.objects.filter(badge=badge).values_list("user_id", flat=True)
+    ) == [users[0].id]
+
+    assert award_points_bulk(user_ids, 50, "campaign", "", "campaign", "c1") == 0
+    assert UserPointProfile.objects.get(user=users[5]).total_points == 50
@@ -8,6 +8,7 @@ from .views import (
     ChallengeViewSet,
     EventViewSet,
     AchievementViewSet,
+    BulkAwardView,
 )
 
 router = DefaultRouter()
@@ -22,5 +23,11 @@ router.register(
 )
 
 urlpatterns = [
+    # Only the bulk award is exposed; the other AwardViewSet actions stay unrouted
+    path(
+        "award/award_points_bulk/",
+        BulkAwardView.as_view(),
+        name="gamification-award-points-bulk",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,9 +1,7 @@
 from .models import (
     UserPointProfile,
     PointActivity,
-    Badge,
     UserBadge,
-    Level,
     PointLedger,
     Streak,
     Quest,
@@ -13,37 +11,59 @@ from .models import (
     Event,
 )
 from .criteria import CriteriaRegistry
-from django.db import transaction, models
+from .levels import level_table
+from .badges import badge_index, AWARD_CRITERIA_KEYS
+from .ranking import rank_service
+from .streaks import advance_streak
+from .events import social_points
+from .ledger import (
+    append_entry,
+    find_entry,
+    ledger_balance,
+    referenced_users,
+    retry_on_conflict,
+)
+from apps.shared.exceptions import BusinessLogicError, InsufficientFundsError
+from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 
 
+def _lock_point_profile(user):
+    """
+    Fetch the user's point profile with a row lock, creating it if needed.
+    The locked row carries the running balance, so ledger entries never
+    have to re-read the previous ledger row.
+    """
+    profile = UserPointProfile.objects.select_for_update().filter(user=user).first()
+    if profile is None:
+        UserPointProfile.objects.get_or_create(user=user)
+        profile = UserPointProfile.objects.select_for_update().get(user=user)
+    return profile
+
+
+@retry_on_conflict
 def award_points(
-    user, points, action, description="", reference_type=None, reference_id=None
+    user,
+    points,
+    action,
+    description="",
+    reference_type=None,
+    reference_id=None,
+    check_badges=True,
+    event_count=1,
 ):
     with transaction.atomic():
-        profile, _ = UserPointProfile.objects.get_or_create(user=user)
+        profile = _lock_point_profile(user)
+        # A referenced award is idempotent: replays leave the balance alone
+        if find_entry(user.pk, "earn", reference_type, reference_id):
+            return
         profile.total_points += points
         profile.available_points += points
         # Level up logic
-        next_level = (
-            Level.objects.filter(required_points__gt=profile.total_points)
-            .order_by("required_points")
-            .first()
-        )
-        current_level = (
-            Level.objects.filter(required_points__lte=profile.total_points)
-            .order_by("-required_points")
-            .first()
-        )
+        current_level, _, progress = level_table.resolve(profile.total_points)
         profile.current_level = current_level
-        if current_level and next_level:
-            profile.progress_to_next_level = (
-                profile.total_points - current_level.required_points
-            ) / (next_level.required_points - current_level.required_points)
-        else:
-            profile.progress_to_next_level = 1.0
-        profile.save()
+        profile.progress_to_next_level = progress
         PointActivity.objects.create(
             user=user,
             action=action,
@@ -53,31 +73,48 @@ def award_points(
             reference_id=reference_id or "",
             description=description,
             timestamp=timezone.now(),
+            event_count=event_count,
         )
-        # Ledger entry
-        last_ledger = (
-            PointLedger.objects.filter(user=user).order_by("-created_at").first()
-        )
-        balance_after = (last_ledger.balance_after if last_ledger else 0) + points
-        PointLedger.objects.create(
-            user=user,
-            transaction_type="earn",
-            points=points,
-            balance_after=balance_after,
-            reference_type=reference_type or "",
-            reference_id=reference_id or "",
+        # Ledger entry; the locked profile holds the running balance and seq
+        append_entry(
+            profile,
+            "earn",
+            points,
+            reference_type=reference_type,
+            reference_id=reference_id,
             description=description,
+            event_count=event_count,
+        )
+        profile.save(
+            update_fields=[
+                "total_points",
+                "available_points",
+                "current_level",
+                "progress_to_next_level",
+                "ledger_seq",
+            ]
         )
-        check_and_award_badges(user)
+        # Event processing batches the badge check per user instead
+        if check_badges:
+            check_and_award_badges(user, profile=profile, changed=AWARD_CRITERIA_KEYS)
+        transaction.on_commit(lambda: rank_service.record_points(user.pk, points))
 
 
+@retry_on_conflict
 def spend_points(user, amount, reference_type=None, reference_id=None, description=""):
+    # Zero is a valid spend: free shop items check out through here
+    if amount < 0:
+        raise BusinessLogicError("Amount must not be negative.")
     with transaction.atomic():
-        profile = UserPointProfile.objects.get(user=user)
+        # The row lock serializes spends per user; the reference, when given,
+        # is the idempotency key and a replay returns the original balance
+        profile = _lock_point_profile(user)
+        existing = find_entry(user.pk, "spend", reference_type, reference_id)
+        if existing:
+            return existing.balance_after
         if profile.available_points < amount:
-            raise Exception("Insufficient points.")
+            raise InsufficientFundsError("Insufficient points.")
         profile.available_points -= amount
-        profile.save(update_fields=["available_points"])
         PointActivity.objects.create(
             user=user,
             action="spend_points",
@@ -88,20 +125,143 @@ def spend_points(user, amount, reference_type=None, reference_id=None, descripti
             description=description,
             timestamp=timezone.now(),
         )
-        last_ledger = (
-            PointLedger.objects.filter(user=user).order_by("-created_at").first()
+        entry = append_entry(
+            profile,
+            "spend",
+            -amount,
+            reference_type=reference_type,
+            reference_id=reference_id,
+            description=description,
         )
-        balance_after = (last_ledger.balance_after if last_ledger else 0) - amount
-        PointLedger.objects.create(
-            user=user,
-            transaction_type="spend",
-            points=-amount,
-            balance_after=balance_after,
-            reference_type=reference_type or "",
-            reference_id=reference_id or "",
+        profile.save(update_fields=["available_points", "ledger_seq"])
+        check_and_award_badges(user, profile=profile, changed=("spending",))
+        return entry.balance_after
+
+
+@retry_on_conflict
+def refund_points(user, amount, reference_type=None, reference_id=None, description=""):
+    with transaction.atomic():
+        profile = _lock_point_profile(user)
+        existing = find_entry(user.pk, "refund", reference_type, reference_id)
+        if existing:
+            return existing.balance_after
+        profile.available_points += amount
+        entry = append_entry(
+            profile,
+            "refund",
+            amount,
+            reference_type=reference_type,
+            reference_id=reference_id,
             description=description,
         )
-        return balance_after
+        profile.save(update_fields=["available_points", "ledger_seq"])
+        return entry.balance_after
+
+
+def award_points_bulk(
+    user_ids,
+    points,
+    action,
+    description="",
+    reference_type=None,
+    reference_id=None,
+    batch_size=1000,
+):
+    """
+    Award the same points to many users with set-based queries.
+
+    Each batch runs in one transaction: missing profiles are inserted, the
+    batch's profiles are locked in user order, activities and ledger
+    entries are bulk-inserted and the profiles are bulk-updated with their
+    new balances, levels and ledger sequence. Users who already hold a
+    referenced award are skipped. Badge evaluation is queued per batch
+    after commit. Returns the number of users awarded.
+    """
+    from itertools import islice
+    from .stats import increment_action_counts
+    from .tasks import evaluate_badges_for_users
+
+    user_ids = iter(user_ids)
+    awarded = 0
+    while True:
+        batch = list(islice(user_ids, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            UserPointProfile.objects.bulk_create(
+                [UserPointProfile(user_id=user_id) for user_id in batch],
+                ignore_conflicts=True,
+            )
+            profiles = list(
+                UserPointProfile.objects.select_for_update()
+                .filter(user_id__in=batch)
+                .order_by("user_id")
+            )
+            if reference_id:
+                already = referenced_users(batch, "earn", reference_type, reference_id)
+                profiles = [p for p in profiles if p.user_id not in already]
+            if not profiles:
+                continue
+            now = timezone.now()
+            activities = []
+            entries = []
+            for profile in profiles:
+                profile.total_points += points
+                profile.available_points += points
+                profile.ledger_seq += 1
+                current_level, _, progress = level_table.resolve(profile.total_points)
+                profile.current_level = current_level
+                profile.progress_to_next_level = progress
+                activities.append(
+                    PointActivity(
+                        user_id=profile.user_id,
+                        action=action,
+                        points=points,
+                        transaction_type="earn",
+                        reference_type=reference_type or "",
+                        reference_id=reference_id or "",
+                        description=description,
+                        timestamp=now,
+                    )
+                )
+                entries.append(
+                    PointLedger(
+                        user_id=profile.user_id,
+                        seq=profile.ledger_seq,
+                        transaction_type="earn",
+                        points=points,
+                        balance_after=profile.available_points,
+                        reference_type=reference_type or "",
+                        reference_id=reference_id or "",
+                        description=description,
+                    )
+                )
+            PointActivity.objects.bulk_create(activities, batch_size=batch_size)
+            PointLedger.objects.bulk_create(entries, batch_size=batch_size)
+            UserPointProfile.objects.bulk_update(
+                profiles,
+                [
+                    "total_points",
+                    "available_points",
+                    "current_level",
+                    "progress_to_next_level",
+                    "ledger_seq",
+                ],
+                batch_size=batch_size,
+            )
+            # bulk_create skips the post_save receiver that maintains counters
+            awarded_ids = [profile.user_id for profile in profiles]
+            increment_action_counts(awarded_ids, action)
+            transaction.on_commit(
+                lambda ids=awarded_ids: rank_service.record_points_bulk(ids, points)
+            )
+            transaction.on_commit(
+                lambda ids=awarded_ids: evaluate_badges_for_users.delay(
+                    [str(user_id) for user_id in ids], list(AWARD_CRITERIA_KEYS)
+                )
+            )
+        awarded += len(profiles)
+    return awarded
 
 
 def get_user_balance(user):
@@ -112,35 +272,53 @@ def get_user_balance(user):
 def validate_sufficient_points(user, amount):
     profile = UserPointProfile.objects.get(user=user)
     if profile.available_points < amount:
-        raise Exception("Insufficient points.")
+        raise InsufficientFundsError("Insufficient points.")
     return True
 
 
 def recalculate_user_balance(user):
-    last_ledger = PointLedger.objects.filter(user=user).order_by("-created_at").first()
-    balance = last_ledger.balance_after if last_ledger else 0
-    profile = UserPointProfile.objects.get(user=user)
-    profile.available_points = balance
-    profile.save(update_fields=["available_points"])
-    return balance
-
-
-def check_and_award_badges(user, **kwargs):
-    profile = UserPointProfile.objects.get(user=user)
-    badges = Badge.objects.all()
-    for badge in badges:
-        if not UserBadge.objects.filter(user=user, badge=badge).exists():
-            if CriteriaRegistry.evaluate_criteria(user, profile, badge.criteria or {}):
-                UserBadge.objects.create(user=user, badge=badge)
-    # Spending-based badges example
-    total_spent = (
-        PointLedger.objects.filter(user=user, transaction_type="spend").aggregate(
-            models.Sum("points")
-        )["points__sum"]
-        or 0
+    # Latest snapshot plus the ledger entries after it
+    with transaction.atomic():
+        profile = _lock_point_profile(user)
+        balance = ledger_balance(user.pk)
+        if profile.available_points != balance:
+            profile.available_points = balance
+            profile.save(update_fields=["available_points"])
+        return balance
+
+
+def check_and_award_badges(user, profile=None, changed=None, **kwargs):
+    """
+    Award any badges the user has newly qualified for.
+
+    ``changed`` lists the criteria keys whose inputs the triggering event
+    touched (see ``AWARD_CRITERIA_KEYS``); only badges depending on those
+    keys are re-evaluated. Pass ``None`` for a full catalog sweep.
+    """
+    candidates = badge_index.candidates(changed)
+    if not candidates:
+        return []
+    owned = set(
+        UserBadge.objects.filter(
+            user=user, badge_id__in=[badge.pk for badge in candidates]
+        ).values_list("badge_id", flat=True)
     )
-    # Example: if total_spent <= -1000: award "Big Spender" badge
-    # ...
+    pending = [badge for badge in candidates if badge.pk not in owned]
+    if not pending:
+        return []
+    if profile is None:
+        profile = UserPointProfile.objects.get(user=user)
+    awarded = [
+        badge
+        for badge in pending
+        if CriteriaRegistry.evaluate_criteria(user, profile, badge.criteria or {})
+    ]
+    if awarded:
+        UserBadge.objects.bulk_create(
+            [UserBadge(user=user, badge=badge) for badge in awarded],
+            ignore_conflicts=True,
+        )
+    return awarded
 
 
 def badge_criteria_met(badge, profile):
@@ -154,21 +332,10 @@ def badge_criteria_met(badge, profile):
 def update_user_streak(user, streak_type):
     """Update or increment a user's streak of the given type."""
     try:
-        streak, created = Streak.objects.get_or_create(
-            user=user, streak_type=streak_type
-        )
-        today = timezone.now().date()
-        if streak.last_activity_date == today:
-            return streak  # Already updated today
-        if streak.last_activity_date == today - timezone.timedelta(days=1):
-            streak.current_count += 1
-        else:
-            streak.current_count = 1
-        streak.last_activity_date = today
-        if streak.current_count > streak.longest_count:
-            streak.longest_count = streak.current_count
-        streak.is_active = True
-        streak.save()
+        advanced = advance_streak(user.pk, streak_type, timezone.localdate())
+        streak = get_user_streak(user, streak_type)
+        if advanced and streak_type == "login":
+            rank_service.record_streak(user.pk, streak.current_count)
         return streak
     except Exception:
         return None
@@ -181,6 +348,8 @@ def reset_user_streak(user, streak_type):
         streak.current_count = 0
         streak.is_active = False
         streak.save()
+        if streak_type == "login":
+            rank_service.record_streak(user.pk, 0)
     except Streak.DoesNotExist:
         pass
 
@@ -198,7 +367,7 @@ def check_streak_eligibility(user):
     # Example: award badge for 7-day login streak
     streak = get_user_streak(user, "login")
     if streak and streak.current_count >= 7:
-        check_and_award_badges(user)
+        check_and_award_badges(user, changed=("streak",))
 
 
 # --- Quest Management ---
@@ -227,6 +396,7 @@ def complete_quest(user, quest):
                 )
             if quest.badge_reward:
                 UserBadge.objects.get_or_create(user=user, badge=quest.badge_reward)
+            check_and_award_badges(user, changed=("quest",))
     except UserQuest.DoesNotExist:
         pass
 
@@ -313,16 +483,7 @@ def check_event_eligibility(user, event):
 def award_social_points(user, action_type, target_object):
     """Award points for social actions."""
     # Example: award points for comment, like, share, etc.
-    points_map = {
-        "comment": 3,
-        "like": 1,
-        "share": 5,
-        "referral": 10,
-        "discussion": 10,
-        "solution": 5,
-        "follower": 3,
-    }
-    points = points_map.get(action_type, 0)
+    points = social_points(action_type)
     if points > 0:
         award_points(user, points, f"Social action: {action_type}")
 
@@ -1,6 +1,8 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import (
     Level,
@@ -27,6 +29,7 @@ from .serializers import (
     LeaderboardSerializer,
     BalanceSerializer,
     SpendingHistorySerializer,
+    BulkAwardSerializer,
     StreakSerializer,
     QuestSerializer,
     UserQuestSerializer,
@@ -35,6 +38,8 @@ from .serializers import (
     EventSerializer,
     LeaderboardDetailSerializer,
 )
+from .leaderboards import PERIOD_TYPES, current_period_bounds
+from .ranking import rank_service
 from django.shortcuts import get_object_or_404
 from apps.shared.permissions import RoleBasedPermission, PermissionRequired, IsOwnerOrReadOnly
 
@@ -394,14 +399,47 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         'rank_history': ['view_rank_history'],
     }
 
+    def _period(self, default="all_time"):
+        period = self.request.query_params.get("period_type", default)
+        return period if period in PERIOD_TYPES else default
+
+    def _int_param(self, name, default, maximum):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except (TypeError, ValueError):
+            return default
+        return max(0, min(value, maximum))
+
+    def _with_usernames(self, entries):
+        usernames = dict(
+            User.objects.filter(
+                id__in=[entry["user_id"] for entry in entries]
+            ).values_list("id", "username")
+        )
+        usernames = {str(user_id): name for user_id, name in usernames.items()}
+        for entry in entries:
+            entry["username"] = usernames.get(entry["user_id"])
+        return entries
+
     def get_queryset(self):
-        period = self.request.query_params.get("period_type", "all_time")
-        return Leaderboard.objects.filter(period_type=period).order_by("rank")
+        start, _ = current_period_bounds(self._period())
+        return Leaderboard.objects.filter(
+            period_type=self._period(), period_start=start
+        ).order_by("rank")
+
+    def list(self, request, *args, **kwargs):
+        period = self._period()
+        limit = self._int_param("limit", 10, 100)
+        offset = self._int_param("offset", 0, 10000)
+        entries = rank_service.top(period, limit=limit, offset=offset)
+        return Response(
+            {"period_type": period, "results": self._with_usernames(entries)}
+        )
 
     @action(detail=False, methods=["get"])
     def streak_leaders(self, request):
-        # Placeholder: streak leaderboard logic
-        return Response([])
+        limit = self._int_param("limit", 10, 100)
+        return Response(self._with_usernames(rank_service.streak_leaders(limit)))
 
     @action(detail=False, methods=["get"])
     def social_leaders(self, request):
@@ -415,13 +453,71 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=["get"])
     def my_rank(self, request):
-        # Placeholder: user's rank
-        return Response({})
+        period = self._period()
+        entry = rank_service.get_rank(request.user.pk, period)
+        if entry is None:
+            return Response({"period_type": period, "rank": None, "score": 0})
+        entry["period_type"] = period
+        radius = self._int_param("around", 0, 25)
+        if radius:
+            entry["around"] = self._with_usernames(
+                rank_service.around(request.user.pk, period, radius=radius)
+            )
+        return Response(entry)
 
     @action(detail=False, methods=["get"])
     def rank_history(self, request):
-        # Placeholder: user's rank over time
-        return Response({})
+        period = request.query_params.get("period_type", "weekly")
+        if period not in PERIOD_TYPES:
+            period = "weekly"
+        history = Leaderboard.objects.filter(
+            user=request.user, period_type=period
+        ).order_by("-period_start")[:12]
+        return Response(
+            {
+                "period_type": period,
+                "history": LeaderboardSerializer(history, many=True).data,
+            }
+        )
+
+
+class BulkAwardView(APIView):
+    """
+    Admin campaign awards to ``user_ids`` or every student enrolled in
+    ``course_id``. Up to ``GAMIFICATION_BULK_AWARD_INLINE_LIMIT`` explicit
+    users are awarded in the request; larger batches and course-wide
+    campaigns are queued on Celery and answered with 202.
+    """
+
+    permission_classes = [permissions.IsAdminUser, PermissionRequired]
+    required_permissions = ["award_bulk_points"]
+
+    def post(self, request):
+        serializer = BulkAwardSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        user_ids = data.pop("user_ids", None)
+        course_id = data.pop("course_id", None)
+        limit = getattr(settings, "GAMIFICATION_BULK_AWARD_INLINE_LIMIT", 500)
+        if course_id is not None or len(user_ids) > limit:
+            from .tasks import award_points_bulk_task
+
+            award_points_bulk_task.delay(
+                user_ids=[str(user_id) for user_id in user_ids] if user_ids else None,
+                course_id=str(course_id) if course_id else None,
+                **data,
+            )
+            return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
+        from .tasks import bulk_award_recipients
+        from .utils import award_points_bulk
+
+        awarded = award_points_bulk(
+            bulk_award_recipients(user_ids),
+            data.pop("points"),
+            data.pop("action"),
+            **data,
+        )
+        return Response({"status": "awarded", "users_awarded": awarded})
 
 
 class AwardViewSet(viewsets.ViewSet):
@@ -447,11 +543,15 @@ class AwardViewSet(viewsets.ViewSet):
         reference_type = request.data.get("reference_type", "")
         reference_id = request.data.get("reference_id", "")
         description = request.data.get("description", "")
+        # Retried requests carrying the same Idempotency-Key spend only once
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if idempotency_key and not reference_id:
+            reference_type, reference_id = "idempotency_key", idempotency_key[:50]
         user = get_object_or_404(User, id=user_id)
         from .utils import spend_points
 
-        spend_points(user, amount, reference_type, reference_id, description)
-        return Response({"status": "spent"})
+        balance = spend_points(user, amount, reference_type, reference_id, description)
+        return Response({"status": "spent", "balance": balance})
 
     @action(detail=False, methods=["post"])
     def adjust_balance(self, request):
@@ -467,5 +567,12 @@ class AwardViewSet(viewsets.ViewSet):
         balance = recalculate_user_balance(user)
         return Response({"new_balance": balance})
 
+    @action(detail=False, methods=["get"])
+    def social_buffer_stats(self, request):
+        # Counters for the social event coalescer: buffered, flushed, dropped
+        from .coalescing import social_coalescer
+
+        return Response(social_coalescer.stats())
+
 # All ViewSets now use RoleBasedPermission or PermissionRequired with permission_required_map or required_permissions for RBAC.
 # No further changes needed as the RBAC implementation is already present and comprehensive for all endpoints.
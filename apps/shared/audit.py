@@ -0,0 +1,215 @@
+import atexit
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STAT_NAMES = ("enqueued", "sampled_out", "dropped", "flushed", "failed")
+# Columns written to archives and exports, one JSON object per record
+EXPORT_FIELDS = (
+    "id",
+    "created_at",
+    "user_id",
+    "action",
+    "resource_type",
+    "resource_id",
+    "resource_repr",
+    "ip_address",
+    "user_agent",
+    "extra_data",
+)
+ARCHIVE_PATH = "audit_archive"
+ARCHIVE_BATCH_SIZE = 50000
+
+
+class AuditPipeline:
+    """
+    Off-request writer for AuditLog records.
+
+    The request path only builds a dict and puts it on a bounded in-process
+    queue; a daemon thread drains the queue and writes it with
+    ``bulk_create`` in batches of ``batch_size``, at least every
+    ``flush_interval`` seconds. When the queue is full new records are
+    dropped and counted rather than blocking the request. With
+    ``AUDIT_LOG_SYNC`` records are written inline, which keeps tests
+    deterministic.
+    """
+
+    def __init__(self, max_size=None, batch_size=None, flush_interval=None):
+        self.max_size = max_size or getattr(settings, "AUDIT_QUEUE_SIZE", 10000)
+        self.batch_size = batch_size or getattr(settings, "AUDIT_BATCH_SIZE", 200)
+        self.flush_interval = flush_interval or getattr(
+            settings, "AUDIT_FLUSH_INTERVAL", 2.0
+        )
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._thread = None
+        self._pid = None
+
+    @staticmethod
+    def sample_rate(method):
+        if method in READ_METHODS:
+            return getattr(settings, "AUDIT_READ_SAMPLE_RATE", 1.0)
+        return 1.0
+
+    def should_record(self, method, status_code):
+        """Sample successful reads; writes and errors are always recorded."""
+        rate = self.sample_rate(method)
+        if status_code >= 400 or rate >= 1 or random.random() < rate:
+            return True
+        self._incr("sampled_out")
+        return False
+
+    def enqueue(self, record):
+        """
+        Queue one record (AuditLog field values); never blocks. The record
+        is stamped with the current time here, not when its batch is written.
+        """
+        record.setdefault("created_at", timezone.now())
+        if getattr(settings, "AUDIT_LOG_SYNC", False):
+            self._incr("enqueued")
+            self._write([record])
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._incr("dropped")
+            return
+        self._incr("enqueued")
+
+    def flush(self):
+        """Write everything queued so far; returns the number written."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size, timeout=None)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            stats = {name: self._stats[name] for name in STAT_NAMES}
+        stats["depth"] = self._queue.qsize()
+        stats["capacity"] = self.max_size
+        return stats
+
+    def _incr(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def _ensure_worker(self):
+        # A forked worker process inherits the flag but not the thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _take(self, limit, timeout):
+        """Up to ``limit`` queued records, waiting ``timeout`` for the first."""
+        batch = []
+        try:
+            if timeout is None:
+                batch.append(self._queue.get_nowait())
+            else:
+                batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < limit:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take(self.batch_size, timeout=self.flush_interval)
+            if batch:
+                close_old_connections()
+                self._write(batch)
+
+    def _write(self, records):
+        from .models import AuditLog
+
+        try:
+            AuditLog.objects.bulk_create(
+                [AuditLog(**record) for record in records], batch_size=self.batch_size
+            )
+        except Exception as e:
+            self._incr("failed", len(records))
+            logger.error(
+                f"Failed to write {len(records)} audit log records: {e}", exc_info=True
+            )
+            return 0
+        self._incr("flushed", len(records))
+        return len(records)
+
+
+audit_pipeline = AuditPipeline()
+
+
+@atexit.register
+def _flush_on_exit():
+    if audit_pipeline._thread is not None:
+        audit_pipeline.flush()
+
+
+def to_jsonl(rows):
+    """Yield each row of ``values(*EXPORT_FIELDS)`` as one JSON line."""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def archive_audit_logs(before, storage=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move AuditLog records created before ``before`` into gzipped JSONL
+    files on ``storage`` (a StorageService), one file per batch, oldest
+    first. A batch is deleted only after its file is saved, so a failure
+    can at worst archive a batch twice. Returns the number archived.
+    """
+    from infrastructure.storage import StorageService
+
+    from .models import AuditLog
+
+    storage = storage or StorageService()
+    records = AuditLog.objects.filter(created_at__lt=before).order_by("id")
+    archived = 0
+    while True:
+        batch = list(records.values(*EXPORT_FIELDS)[:batch_size])
+        if not batch:
+            break
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+            for line in to_jsonl(batch):
+                archive.write(line.encode())
+        first, last = batch[0], batch[-1]
+        name = f"audit-{first['id']}-{last['id']}.jsonl.gz"
+        storage.upload_file(
+            ContentFile(buffer.getvalue(), name=name),
+            f"{ARCHIVE_PATH}/{first['created_at']:%Y/%m/%d}",
+        )
+        # Ids are ascending, so the batch is exactly this id range
+        AuditLog.objects.filter(
+            id__gte=first["id"], id__lte=last["id"], created_at__lt=before
+        ).delete()
+        archived += len(batch)
+    return archived
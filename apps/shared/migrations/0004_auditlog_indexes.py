@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:34
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """
+    Builds the index without locking writes on PostgreSQL; other backends
+    (SQLite in tests) have no concurrent builds and use a plain AddIndex.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+
+class Migration(migrations.Migration):
+    # audit_logs is large and written on every request; concurrent index
+    # builds cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("shared", "0003_remove_auditlog_audit_logs_user_id_fbfd51_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["user", "-created_at"], name="audit_logs_user_created_idx"
+            ),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["resource_type", "resource_id"], name="audit_logs_resource_idx"
+            ),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name="auditlog",
+            index=models.Index(fields=["created_at"], name="audit_logs_created_idx"),
+        ),
+    ]
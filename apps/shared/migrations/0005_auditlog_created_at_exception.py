@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0004_auditlog_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="auditlog",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("CREATE", "Create"),
+                    ("UPDATE", "Update"),
+                    ("DELETE", "Delete"),
+                    ("VIEW", "View"),
+                    ("LOGIN", "Login"),
+                    ("LOGOUT", "Logout"),
+                    ("PASSWORD_CHANGE", "Password Change"),
+                    ("PERMISSION_CHANGE", "Permission Change"),
+                    ("EXCEPTION", "Exception"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="auditlog",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
@@ -65,14 +65,17 @@ class SoftDeleteQuerySet(models.QuerySet):
 
 
 class SoftDeleteManager(models.Manager):
+    # Subclasses built with from_queryset() swap in their own queryset class
+    _queryset_class = SoftDeleteQuerySet
+
     def get_queryset(self):
-        return SoftDeleteQuerySet(self.model, using=self._db).filter(is_deleted=False)
+        return self._queryset_class(self.model, using=self._db).filter(is_deleted=False)
 
     def include_deleted(self):
-        return SoftDeleteQuerySet(self.model, using=self._db)
+        return self._queryset_class(self.model, using=self._db)
 
     def deleted_only(self):
-        return SoftDeleteQuerySet(self.model, using=self._db).filter(is_deleted=True)
+        return self._queryset_class(self.model, using=self._db).filter(is_deleted=True)
 
 
 class SoftDeleteModel(models.Model):
@@ -144,8 +147,12 @@ class AuditLog(TimeStampedModel):
         ("LOGOUT", "Logout"),
         ("PASSWORD_CHANGE", "Password Change"),
         ("PERMISSION_CHANGE", "Permission Change"),
+        ("EXCEPTION", "Exception"),
     ]
 
+    # Set when the record is built rather than when it is written, since
+    # queued records reach the database in delayed batches
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     user = models.ForeignKey(
         "authentication.User",
         on_delete=models.SET_NULL,
@@ -164,6 +171,16 @@ class AuditLog(TimeStampedModel):
     class Meta:
         db_table = "audit_logs"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], name="audit_logs_user_created_idx"
+            ),
+            models.Index(
+                fields=["resource_type", "resource_id"], name="audit_logs_resource_idx"
+            ),
+            # Range scans for retention and time-bounded exports
+            models.Index(fields=["created_at"], name="audit_logs_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} {self.action} {self.resource_type} {self.resource_id}"
@@ -3,7 +3,7 @@ from rest_framework.permissions import BasePermission
 from django.contrib.auth.models import AnonymousUser
 from guardian.shortcuts import get_objects_for_user
 from django.core.exceptions import ObjectDoesNotExist
-from apps.authorization.models import UserRole, Role, Permission
+from apps.authorization.resolver import get_permission_set
 
 
 class IsOwnerOrReadOnly(BasePermission):
@@ -56,22 +56,23 @@ class IsOwnerOrAdmin(BasePermission):
 
 class RoleBasedPermission(BasePermission):
     """
-    Permission class that checks if user has required role.
-    Usage: Set required_roles in view class.
+    Permission class that checks if user has required role and, for the
+    current action, the permissions in the view's permission_required_map.
+    Usage: Set required_roles and/or permission_required_map in view class.
     """
 
     def has_permission(self, request, view):
         if isinstance(request.user, AnonymousUser):
             return False
 
+        permissions = get_permission_set(request.user, request.auth)
         required_roles = getattr(view, "required_roles", [])
-        if not required_roles:
-            return True
+        if required_roles and not permissions.has_role(*required_roles):
+            return False
 
-        user_roles = UserRole.objects.filter(user=request.user).values_list(
-            "role__name", flat=True
-        )
-        return any(role in user_roles for role in required_roles)
+        if request.user.is_superuser:
+            return True
+        return permissions.allows_action(type(view), getattr(view, "action", None))
 
 
 class PermissionRequired(BasePermission):
@@ -97,10 +98,9 @@ class PermissionRequired(BasePermission):
         if not required_permissions:
             return True
 
-        user_permissions = Permission.objects.filter(
-            userrole__user=request.user
-        ).values_list("codename", flat=True)
-        return any(perm in user_permissions for perm in required_permissions)
+        return get_permission_set(request.user, request.auth).has_any(
+            required_permissions
+        )
 
 
 class ObjectPermissionMixin(BasePermission):
@@ -361,7 +361,6 @@ class DynamicPermissionRequired(BasePermission):
             return False
         if not self.required_permission:
             return True
-        user_permissions = Permission.objects.filter(
-            userrole__user=request.user
-        ).values_list("codename", flat=True)
-        return self.required_permission in user_permissions
+        return get_permission_set(request.user, request.auth).has(
+            self.required_permission
+        )
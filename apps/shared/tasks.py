@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from .audit import archive_audit_logs
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def archive_old_audit_logs():
+    # Move audit records past the retention window to compressed archives
+    cutoff = timezone.now() - timezone.timedelta(days=settings.AUDIT_RETENTION_DAYS)
+    archived = archive_audit_logs(before=cutoff)
+    logger.info(f"Archived {archived} audit log records older than {cutoff:%Y-%m-%d}")
+    return archived
@@ -0,0 +1,67 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.shared.audit import AuditPipeline, audit_pipeline
+from apps.shared.models import AuditLog
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_request_writes_one_record_with_status_and_duration():
+    user = User.objects.create_user(
+        username="audited", email="audited@example.com", password="pass"
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.get(reverse("api:v1:courses:course-list"))
+
+    record = AuditLog.objects.get(resource_type="API_REQUEST")
+    assert record.user == user
+    assert record.resource_repr == "GET /api/v1/courses/courses/"
+    assert record.extra_data["status"] == 403
+    assert record.extra_data["duration_ms"] >= 0
+
+
+@pytest.mark.django_db
+def test_successful_reads_are_sampled(settings):
+    settings.AUDIT_READ_SAMPLE_RATE = 0
+    before = audit_pipeline.stats()["sampled_out"]
+    assert not audit_pipeline.should_record("GET", 200)
+    assert audit_pipeline.should_record("GET", 404)
+    assert audit_pipeline.should_record("POST", 201)
+    assert audit_pipeline.stats()["sampled_out"] == before + 1
+
+
+@pytest.mark.django_db
+def test_full_queue_drops_and_flush_writes_in_batches(settings, monkeypatch):
+    settings.AUDIT_LOG_SYNC = False
+    pipeline = AuditPipeline(max_size=2, batch_size=1)
+    monkeypatch.setattr(pipeline, "_ensure_worker", lambda: None)
+    for index in range(3):
+        pipeline.enqueue(
+            {"action": "VIEW", "resource_type": "TEST", "resource_repr": str(index)}
+        )
+    assert pipeline.stats()["depth"] == 2
+    assert pipeline.stats()["dropped"] == 1
+
+    assert pipeline.flush() == 2
+    stats = pipeline.stats()
+    assert (stats["depth"], stats["flushed"], stats["enqueued"]) == (0, 2, 2)
+    assert AuditLog.objects.filter(resource_type="TEST").count() == 2
+
+
+@pytest.mark.django_db
+def test_records_keep_request_time_and_exception_action(settings, monkeypatch):
+    settings.AUDIT_LOG_SYNC = False
+    pipeline = AuditPipeline()
+    monkeypatch.setattr(pipeline, "_ensure_worker", lambda: None)
+    pipeline.enqueue({"action": "EXCEPTION", "resource_type": "TEST"})
+    queued_at = pipeline._queue.queue[0]["created_at"]
+
+    assert pipeline.flush() == 1
+    record = AuditLog.objects.get(resource_type="TEST")
+    assert record.created_at == queued_at
+    assert record.get_action_display() == "Exception"
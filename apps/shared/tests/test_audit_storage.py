@@ -0,0 +1,81 @@
+import gzip
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.shared.audit import archive_audit_logs
+from apps.shared.models import AuditLog
+from infrastructure.storage import StorageService
+
+User = get_user_model()
+
+
+def make_logs(count, resource_type="TEST", user=None):
+    return [
+        AuditLog.log_action(
+            user=user,
+            action="VIEW",
+            resource_type=resource_type,
+            resource_id=str(index),
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_archive_moves_old_records_to_compressed_files(tmp_path):
+    old = make_logs(5)
+    recent = make_logs(2, resource_type="RECENT")
+    AuditLog.objects.filter(id__in=[log.id for log in old]).update(
+        created_at=timezone.now() - timezone.timedelta(days=100)
+    )
+    storage = StorageService(FileSystemStorage(location=tmp_path))
+
+    archived = archive_audit_logs(
+        before=timezone.now() - timezone.timedelta(days=90),
+        storage=storage,
+        batch_size=2,
+    )
+
+    assert archived == 5
+    assert set(AuditLog.objects.values_list("id", flat=True)) == {
+        log.id for log in recent
+    }
+    files = sorted(tmp_path.rglob("*.jsonl.gz"))
+    assert len(files) == 3
+    rows = [
+        json.loads(line)
+        for path in files
+        for line in gzip.decompress(path.read_bytes()).splitlines()
+    ]
+    assert sorted(row["id"] for row in rows) == sorted(log.id for log in old)
+
+
+@pytest.mark.django_db
+def test_export_streams_filtered_json_lines():
+    admin = User.objects.create_user(
+        username="auditor", email="auditor@example.com", password="pass"
+    )
+    admin.is_staff = True
+    admin.save()
+    make_logs(3, user=admin)
+    make_logs(2, resource_type="OTHER")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    url = reverse("api:v1:shared:audit-log-export")
+
+    response = client.get(url, {"user": admin.pk, "resource_type": "TEST"})
+    assert response.status_code == 200
+    assert response.streaming
+    rows = [
+        json.loads(line) for line in b"".join(response.streaming_content).splitlines()
+    ]
+    assert len(rows) == 3
+    assert {row["user_id"] for row in rows} == {str(admin.pk)}
+
+    assert client.get(url, {"since": "yesterday"}).status_code == 400
@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from apps.courses.models import Course
+from infrastructure import cache as cache_module
+from infrastructure.cache import CacheHandler, cache_handler, invalidate_tags, memoize
+
+User = get_user_model()
+
+
+def make_handler(**kwargs):
+    options = {"local_ttl": 60, "jitter": 0, "sync_interval": 0, **kwargs}
+    return CacheHandler(**options)
+
+
+def test_reads_are_served_locally_after_the_first_hit():
+    handler = make_handler()
+    handler.clear()
+    assert handler.get("tests:two_tier:a") is None
+    handler.set("tests:two_tier:a", {"value": 1})
+    handler.local.clear()
+
+    assert handler.get("tests:two_tier:a") == {"value": 1}
+    assert handler.get("tests:two_tier:a") == {"value": 1}
+    stats = handler.stats()["tests:two_tier"]
+    assert (stats["misses"], stats["hits"], stats["local_hits"]) == (1, 1, 1)
+
+
+def test_local_tier_evicts_least_recently_used():
+    handler = make_handler(local_max_entries=2)
+    for key in ("tests:lru:a", "tests:lru:b", "tests:lru:c"):
+        handler.set(key, key)
+
+    assert handler.stats()["tests:lru"]["evictions"] == 1
+    assert list(handler.local._entries) == ["tests:lru:b", "tests:lru:c"]
+    # Evicted keys are still served by the shared tier
+    assert handler.get("tests:lru:a") == "tests:lru:a"
+
+
+def test_invalidating_a_prefix_reaches_other_processes():
+    first, second = make_handler(), make_handler()
+    first.set("tests:shared:a", "old")
+    assert second.get("tests:shared:a") == "old"
+
+    first.invalidate("tests:shared")
+    assert second.get("tests:shared:a") is None
+    assert first.get("tests:shared:a") is None
+
+
+def test_shared_timeouts_are_jittered():
+    handler = make_handler(jitter=0.5)
+    timeouts = {handler._jittered(100) for _ in range(50)}
+    assert all(100 <= timeout <= 150 for timeout in timeouts)
+    assert len(timeouts) > 1
+    assert handler._jittered(None) is None
+
+
+class InlineExecutor:
+    def submit(self, func, *args):
+        func(*args)
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache_handler.clear()
+    monkeypatch.setattr(cache_module, "refresh_executor", InlineExecutor())
+    yield
+    cache_handler.clear()
+
+
+def test_keys_are_stable_for_models_querysets_and_kwargs(db):
+    @memoize()
+    def lookup(user, courses=None, limit=5):
+        return None
+
+    user = User.objects.create_user(
+        username="memo", email="memo@example.com", password="pass"
+    )
+    same_user = User.objects.get(pk=user.pk)
+    courses = Course.objects.filter(is_published=True)
+    assert lookup.key(user, courses) == lookup.key(
+        same_user, limit=5, courses=Course.objects.filter(is_published=True)
+    )
+    assert lookup.key(user, courses) != lookup.key(user, courses, limit=6)
+    assert lookup.key(user, Course.objects.none()) != lookup.key(user, courses)
+
+
+def test_falsy_results_are_cached(fresh_cache):
+    calls = []
+
+    @memoize()
+    def empty(key):
+        calls.append(key)
+        return None if key == "none" else []
+
+    assert [empty("none"), empty("none"), empty("list"), empty("list")] == [
+        None,
+        None,
+        [],
+        [],
+    ]
+    assert calls == ["none", "list"]
+
+
+def test_concurrent_misses_compute_once(fresh_cache):
+    calls = []
+    started = threading.Event()
+
+    @memoize(wait=5)
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(slow()))
+    first.start()
+    started.wait(1)
+    results.append(slow())
+    first.join()
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+
+
+def test_stale_results_are_served_while_refreshing(fresh_cache):
+    values = iter(["first", "second"])
+
+    @memoize(timeout=60, stale_ttl=600)
+    def report():
+        return next(values)
+
+    assert report() == "first"
+    cache_key = report.key()
+    value, _, versions = cache_handler.get(cache_key)
+    cache_handler.set(cache_key, (value, time.time() - 1, versions), 600)
+
+    # The stale value is returned and the refresh replaces it
+    assert report() == "first"
+    assert report() == "second"
+
+
+def test_tags_invalidate_dependent_results(fresh_cache):
+    counts = {"a": 0}
+
+    @memoize(tags=lambda course_id: [f"course:{course_id}"])
+    def course_stats(course_id):
+        counts["a"] += 1
+        return counts["a"]
+
+    assert course_stats("a") == course_stats("a") == 1
+    invalidate_tags("course:a")
+    assert course_stats("a") == 2
+    invalidate_tags("course:b")
+    assert course_stats("a") == 2
+
+
+def test_tag_invalidations_from_other_processes_are_seen_at_once(fresh_cache):
+    counts = {"a": 0}
+
+    @memoize(tags=["course:shared"])
+    def course_stats():
+        counts["a"] += 1
+        return counts["a"]
+
+    assert course_stats() == course_stats() == 1
+    # Another process bumps the tag in the shared tier only
+    key = f"{cache_module.TAG_KEY_PREFIX}:course:shared"
+    cache_handler.backend.incr(key, version=cache_handler.version("memo:tags"))
+    assert course_stats() == 2
@@ -0,0 +1,131 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from middleware import rate_limiting
+from middleware.rate_limiting import (
+    InMemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitThrottle,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    backend = InMemoryRateLimitBackend()
+    monkeypatch.setattr(rate_limiting.rate_limiter, "_backend", backend)
+    return rate_limiting.rate_limiter
+
+
+def anonymous_request(path="/api/v1/courses/"):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    return request
+
+
+def test_burst_then_retry_after(settings):
+    settings.RATE_LIMIT_DEFAULT = "3/min"
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+    decisions = [limiter.check(anonymous_request(), "test") for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    # One request's worth of the window must drain first
+    assert 19 <= decisions[3].retry_after <= 20
+    # Other clients have their own allowance
+    other = anonymous_request()
+    other.META["REMOTE_ADDR"] = "10.0.0.2"
+    assert limiter.check(other, "test").allowed
+
+
+def test_policy_by_route_and_role(settings):
+    settings.RATE_LIMIT_DEFAULT = "100/min"
+    settings.RATE_LIMIT_ROUTES = {
+        "/api/v1/auth/": "10/min",
+        "/api/v1/auth/login/": {"default": "5/min", "Support": "50/min"},
+        "/static/": None,
+    }
+    settings.RATE_LIMIT_ROLE_RATES = {"Support": "20/min", "Admin": "1000/min"}
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+
+    assert limiter.route_for("/api/v1/auth/login/") == "/api/v1/auth/login/"
+    assert limiter.policy(limiter.route_for("/api/v1/auth/me/")) == "10/min"
+    assert limiter.policy("/api/v1/auth/login/") == "5/min"
+    assert limiter.policy("/api/v1/auth/login/", {"Support"}) == "50/min"
+    assert limiter.policy(None, {"Support", "Admin"}) == "1000/min"
+    assert limiter.check(anonymous_request("/static/app.js"), "test") is None
+
+
+@pytest.mark.django_db
+def test_middleware_returns_429_with_retry_after(settings, limiter):
+    settings.RATE_LIMIT_DEFAULT = "2/min"
+    client = APIClient()
+    responses = [client.get("/api/v1/courses/courses/") for _ in range(3)]
+
+    assert responses[0]["X-RateLimit-Limit"] == "2"
+    assert responses[1]["X-RateLimit-Remaining"] == "0"
+    assert responses[2].status_code == 429
+    assert responses[2]["Retry-After"] == "30"
+
+
+class ThrottledView(APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [RateLimitThrottle]
+
+    def get(self, request):
+        return Response({})
+
+
+@pytest.mark.django_db
+def test_drf_throttle_limits_per_user(settings, limiter):
+    settings.RATE_LIMIT_DEFAULT = "1/min"
+    factory = APIRequestFactory()
+    user = User.objects.create_user(
+        username="throttled", email="throttled@example.com", password="pass"
+    )
+    other = User.objects.create_user(
+        username="unthrottled", email="unthrottled@example.com", password="pass"
+    )
+    view = ThrottledView.as_view()
+
+    def get(as_user):
+        request = factory.get("/api/v1/throttled/")
+        force_authenticate(request, user=as_user)
+        return view(request)
+
+    assert get(user).status_code == 200
+    denied = get(user)
+    assert denied.status_code == 429
+    assert denied["Retry-After"] == "60"
+    assert get(other).status_code == 200
+
+
+def test_counts_are_kept_per_endpoint(settings):
+    settings.RATE_LIMIT_DEFAULT = "1/min"
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+
+    assert limiter.check(anonymous_request("/api/v1/courses/"), "test").allowed
+    assert not limiter.check(anonymous_request("/api/v1/courses/"), "test").allowed
+    assert limiter.check(anonymous_request("/api/v1/users/"), "test").allowed
+    # An explicit scope shares one count across paths
+    assert limiter.check(anonymous_request("/a/"), "test", scope="shared").allowed
+    assert not limiter.check(anonymous_request("/b/"), "test", scope="shared").allowed
+
+
+def test_forwarded_for_is_only_trusted_from_proxies(settings):
+    settings.RATE_LIMIT_TRUSTED_PROXIES = ["10.0.0.0/8"]
+    request = anonymous_request()
+    request.META["HTTP_X_FORWARDED_FOR"] = "6.6.6.6, 203.0.113.7, 10.1.2.3"
+
+    request.META["REMOTE_ADDR"] = "198.51.100.1"
+    assert rate_limiting.get_client_ip(request) == "198.51.100.1"
+    # Behind the proxy, the nearest hop it did not add is the client
+    request.META["REMOTE_ADDR"] = "10.0.0.1"
+    assert rate_limiting.get_client_ip(request) == "203.0.113.7"
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import AuditLogExportView
+
+app_name = "shared"
+
+urlpatterns = [
+    path("audit-logs/export/", AuditLogExportView.as_view(), name="audit-log-export"),
+]
@@ -0,0 +1,46 @@
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+
+from .audit import EXPORT_FIELDS, to_jsonl
+from .models import AuditLog
+
+EXPORT_FILTERS = ("user", "action", "resource_type", "resource_id")
+
+
+class AuditLogExportView(APIView):
+    """
+    Stream audit records as JSON lines, newest first. Filters: ``user``,
+    ``action``, ``resource_type``, ``resource_id``, and ``since``/``until``
+    as ISO datetimes. Rows are read with a server-side cursor, so exports
+    of any size use constant memory.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        queryset = AuditLog.objects.filter(
+            **{
+                field: request.query_params[field]
+                for field in EXPORT_FILTERS
+                if request.query_params.get(field)
+            }
+        )
+        for param, lookup in (
+            ("since", "created_at__gte"),
+            ("until", "created_at__lt"),
+        ):
+            if request.query_params.get(param):
+                value = parse_datetime(request.query_params[param])
+                if value is None:
+                    raise ValidationError({param: "Expected an ISO 8601 datetime."})
+                queryset = queryset.filter(**{lookup: value})
+        rows = queryset.order_by("-created_at").values(*EXPORT_FIELDS)
+        response = StreamingHttpResponse(
+            to_jsonl(rows.iterator(chunk_size=2000)),
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = 'attachment; filename="audit-logs.jsonl"'
+        return response
@@ -2,13 +2,14 @@ from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import ShopItem, Purchase, PurchaseItem, UserInventory
+from apps.gamification.ledger import retry_on_conflict
 from apps.gamification.utils import (
     spend_points,
+    refund_points,
     get_user_balance,
     validate_sufficient_points,
 )
 from apps.shared.exceptions import BusinessLogicError
-from apps.gamification.models import PointLedger
 
 
 class ShopService:
@@ -36,6 +37,7 @@ class ShopService:
 
 class PurchaseService:
     @staticmethod
+    @retry_on_conflict
     @transaction.atomic
     def create_purchase(user, items_data):
         """
@@ -84,6 +86,7 @@ class PurchaseService:
         return purchase
 
     @staticmethod
+    @retry_on_conflict
     @transaction.atomic
     def process_refund(purchase):
         if purchase.status != "completed":
@@ -91,12 +94,10 @@ class PurchaseService:
         # Refund points to user
         user = purchase.user
         total_points = purchase.total_points_spent
-        # Create refund transaction in PointLedger
-        PointLedger.objects.create(
-            user=user,
-            transaction_type="refund",
-            points=total_points,
-            balance_after=get_user_balance(user) + total_points,
+        # Credit the balance and record the refund in PointLedger
+        refund_points(
+            user,
+            total_points,
             reference_type="purchase",
             reference_id=str(purchase.id),
             description="Refunded purchase",
@@ -3,7 +3,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
-from django.db import transaction
 
 from .models import (
     ShopCategory,
@@ -82,12 +81,13 @@ class ShopItemViewSet(viewsets.ModelViewSet):
         user = request.user
         quantity = int(request.data.get("quantity", 1))
         try:
-            with transaction.atomic():
-                purchase = PurchaseService.create_purchase(
-                    user, [{"shop_item": item, "quantity": quantity}]
-                )
-                serializer = PurchaseSerializer(purchase, context={"request": request})
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # create_purchase is the outermost transaction, so spend conflicts
+            # are retried there
+            purchase = PurchaseService.create_purchase(
+                user, [{"shop_item": item, "quantity": quantity}]
+            )
+            serializer = PurchaseSerializer(purchase, context={"request": request})
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -10,67 +10,74 @@ from .models import (
     UserFollowing,
     ActivityFeed,
 )
-from apps.gamification.utils import award_social_points, update_referral_progress
+from apps.gamification.coalescing import social_coalescer
+from apps.gamification.events import emit_many, social_event
+
+# Points are awarded by the gamification worker after commit; these
+# receivers only queue compact events. Likes, shares and follows arrive in
+# bursts, so they are buffered and flushed as one aggregated award per user.
 
 
 # --- Comment Signals ---
 @receiver(post_save, sender=Comment)
 def comment_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.user, "comment_posted", instance)
+        emit_many([social_event(instance.user_id, "comment_posted", instance)])
 
 
 # --- Like Signals ---
 @receiver(post_save, sender=Like)
 def like_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.user, "like_given", instance)
+        social_coalescer.buffer(instance.user_id, "like_given")
         # Award points to content creator if possible
         target = instance.content_object
-        if hasattr(target, "user"):
-            award_social_points(target.user, "like_received", target)
+        if hasattr(target, "user_id"):
+            social_coalescer.buffer(target.user_id, "like_received")
 
 
 # --- Share Signals ---
 @receiver(post_save, sender=Share)
 def share_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.user, "content_shared", instance)
+        social_coalescer.buffer(instance.user_id, "content_shared")
         target = instance.content_object
-        if hasattr(target, "user"):
-            award_social_points(target.user, "content_shared_by_others", target)
+        if hasattr(target, "user_id"):
+            social_coalescer.buffer(target.user_id, "content_shared_by_others")
 
 
 # --- Discussion Signals ---
 @receiver(post_save, sender=Discussion)
 def discussion_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.created_by, "discussion_started", instance)
+        emit_many(
+            [social_event(instance.created_by_id, "discussion_started", instance)]
+        )
 
 
 @receiver(post_save, sender=DiscussionReply)
 def discussion_reply_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.user, "discussion_reply", instance)
+        emit_many([social_event(instance.user_id, "discussion_reply", instance)])
 
 
 # --- Referral Signals ---
 @receiver(post_save, sender=Referral)
 def referral_completed(sender, instance, **kwargs):
     if instance.status == "completed" and instance.points_awarded == 0:
-        update_referral_progress(instance.referrer, instance.referred_user)
+        emit_many([social_event(instance.referrer_id, "referral", instance)])
 
 
 # --- UserFollowing Signals ---
 @receiver(post_save, sender=UserFollowing)
 def following_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.follower, "follow_user", instance)
-        award_social_points(instance.following, "gained_follower", instance)
+        social_coalescer.buffer(instance.follower_id, "follow_user")
+        social_coalescer.buffer(instance.following_id, "gained_follower")
 
 
 # --- ActivityFeed Signals ---
 @receiver(post_save, sender=ActivityFeed)
 def activity_feed_created(sender, instance, created, **kwargs):
     if created:
-        award_social_points(instance.user, "activity_feed", instance)
+        emit_many([social_event(instance.user_id, "activity_feed", instance)])
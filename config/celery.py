@@ -26,7 +26,19 @@ app.conf.update(
         },
         "update-leaderboards": {
             "task": "apps.gamification.tasks.update_leaderboards",
-            "schedule": crontab(minute=30, hour=0),
+            "schedule": crontab(minute="*/15"),
+        },
+        "reset-weekly-leaderboards": {
+            "task": "apps.gamification.tasks.reset_weekly_leaderboards",
+            "schedule": crontab(minute=5, hour=0, day_of_week=1),
+        },
+        "reset-monthly-leaderboards": {
+            "task": "apps.gamification.tasks.reset_monthly_leaderboards",
+            "schedule": crontab(minute=5, hour=0, day_of_month=1),
+        },
+        "award-leaderboard-bonuses": {
+            "task": "apps.gamification.tasks.award_leaderboard_bonuses",
+            "schedule": crontab(minute=15, hour=0, day_of_week=1),
         },
         "expire-events": {
             "task": "apps.gamification.tasks.expire_events",
@@ -44,6 +56,26 @@ app.conf.update(
             "task": "apps.gamification.tasks.award_daily_login_streaks",
             "schedule": crontab(minute=0, hour="*"),
         },
+        "snapshot-point-balances": {
+            "task": "apps.gamification.tasks.snapshot_point_balances",
+            "schedule": crontab(minute=30, hour=1),
+        },
+        "cleanup-old-activities": {
+            "task": "apps.gamification.tasks.cleanup_old_activities",
+            "schedule": crontab(minute=0, hour=3, day_of_week=0),
+        },
+        "recalculate-user-balances": {
+            "task": "apps.gamification.tasks.recalculate_user_balances",
+            "schedule": crontab(minute=0, hour=4),
+        },
+        "flush-social-buffer": {
+            "task": "apps.gamification.tasks.flush_social_buffer",
+            "schedule": 10.0,
+        },
+        "archive-old-audit-logs": {
+            "task": "apps.shared.tasks.archive_old_audit_logs",
+            "schedule": crontab(minute=30, hour=2),
+        },
     },
 )
 
@@ -196,6 +196,7 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_OBTAIN_SERIALIZER": "apps.authentication.application.serializers.RBACTokenObtainPairSerializer",
     "JTI_CLAIM": "jti",
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
@@ -239,18 +240,91 @@ AUTHENTICATION_BACKENDS = [
     "guardian.backends.ObjectPermissionBackend",
 ]
 
+REDIS_URL = config("REDIS_URL", default="redis://127.0.0.1:6379/1")
+
+# Shared tier behind infrastructure.cache.CacheHandler; "redis" is the alias
+# for raw Redis structures (rank sets, buffers, rate limits)
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {"retry_on_timeout": True},
+        },
     },
     "redis": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": config("REDIS_URL", default="redis://127.0.0.1:6379/1"),
+        "LOCATION": REDIS_URL,
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         },
     },
 }
+# Per-process LRU in front of the shared cache: entry count, how long local
+# copies live, and how often prefix version counters are re-read (seconds)
+CACHE_LOCAL_MAX_ENTRIES = config("CACHE_LOCAL_MAX_ENTRIES", default=2048, cast=int)
+CACHE_LOCAL_TTL = config("CACHE_LOCAL_TTL", default=5, cast=int)
+CACHE_VERSION_SYNC_INTERVAL = config(
+    "CACHE_VERSION_SYNC_INTERVAL", default=1.0, cast=float
+)
+# Shared-tier timeouts are stretched by up to this fraction
+CACHE_TTL_JITTER = config("CACHE_TTL_JITTER", default=0.1, cast=float)
+
+# Real-time leaderboard ranks: "redis" sorted sets on the given cache alias,
+# or "memory" for a process-local index. Needs Redis 6.2+ (ZADD GT)
+GAMIFICATION_RANK_BACKEND = config("GAMIFICATION_RANK_BACKEND", default="redis")
+GAMIFICATION_RANK_CACHE_ALIAS = "redis"
+# Process gamification events inline instead of on a Celery worker after commit
+GAMIFICATION_EVENTS_SYNC = config("GAMIFICATION_EVENTS_SYNC", default=False, cast=bool)
+# Buffer for coalesced social point events: "redis" (on the rank cache alias)
+# or "memory"; flushed by the flush-social-buffer beat task
+GAMIFICATION_COALESCE_BACKEND = config("GAMIFICATION_COALESCE_BACKEND", default="redis")
+# Bulk awards to more explicit users than this (and course-wide ones) are
+# queued on Celery instead of running in the request
+GAMIFICATION_BULK_AWARD_INLINE_LIMIT = config(
+    "GAMIFICATION_BULK_AWARD_INLINE_LIMIT", default=500, cast=int
+)
+# PointLedger entries older than this move to the archive table once a
+# balance snapshot covers them
+GAMIFICATION_LEDGER_RETENTION_DAYS = config(
+    "GAMIFICATION_LEDGER_RETENTION_DAYS", default=365, cast=int
+)
+
+# Rate limiting (middleware.rate_limiting): GCRA on "redis" (the given cache
+# alias) or "memory". Rates are "<count>/<s|min|hour|day>"; RATE_LIMIT_ROUTES
+# maps path prefixes to a rate or to {"default": rate, "<role>": rate}, and
+# RATE_LIMIT_ROLE_RATES applies per role everywhere else. None means no limit.
+# Counts are kept per client and endpoint path.
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="redis")
+RATE_LIMIT_CACHE_ALIAS = "redis"
+RATE_LIMIT_DEFAULT = config("RATE_LIMIT_DEFAULT", default="100/min")
+RATE_LIMIT_ROUTES = {
+    "/api/v1/auth/": "20/min",
+    "/static/": None,
+}
+RATE_LIMIT_ROLE_RATES = {
+    "Admin": "1000/min",
+}
+# Proxy addresses or networks whose X-Forwarded-For is trusted; for any other
+# peer the client is REMOTE_ADDR, since the header can be forged
+RATE_LIMIT_TRUSTED_PROXIES = config(
+    "RATE_LIMIT_TRUSTED_PROXIES",
+    default="",
+    cast=lambda x: [i.strip() for i in x.split(",") if i.strip()],
+)
+
+# Request audit records are queued in-process and written in batches by a
+# background thread; a full queue drops records instead of blocking
+AUDIT_QUEUE_SIZE = config("AUDIT_QUEUE_SIZE", default=10000, cast=int)
+AUDIT_BATCH_SIZE = config("AUDIT_BATCH_SIZE", default=200, cast=int)
+AUDIT_FLUSH_INTERVAL = config("AUDIT_FLUSH_INTERVAL", default=2.0, cast=float)
+# Fraction of successful GET/HEAD/OPTIONS requests that get an audit record
+AUDIT_READ_SAMPLE_RATE = config("AUDIT_READ_SAMPLE_RATE", default=1.0, cast=float)
+# Write audit records inline instead of on the background writer
+AUDIT_LOG_SYNC = config("AUDIT_LOG_SYNC", default=False, cast=bool)
+# Audit records older than this move to gzipped JSONL files in storage
+AUDIT_RETENTION_DAYS = config("AUDIT_RETENTION_DAYS", default=90, cast=int)
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
@@ -356,7 +430,19 @@ CELERY_BEAT_SCHEDULE = {
     },
     "update-leaderboards": {
         "task": "apps.gamification.tasks.update_leaderboards",
-        "schedule": crontab(minute=30, hour=0),
+        "schedule": crontab(minute="*/15"),
+    },
+    "reset-weekly-leaderboards": {
+        "task": "apps.gamification.tasks.reset_weekly_leaderboards",
+        "schedule": crontab(minute=5, hour=0, day_of_week=1),
+    },
+    "reset-monthly-leaderboards": {
+        "task": "apps.gamification.tasks.reset_monthly_leaderboards",
+        "schedule": crontab(minute=5, hour=0, day_of_month=1),
+    },
+    "award-leaderboard-bonuses": {
+        "task": "apps.gamification.tasks.award_leaderboard_bonuses",
+        "schedule": crontab(minute=15, hour=0, day_of_week=1),
     },
     "expire-events": {
         "task": "apps.gamification.tasks.expire_events",
@@ -374,4 +460,24 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.gamification.tasks.award_daily_login_streaks",
         "schedule": crontab(minute=0, hour="*"),
     },
+    "snapshot-point-balances": {
+        "task": "apps.gamification.tasks.snapshot_point_balances",
+        "schedule": crontab(minute=30, hour=1),
+    },
+    "cleanup-old-activities": {
+        "task": "apps.gamification.tasks.cleanup_old_activities",
+        "schedule": crontab(minute=0, hour=3, day_of_week=0),
+    },
+    "recalculate-user-balances": {
+        "task": "apps.gamification.tasks.recalculate_user_balances",
+        "schedule": crontab(minute=0, hour=4),
+    },
+    "flush-social-buffer": {
+        "task": "apps.gamification.tasks.flush_social_buffer",
+        "schedule": 10.0,
+    },
+    "archive-old-audit-logs": {
+        "task": "apps.shared.tasks.archive_old_audit_logs",
+        "schedule": crontab(minute=30, hour=2),
+    },
 }
@@ -37,7 +37,16 @@ CACHES = {
                 "retry_on_timeout": True,
             },
         },
-    }
+    },
+    # Rank sorted sets, the social coalescing buffer and rate limiter state
+    # live here rather than on the evictable general cache
+    "redis": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": config("REDIS_URL"),
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+    },
 }
 
 CORS_ALLOWED_ORIGINS = config(
@@ -35,6 +35,12 @@ CACHES = {
     },
 }
 
+GAMIFICATION_RANK_BACKEND = "memory"
+GAMIFICATION_EVENTS_SYNC = True
+GAMIFICATION_COALESCE_BACKEND = "memory"
+AUDIT_LOG_SYNC = True
+RATE_LIMIT_BACKEND = "memory"
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.testserver.com"
 EMAIL_PORT = 587
@@ -1,38 +1,401 @@
-from django.core.cache import cache
+import functools
+import hashlib
+import inspect
+import logging
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Model, QuerySet
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+VERSION_KEY_PREFIX = "cache:version"
+MEMO_KEY_PREFIX = "memo"
+TAG_KEY_PREFIX = "memo:tags"
+STAT_NAMES = ("local_hits", "hits", "misses", "sets", "evictions", "invalidations")
+
+
+class LocalCache:
+    """Thread-safe LRU of ``key -> (expires_at, version, value)``."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, entry_version, value = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, version, value, ttl):
+        """Store ``value``; returns the keys evicted to make room."""
+        evicted = []
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
 class CacheHandler:
-    def __init__(self):
-        self.cache_backend = cache
+    """
+    Two-tier cache: a small per-process LRU in front of a shared Django
+    cache alias (Redis in production). The entry point for app caches.
 
-    def get(self, key):
-        return self.cache_backend.get(key)
+    - Local copies live at most ``local_ttl`` seconds, so a ``delete`` in
+      one process is seen by the others within that time.
+    - Shared timeouts are stretched by up to ``jitter`` of their length,
+      so keys written together do not all expire together.
+    - Every key prefix (its first two ``:``-separated segments, as in
+      ``courses:structure``) has a version counter in the shared cache,
+      passed as the Django cache ``version``. ``invalidate(prefix)`` bumps
+      it, which retires the prefix's shared entries at once and local
+      copies in every process within ``sync_interval`` seconds, when
+      processes re-read the counters.
+    - Hits, misses, sets and local evictions are counted per prefix for
+      this process; see ``stats()``.
+    """
 
-    def set(self, key, value, timeout=None):
-        self.cache_backend.set(key, value, timeout)
+    def __init__(
+        self,
+        alias="default",
+        local_max_entries=None,
+        local_ttl=None,
+        jitter=None,
+        sync_interval=None,
+    ):
+        self.alias = alias
+        self.local_ttl = (
+            local_ttl
+            if local_ttl is not None
+            else getattr(settings, "CACHE_LOCAL_TTL", 5)
+        )
+        self.jitter = (
+            jitter if jitter is not None else getattr(settings, "CACHE_TTL_JITTER", 0.1)
+        )
+        self.sync_interval = (
+            sync_interval
+            if sync_interval is not None
+            else getattr(settings, "CACHE_VERSION_SYNC_INTERVAL", 1.0)
+        )
+        self.local = LocalCache(
+            local_max_entries or getattr(settings, "CACHE_LOCAL_MAX_ENTRIES", 2048)
+        )
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._stats = defaultdict(Counter)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def prefix_of(key):
+        return ":".join(key.split(":", 2)[:2])
+
+    def get(self, key, default=None, local=True):
+        """Local copy, else the shared value (copied locally), else default."""
+        prefix = self.prefix_of(key)
+        version = self.version(prefix)
+        if local and self.local_ttl:
+            value = self.local.get(key, version)
+            if value is not MISSING:
+                self._count(prefix, "local_hits")
+                return value
+        value = self.backend.get(key, MISSING, version=version)
+        if value is MISSING:
+            self._count(prefix, "misses")
+            return default
+        self._count(prefix, "hits")
+        if local:
+            self._set_local(key, version, value, self.local_ttl)
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key, MISSING)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, local=True):
+        prefix = self.prefix_of(key)
+        version = self.version(prefix)
+        timeout = self._jittered(timeout)
+        self.backend.set(key, value, timeout, version=version)
+        self._count(prefix, "sets")
+        if local:
+            ttl = self.local_ttl if timeout is None else min(self.local_ttl, timeout)
+            self._set_local(key, version, value, ttl)
+        else:
+            self.local.delete(key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """Shared-tier add; True when the key was not set yet."""
+        version = self.version(self.prefix_of(key))
+        return self.backend.add(key, value, self._jittered(timeout), version=version)
+
+    def incr(self, key, delta=1):
+        """Atomic shared-tier increment; raises ValueError for a missing key."""
+        self.local.delete(key)
+        return self.backend.incr(key, delta, version=self.version(self.prefix_of(key)))
 
     def delete(self, key):
-        self.cache_backend.delete(key)
+        self.local.delete(key)
+        self.backend.delete(key, version=self.version(self.prefix_of(key)))
+
+    def invalidate(self, prefix):
+        """Retire every key under ``prefix`` in all processes."""
+        version_key = f"{VERSION_KEY_PREFIX}:{prefix}"
+        try:
+            version = self.backend.incr(version_key)
+        except ValueError:
+            version = self._seed_version(version_key)
+        with self._lock:
+            self._versions[prefix] = (version, time.monotonic())
+        self._count(prefix, "invalidations")
+
+    def version(self, prefix):
+        """The prefix's shared version counter, re-read every sync interval."""
+        cached = self._versions.get(prefix)
+        if cached is not None and time.monotonic() - cached[1] < self.sync_interval:
+            return cached[0]
+        version_key = f"{VERSION_KEY_PREFIX}:{prefix}"
+        version = self.backend.get(version_key)
+        if version is None:
+            version = self._seed_version(version_key)
+        with self._lock:
+            self._versions[prefix] = (version, time.monotonic())
+        return version
 
     def clear(self):
-        self.cache_backend.clear()
+        self.local.clear()
+        with self._lock:
+            self._versions.clear()
+        self.backend.clear()
+
+    def stats(self):
+        """``{prefix: {stat: count}}`` for this process."""
+        with self._lock:
+            return {
+                prefix: {name: counts[name] for name in STAT_NAMES}
+                for prefix, counts in self._stats.items()
+            }
+
+    def _seed_version(self, version_key):
+        # Seeded from the clock, so an evicted counter never falls back to a
+        # version whose entries are still cached
+        self.backend.add(version_key, time.time_ns(), None)
+        return self.backend.get(version_key)
+
+    def _set_local(self, key, version, value, ttl):
+        if not self.local_ttl or ttl <= 0:
+            return
+        evicted = self.local.set(key, version, value, ttl)
+        for evicted_key in evicted:
+            self._count(self.prefix_of(evicted_key), "evictions")
+
+    def _jittered(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.backend.default_timeout
+        if not timeout or not self.jitter:
+            return timeout
+        return int(timeout * (1 + random.uniform(0, self.jitter)))
+
+    def _count(self, prefix, name):
+        with self._lock:
+            self._stats[prefix][name] += 1
+
+
+cache_handler = CacheHandler()
+# Runs background refreshes of stale memoized results
+refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memo-refresh")
 
 
 def cache_key_generator(prefix, identifier):
     return f"{prefix}:{identifier}"
 
 
-def cache_decorator(timeout=300):
+def key_part(value):
+    """
+    Stable text for a memoized call argument: models by label and pk,
+    querysets by their SQL, containers element-wise in a fixed order.
+    """
+    if isinstance(value, Model):
+        return f"<{value._meta.label_lower}:{value.pk}>"
+    if isinstance(value, QuerySet):
+        try:
+            sql, params = value.query.sql_with_params()
+        except EmptyResultSet:
+            sql, params = "none", ()
+        return f"<{value.model._meta.label_lower}:{sql}:{params!r}>"
+    if isinstance(value, dict):
+        items = sorted(f"{key_part(k)}={key_part(v)}" for k, v in value.items())
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(key_part(item) for item in value)) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(key_part(item) for item in value) + "]"
+    return repr(value)
+
+
+def tag_versions(tags):
+    """
+    Current version of each tag, seeding unseen tags. Read from the shared
+    tier, since a local copy would miss other processes' invalidations.
+    """
+    versions = {}
+    for tag in tags:
+        key = f"{TAG_KEY_PREFIX}:{tag}"
+        version = cache_handler.get(key, local=False)
+        if version is None:
+            cache_handler.add(key, time.time_ns(), None)
+            version = cache_handler.get(key, local=False)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Retire every memoized result computed under any of ``tags``."""
+    for tag in tags:
+        try:
+            cache_handler.incr(f"{TAG_KEY_PREFIX}:{tag}")
+        except ValueError:
+            # Never read, so nothing was cached under it
+            pass
+
+
+def memoize(
+    timeout=300,
+    stale_ttl=0,
+    tags=None,
+    cache_none=True,
+    lock_timeout=30,
+    wait=5.0,
+):
+    """
+    Memoize a function through ``cache_handler``.
+
+    - Keys come from the bound arguments (defaults applied) via
+      ``key_part``, so positional and keyword calls share an entry.
+    - None and other falsy results are cached too, unless ``cache_none``
+      is False.
+    - On a miss only the caller holding the shared lock recomputes; the
+      others wait up to ``wait`` seconds for its result, then compute
+      themselves.
+    - Results are fresh for ``timeout`` seconds and then served stale for
+      up to ``stale_ttl`` more while one caller refreshes them in the
+      background.
+    - ``tags`` (a list, or a callable taking the call's arguments) names
+      what a result depends on; ``invalidate_tags`` retires it.
+
+    The wrapper has ``key(...)``, ``invalidate(...)`` for one call's
+    entry, and ``invalidate_all()``.
+    """
+
     def decorator(func):
+        signature = inspect.signature(func)
+        prefix = f"{MEMO_KEY_PREFIX}:{func.__module__}.{func.__qualname__}"
+
+        def key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.blake2b(
+                key_part(dict(bound.arguments)).encode(), digest_size=16
+            ).hexdigest()
+            return f"{prefix}:{digest}"
+
+        def compute(cache_key, args, kwargs):
+            dependencies = tags(*args, **kwargs) if callable(tags) else tags or ()
+            # Read before computing, so an invalidation during the
+            # computation retires the result
+            versions = tag_versions(dependencies)
+            value = func(*args, **kwargs)
+            if value is not None or cache_none:
+                cache_handler.set(
+                    cache_key,
+                    (value, time.time() + timeout, versions),
+                    timeout + stale_ttl,
+                )
+            return value
+
+        def refresh(cache_key, args, kwargs):
+            try:
+                compute(cache_key, args, kwargs)
+            except Exception as e:
+                logger.error(f"Background refresh of {cache_key} failed: {e}")
+            finally:
+                cache_handler.delete(f"{cache_key}:lock")
+                connections.close_all()
+
+        def current(entry):
+            return entry is not None and entry[2] == tag_versions(entry[2])
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            cache_key = cache_key_generator(func.__name__, str(args) + str(kwargs))
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                return cached_result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            return result
+            cache_key = key(*args, **kwargs)
+            lock_key = f"{cache_key}:lock"
+            entry = cache_handler.get(cache_key)
+            if current(entry):
+                value, fresh_until, _ = entry
+                if time.time() >= fresh_until and cache_handler.add(
+                    lock_key, 1, lock_timeout
+                ):
+                    refresh_executor.submit(refresh, cache_key, args, kwargs)
+                return value
+            if cache_handler.add(lock_key, 1, lock_timeout):
+                try:
+                    return compute(cache_key, args, kwargs)
+                finally:
+                    cache_handler.delete(lock_key)
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache_handler.get(cache_key, local=False)
+                if current(entry):
+                    return entry[0]
+                if cache_handler.get(lock_key, local=False) is None:
+                    # Released without storing a result
+                    break
+            return compute(cache_key, args, kwargs)
 
+        wrapper.key = key
+        wrapper.invalidate = lambda *args, **kwargs: cache_handler.delete(
+            key(*args, **kwargs)
+        )
+        wrapper.invalidate_all = lambda: cache_handler.invalidate(prefix)
         return wrapper
 
     return decorator
+
+
+def cache_decorator(timeout=300):
+    # Kept for existing callers; see memoize
+    return memoize(timeout=timeout)
@@ -1,51 +1,27 @@
 import logging
 import time
 from django.utils.deprecation import MiddlewareMixin
-from django.utils.timezone import now
-from apps.shared.models import AuditLog
+from apps.shared.audit import audit_pipeline
 
 logger = logging.getLogger(__name__)
 
 
 class RequestLoggingMiddleware(MiddlewareMixin):
     """
-    Middleware to log incoming requests, outgoing responses, exceptions, and performance metrics.
-    Uses the AuditLog model for persistent audit logging.
+    Middleware to log requests, responses, exceptions, and performance metrics.
+    Each request produces a single AuditLog record carrying its status and
+    duration, written off the request path by the audit pipeline.
     """
 
     def process_request(self, request):
         """
-        Logs the details of the incoming request and creates an AuditLog entry.
         Stores the start time for performance metrics.
         """
         request._logging_start_time = time.monotonic()
-        user = (
-            request.user
-            if hasattr(request, "user") and request.user.is_authenticated
-            else None
-        )
-        ip_address = self._get_client_ip(request)
-        user_agent = request.META.get("HTTP_USER_AGENT", "")
-        logger.info(
-            f"[Request] {request.method} {request.path} | User={user or 'Anonymous'} | IP={ip_address}"
-        )
-        try:
-            AuditLog.log_action(
-                user=user,
-                action="VIEW",
-                resource_type="API_REQUEST",
-                resource_id=None,
-                resource_repr=f"{request.method} {request.path}",
-                ip_address=ip_address,
-                user_agent=user_agent,
-            )
-        except Exception as e:
-            logger.error(f"Failed to create AuditLog for request: {e}", exc_info=True)
 
     def process_response(self, request, response):
         """
-        Logs the details of the outgoing response and creates an AuditLog entry.
-        Records performance metrics (duration).
+        Logs the outgoing response and enqueues its AuditLog record.
         """
         user = (
             request.user
@@ -53,7 +29,6 @@ class RequestLoggingMiddleware(MiddlewareMixin):
             else None
         )
         ip_address = self._get_client_ip(request)
-        user_agent = request.META.get("HTTP_USER_AGENT", "")
         duration_ms = None
         if hasattr(request, "_logging_start_time"):
             duration_ms = int((time.monotonic() - request._logging_start_time) * 1000)
@@ -62,22 +37,37 @@ class RequestLoggingMiddleware(MiddlewareMixin):
             f"User={user or 'Anonymous'} | IP={ip_address} | Duration={duration_ms}ms"
         )
         try:
-            AuditLog.log_action(
-                user=user,
-                action="VIEW",
-                resource_type="API_RESPONSE",
-                resource_id=None,
-                resource_repr=f"{request.method} {request.path}",
-                ip_address=ip_address,
-                user_agent=user_agent,
-            )
+            if audit_pipeline.should_record(request.method, response.status_code):
+                exception = getattr(request, "_logging_exception", None)
+                extra_data = {
+                    "method": request.method,
+                    "status": response.status_code,
+                    "duration_ms": duration_ms,
+                }
+                sample_rate = audit_pipeline.sample_rate(request.method)
+                if sample_rate < 1 and response.status_code < 400:
+                    extra_data["sample_rate"] = sample_rate
+                if exception:
+                    extra_data["error"] = exception
+                audit_pipeline.enqueue(
+                    {
+                        "user_id": user.pk if user else None,
+                        "action": "EXCEPTION" if exception else "VIEW",
+                        "resource_type": "API_REQUEST",
+                        "resource_repr": f"{request.method} {request.path}"[:255],
+                        "ip_address": ip_address,
+                        "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+                        "extra_data": extra_data,
+                    }
+                )
         except Exception as e:
-            logger.error(f"Failed to create AuditLog for response: {e}", exc_info=True)
+            logger.error(f"Failed to enqueue AuditLog for request: {e}", exc_info=True)
         return response
 
     def process_exception(self, request, exception):
         """
-        Logs any exceptions that occur during request processing and creates an AuditLog entry.
+        Logs any exceptions that occur during request processing; the
+        request's AuditLog record is marked as an exception.
         """
         user = (
             request.user
@@ -85,23 +75,11 @@ class RequestLoggingMiddleware(MiddlewareMixin):
             else None
         )
         ip_address = self._get_client_ip(request)
-        user_agent = request.META.get("HTTP_USER_AGENT", "")
         logger.error(
             f"[Exception] {request.method} {request.path} | User={user or 'Anonymous'} | "
             f"IP={ip_address} | Error={str(exception)}"
         )
-        try:
-            AuditLog.log_action(
-                user=user,
-                action="EXCEPTION",
-                resource_type="API_EXCEPTION",
-                resource_id=None,
-                resource_repr=f"{request.method} {request.path}",
-                ip_address=ip_address,
-                user_agent=user_agent,
-            )
-        except Exception as e:
-            logger.error(f"Failed to create AuditLog for exception: {e}", exc_info=True)
+        request._logging_exception = str(exception)[:500]
 
     def _get_client_ip(self, request):
         """
@@ -1,74 +1,280 @@
-from django.core.cache import cache
-from django.http import JsonResponse
-from django.utils.timezone import now
+import ipaddress
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+
 from django.conf import settings
-import hashlib
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# GCRA in one round trip: the stored value is the theoretical arrival time
+# (TAT) in ms on the Redis clock, and it expires once the bucket is full again
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, allow_at - now, 0}
+end
+redis.call("SET", KEYS[1], new_tat, "PX", new_tat - now)
+return {1, 0, math.floor((period - (new_tat - now)) / interval)}
+"""
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``"100/min"`` -> ``(100, 60)``: requests allowed per period in seconds."""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class Decision:
+    __slots__ = ("allowed", "limit", "remaining", "retry_after")
+
+    def __init__(self, allowed, limit, remaining, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Seconds until the next request would be allowed
+        self.retry_after = retry_after
+
+
+class InMemoryRateLimitBackend:
+    """Process-local GCRA state for tests and single-process development."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._tats = {}
+
+    def hit(self, key, interval_ms, period_ms):
+        now = int(time.time() * 1000)
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + interval_ms
+            allow_at = new_tat - period_ms
+            if now < allow_at:
+                return False, allow_at - now, 0
+            if len(self._tats) >= self.max_keys:
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            self._tats[key] = new_tat
+            return True, 0, (period_ms - (new_tat - now)) // interval_ms
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class RedisRateLimitBackend:
+    """GCRA as a Lua script on the django_redis connection of a cache alias."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._script = None
+
+    def hit(self, key, interval_ms, period_ms):
+        if self._script is None:
+            from django_redis import get_redis_connection
+
+            self._script = get_redis_connection(self.alias).register_script(GCRA_SCRIPT)
+        allowed, retry_ms, remaining = self._script(
+            keys=[key], args=[interval_ms, period_ms]
+        )
+        return bool(allowed), retry_ms, remaining
+
+
+class RateLimiter:
+    """
+    Generic cell rate algorithm (GCRA) limiter: each key stores a single
+    timestamp, so a check is O(1) and one cache round trip, atomic under
+    concurrency, and the window slides continuously instead of resetting.
+
+    Policies come from settings: ``RATE_LIMIT_DEFAULT``, per path prefix in
+    ``RATE_LIMIT_ROUTES`` (a rate, or ``{"default": rate, role: rate}``),
+    and per role in ``RATE_LIMIT_ROLE_RATES``. A route's role rates win
+    over the global ones; among a user's roles the most generous rate
+    applies. A rate of None disables limiting. Counts are kept per client
+    and endpoint path, so one busy endpoint does not use up the others.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if getattr(settings, "RATE_LIMIT_BACKEND", "redis") == "memory":
+                self._backend = InMemoryRateLimitBackend()
+            else:
+                self._backend = RedisRateLimitBackend(
+                    getattr(settings, "RATE_LIMIT_CACHE_ALIAS", "redis")
+                )
+        return self._backend
+
+    @staticmethod
+    def route_for(path):
+        """The longest configured prefix of ``path``, or None."""
+        routes = getattr(settings, "RATE_LIMIT_ROUTES", {})
+        matches = [prefix for prefix in routes if path.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def policy(self, route, roles=()):
+        """The rate for ``route`` (None for the default policy) and roles."""
+        if route is None:
+            rates = getattr(settings, "RATE_LIMIT_DEFAULT", None)
+        else:
+            rates = getattr(settings, "RATE_LIMIT_ROUTES", {})[route]
+        if not isinstance(rates, dict):
+            rates = {"default": rates}
+        role_rates = {**getattr(settings, "RATE_LIMIT_ROLE_RATES", {}), **rates}
+        candidates = [role_rates[role] for role in roles if role in role_rates]
+        if candidates:
+            return max(candidates, key=self._throughput)
+        return rates.get("default")
+
+    @staticmethod
+    def _throughput(rate):
+        if rate is None:
+            return math.inf
+        limit, period = parse_rate(rate)
+        return limit / period
+
+    def hit(self, scope, identifier, rate):
+        """Count one request against ``rate``; None when unlimited."""
+        if rate is None:
+            return None
+        limit, period = parse_rate(rate)
+        period_ms = period * 1000
+        try:
+            allowed, retry_ms, remaining = self.backend.hit(
+                f"{KEY_PREFIX}:{scope}:{identifier}",
+                max(period_ms // limit, 1),
+                period_ms,
+            )
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the API down
+            logger.error(f"Rate limiter unavailable: {e}", exc_info=True)
+            return None
+        return Decision(allowed, limit, remaining, math.ceil(retry_ms / 1000))
+
+    def check(self, request, namespace, scope=None, user=None, token=None):
+        """
+        Apply the policy for ``request``'s path and user. Counts are kept
+        per ``namespace`` and ``scope`` (the request path by default).
+        """
+        from apps.authorization.resolver import get_permission_set
+
+        user = user if user is not None else getattr(request, "user", None)
+        roles = ()
+        if user is not None and user.is_authenticated:
+            identifier = f"user:{user.pk}"
+            roles = get_permission_set(user, token).roles
+        else:
+            identifier = f"ip:{get_client_ip(request)}"
+        route = self.route_for(request.path)
+        return self.hit(
+            f"{namespace}:{scope or request.path}",
+            identifier,
+            self.policy(route, roles),
+        )
+
+
+@lru_cache(maxsize=None)
+def trusted_networks(proxies):
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def is_trusted_proxy(ip):
+    networks = trusted_networks(
+        tuple(getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", ()))
+    )
+    if not networks or not ip:
+        return False
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def get_client_ip(request):
+    """
+    The client address: REMOTE_ADDR, unless that is a trusted proxy, in
+    which case the nearest X-Forwarded-For hop not added by a trusted proxy.
+    """
+    remote_addr = request.META.get("REMOTE_ADDR")
+    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+    if not x_forwarded_for or not is_trusted_proxy(remote_addr):
+        return remote_addr
+    hops = [hop.strip() for hop in x_forwarded_for.split(",") if hop.strip()]
+    # Clients can prepend anything, so walk back from the nearest hop
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else remote_addr
+
+
+rate_limiter = RateLimiter()
 
 
-# This middleware is now deprecated in favor of DRF's built-in throttling.
-# To avoid conflicts, disable this middleware if DRF throttling is enabled in settings.
-# If you want to keep this middleware, ensure it checks for DRF throttle headers and does not double-limit requests.
-# To fully disable, comment out or remove 'middleware.rate_limiting.RateLimitingMiddleware' from MIDDLEWARE in settings.
 class RateLimitingMiddleware:
     """
-    Middleware to enforce rate limiting on API endpoints.
-    Deprecated: Prefer DRF's built-in throttling system.
+    Middleware to enforce rate limiting on all requests through the shared
+    ``rate_limiter``. Users authenticated by session are limited per user
+    and role; everyone else, including JWT clients that DRF authenticates
+    later, per client IP. Use ``RateLimitThrottle`` for per-user limits on
+    JWT-authenticated API views.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
-        self.rate_limit = getattr(
-            settings, "RATE_LIMIT", 100
-        )  # Default: 100 requests per minute
-        self.rate_limit_window = getattr(
-            settings, "RATE_LIMIT_WINDOW", 60
-        )  # Default: 60 seconds
 
     def __call__(self, request):
-        # If DRF throttle headers are present, skip this middleware
-        if (
-            hasattr(request, "META")
-            and (
-                "HTTP_X_RATELIMIT_LIMIT" in request.META
-                or "HTTP_X_RATELIMIT_REMAINING" in request.META
+        decision = rate_limiter.check(request, "mw")
+        if decision is not None and not decision.allowed:
+            response = JsonResponse(
+                {"error": "Rate limit exceeded. Try again later."}, status=429
             )
-        ):
-            return self.get_response(request)
-        user = getattr(request, "user", None)
-        if user and user.is_authenticated:
-            identifier = str(user.id)
+            response["Retry-After"] = str(decision.retry_after)
         else:
-            identifier = self._get_client_ip(request)
-        endpoint = request.path
-        cache_key = self._generate_cache_key(identifier, endpoint)
+            response = self.get_response(request)
+        if decision is not None:
+            response["X-RateLimit-Limit"] = str(decision.limit)
+            response["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
 
-        request_count = cache.get(cache_key, 0)
-        if request_count >= self.rate_limit:
-            return JsonResponse(
-                {"error": "Rate limit exceeded. Try again later."}, status=429
-            )
 
-        cache.set(cache_key, request_count + 1, timeout=self.rate_limit_window)
+class RateLimitThrottle(BaseThrottle):
+    """
+    DRF throttle on the same engine and policies, applied after DRF
+    authentication so JWT users are limited per user and role. Views may
+    set ``throttle_scope`` to share one count across their paths.
+    DRF turns ``wait()`` into the Retry-After header.
+    """
 
-        response = self.get_response(request)
-        response["X-RateLimit-Limit"] = str(self.rate_limit)
-        response["X-RateLimit-Remaining"] = str(
-            max(0, self.rate_limit - request_count - 1)
+    def allow_request(self, request, view):
+        self.decision = rate_limiter.check(
+            request,
+            "drf",
+            scope=getattr(view, "throttle_scope", None),
+            user=request.user,
+            token=request.auth,
         )
-        return response
+        return self.decision is None or self.decision.allowed
 
-    def _get_client_ip(self, request):
-        """
-        Extracts the client IP address from the request.
-        """
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            return x_forwarded_for.split(",")[0]
-        return request.META.get("REMOTE_ADDR")
-
-    def _generate_cache_key(self, identifier, endpoint):
-        """
-        Generates a unique cache key for rate limiting based on client IP and endpoint.
-        """
-        key = f"{identifier}:{endpoint}"
-        return hashlib.sha256(key.encode()).hexdigest()
+    def wait(self):
+        return self.decision.retry_after if self.decision is not None else None